@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -17,10 +18,80 @@ class Settings(BaseSettings):
   enable_demand_forecast: bool = True
   enable_schedule_optimizer: bool = True
   enable_anomaly_detection: bool = True
+  # Zones need this many finished hours of telemetry before they are forecast
+  demand_forecast_min_history_hours: int = 24
+  # Reservoirs keep this share of capacity in reserve; zones without a forecast use per-capita demand
+  optimizer_reservoir_reserve_fraction: float = 0.2
+  optimizer_per_capita_demand_lpd: float = 135.0
+  # Fairness metrics computed from hourly telemetry rollups
+  fairness_window_days: int = 90
+  fairness_score_days: int = 7
+  fairness_supply_flow_threshold_ml: float = 0.05
+  fairness_underserved_lpcd: float = 70.0
+  fairness_refresh_interval_seconds: float = 900.0
+  # What-if simulations; 0 workers means one per CPU
+  simulation_workers: int = 0
+  simulation_min_chunk_scenarios: int = 10
+  # Reservoir level projections from active schedules and forecast demand
+  reservoir_projection_horizon_hours: int = 48
+  # Time-of-use electricity tariff: (band, start hour, end hour, price per kWh) in local time
+  energy_tariff_bands: list[tuple[str, float, float, float]] = [
+    ("off_peak", 22, 6, 4.5),
+    ("standard", 6, 18, 6.5),
+    ("peak", 18, 22, 8.5),
+  ]
+  energy_tariff_utc_offset_minutes: int = 330
+  energy_tariff_currency: str = "INR"
+  # Shift each pump's runs to the cheapest window of the day
+  optimizer_minimize_energy_cost: bool = True
+  # Single-flight cache for computed read endpoints
+  response_cache_ttl_seconds: float = 30.0
+  response_cache_max_entries: int = 1_024
+  # Citizen reports of the same type this close in space and time join one incident
+  enable_incident_dedup: bool = True
+  incident_dedup_radius_m: float = 150.0
+  incident_dedup_window_minutes: float = 60.0
+  # Map zoom levels zone boundaries are simplified for, to this many screen pixels
+  zone_geometry_zoom_levels: list[int] = [10, 12, 14, 16]
+  zone_geometry_tolerance_px: float = 1.0
+
+  # Streaming anomaly detection over ingested telemetry
+  anomaly_ewma_alpha: float = 0.05
+  anomaly_z_threshold: float = 4.0
+  anomaly_warmup_readings: int = 20
+  anomaly_pressure_drop_psi_per_minute: float = 5.0
+  anomaly_cooldown_seconds: int = 900
+
+  # Telemetry storage
+  telemetry_capacity: int = 500_000
+  telemetry_ingest_max_rows: int = 200_000
+  # Late readings up to this far behind the newest are merged into history
+  telemetry_reorder_seconds: int = 3_600
+  telemetry_rollup_capacity_1m: int = 200_000
+  telemetry_rollup_capacity_1h: int = 200_000
+  telemetry_rollup_capacity_1d: int = 50_000
+  # Durable segments; an empty directory keeps telemetry in memory only
+  telemetry_segment_dir: str = "data/telemetry"
+  telemetry_segment_seconds: int = 3_600
+  telemetry_raw_retention_days: int = 30
+  telemetry_compaction_interval_seconds: float = 3_600.0
 
   # WebSocket broadcasting
   telemetry_channel: str = "telemetry:updates"
   incident_channel: str = "incident:updates"
+  schedule_channel: str = "schedule:updates"
+  network_channel: str = "network:updates"
+  # "memory" for a single worker, "redis" across workers, "socket" for local multi-process tests
+  pubsub_backend: Literal["memory", "redis", "socket"] = "memory"
+  pubsub_socket_address: str = "127.0.0.1:6390"
+  # How long an upload waits for its batch to come back on the telemetry channel and be applied
+  telemetry_apply_timeout_seconds: float = 10.0
+  telemetry_broadcast_interval_seconds: float = 5.0
+  telemetry_replay_frames: int = 720
+  # Per-connection outbound queue; what happens when a client stops reading
+  websocket_queue_frames: int = 32
+  websocket_slow_consumer_policy: Literal["drop_oldest", "coalesce", "disconnect"] = "drop_oldest"
+  websocket_max_missed_frames: int = 120
 
   model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -0,0 +1,85 @@
+"""Fixed-capacity columnar ring buffer shared by the telemetry stores."""
+from __future__ import annotations
+
+from typing import Mapping
+
+import numpy as np
+
+
+class ColumnRing:
+  """Fixed-capacity ring of named NumPy columns addressed by sequence number."""
+
+  def __init__(self, capacity: int, dtypes: Mapping[str, np.dtype]) -> None:
+    if capacity <= 0:
+      raise ValueError("capacity must be positive")
+    self.capacity = capacity
+    self.columns = {name: np.zeros(2 * capacity, dtype=dtype) for name, dtype in dtypes.items()}
+    self.count = 0
+    # Sequence number of the first row ever written; non-zero when restored mid-stream.
+    self.start_seq = 0
+
+  def __len__(self) -> int:
+    return min(self.count - self.start_seq, self.capacity)
+
+  @property
+  def first_seq(self) -> int:
+    return max(self.start_seq, self.count - self.capacity)
+
+  def skip_to(self, seq: int) -> None:
+    """Number the next appended row `seq`; only valid while the ring is empty."""
+    if self.count != self.start_seq:
+      raise ValueError("skip_to requires an empty ring")
+    self.count = self.start_seq = seq
+
+  def append(self, row: Mapping[str, object]) -> int:
+    seq = self.count
+    pos = seq % self.capacity
+    for name, column in self.columns.items():
+      column[pos] = column[pos + self.capacity] = row[name]
+    self.count += 1
+    return seq
+
+  def extend(self, rows: Mapping[str, np.ndarray]) -> range:
+    """Append equal-length column arrays in one vectorized write."""
+    size = len(next(iter(rows.values())))
+    start = self.count
+    skip = max(0, size - self.capacity)
+    positions = (start + skip + np.arange(size - skip)) % self.capacity
+    for name, column in self.columns.items():
+      values = np.asarray(rows[name])[skip:]
+      column[positions] = values
+      column[positions + self.capacity] = values
+    self.count += size
+    return range(start, self.count)
+
+  def replace_from(self, seq: int, rows: Mapping[str, np.ndarray]) -> range:
+    """Overwrite the rows from `seq` on with `rows`, which must be at least as many."""
+    size = len(next(iter(rows.values())))
+    if not self.first_seq <= seq <= self.count or seq + size < self.count:
+      raise ValueError("replace_from must start in the ring and cover every row after it")
+    self.count = seq
+    return self.extend(rows)
+
+  def position(self, seq: int) -> int:
+    return seq % self.capacity
+
+  def get(self, name: str, seq: int):
+    return self.columns[name][seq % self.capacity]
+
+  def set(self, name: str, seq: int, value: object) -> None:
+    pos = seq % self.capacity
+    column = self.columns[name]
+    column[pos] = column[pos + self.capacity] = value
+
+  def window(self, lo_seq: int | None = None, hi_seq: int | None = None) -> dict[str, np.ndarray]:
+    """Column views for retained sequence numbers in `[lo_seq, hi_seq)`."""
+    lo = self.first_seq if lo_seq is None else max(lo_seq, self.first_seq)
+    hi = self.count if hi_seq is None else min(hi_seq, self.count)
+    hi = max(lo, hi)
+    start = lo % self.capacity
+    return {name: column[start:start + hi - lo] for name, column in self.columns.items()}
+
+  def search(self, name: str, value: int, side: str = "left") -> int:
+    """Sequence number where `value` would be inserted into a sorted column."""
+    column = self.window()[name]
+    return self.first_seq + int(np.searchsorted(column, value, side=side))
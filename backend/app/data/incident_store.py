@@ -0,0 +1,134 @@
+"""Incidents indexed by time and by the fields lists filter on.
+
+The primary index is every incident's `(reported_at, id)` key in a sorted
+list. Each of zone, status, severity and type keeps the same keys for each
+of its values, so a filtered listing walks one sorted list of matches
+instead of the whole history. Pages run newest first and resume from a
+cursor naming the last key served, so a page is one binary search and a scan
+of about `limit` keys. With several filters the smallest list is walked and
+the rest are checked per incident.
+
+Replacing an incident or changing its status moves its key between the
+affected lists and leaves the others untouched.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from datetime import timezone
+from typing import Iterator
+
+from app.schemas.water import IncidentReport
+
+# Filterable fields, each with a secondary index.
+INDEXED_FIELDS = ("zone_id", "status", "severity", "type")
+
+Key = tuple[int, str]
+
+
+def _key(incident: IncidentReport) -> Key:
+  reported_at = incident.reported_at
+  if reported_at.tzinfo is None:
+    reported_at = reported_at.replace(tzinfo=timezone.utc)
+  micros = round(reported_at.timestamp() * 1_000_000)
+  return micros, incident.id
+
+
+def encode_cursor(key: Key) -> str:
+  return f"{key[0]}:{key[1]}"
+
+
+def decode_cursor(cursor: str) -> Key:
+  micros, separator, incident_id = cursor.partition(":")
+  if not separator or not incident_id or not micros.lstrip("-").isdigit():
+    raise ValueError(f"Invalid cursor {cursor!r}")
+  return int(micros), incident_id
+
+
+class IncidentStore:
+  def __init__(self, incidents: list[IncidentReport] | None = None) -> None:
+    self._by_id: dict[str, IncidentReport] = {}
+    self._keys: dict[str, Key] = {}
+    self._timeline: list[Key] = []
+    self._indexes: dict[str, dict[str, list[Key]]] = {field: {} for field in INDEXED_FIELDS}
+    for incident in incidents or []:
+      self.put(incident)
+
+  def __len__(self) -> int:
+    return len(self._by_id)
+
+  def __iter__(self) -> Iterator[IncidentReport]:
+    """Oldest first."""
+    return (self._by_id[incident_id] for _, incident_id in self._timeline)
+
+  def get(self, incident_id: str) -> IncidentReport | None:
+    return self._by_id.get(incident_id)
+
+  def put(self, incident: IncidentReport) -> None:
+    """Insert or replace by id, moving the key only in the indexes whose value changed."""
+    previous = self._by_id.get(incident.id)
+    key = _key(incident)
+    if previous is not None and self._keys[incident.id] != key:
+      self._discard(previous, self._keys[incident.id], INDEXED_FIELDS)
+      _remove(self._timeline, self._keys[incident.id])
+      previous = None
+    if previous is None:
+      insort(self._timeline, key)
+      self._add(incident, key, INDEXED_FIELDS)
+    else:
+      changed = [field for field in INDEXED_FIELDS if getattr(previous, field) != getattr(incident, field)]
+      self._discard(previous, key, changed)
+      self._add(incident, key, changed)
+    self._by_id[incident.id] = incident
+    self._keys[incident.id] = key
+
+  def set_status(self, incident_id: str, status: str) -> IncidentReport | None:
+    """Change an incident's status in place."""
+    incident = self._by_id.get(incident_id)
+    if incident is None:
+      return None
+    if incident.status != status:
+      key = self._keys[incident_id]
+      self._discard(incident, key, ("status",))
+      incident.status = status
+      self._add(incident, key, ("status",))
+    return incident
+
+  def _add(self, incident: IncidentReport, key: Key, fields: tuple[str, ...] | list[str]) -> None:
+    for field in fields:
+      insort(self._indexes[field].setdefault(getattr(incident, field), []), key)
+
+  def _discard(self, incident: IncidentReport, key: Key, fields: tuple[str, ...] | list[str]) -> None:
+    for field in fields:
+      value = getattr(incident, field)
+      keys = self._indexes[field][value]
+      _remove(keys, key)
+      if not keys:
+        del self._indexes[field][value]
+
+  def page(self, limit: int | None = None, after: str | None = None, **filters: str | None) -> tuple[list[IncidentReport], str | None]:
+    """Incidents matching every given filter, newest first, and the cursor of the next page.
+
+    `after` is a cursor from a previous page; raises ValueError when it is malformed.
+    """
+    filters = {field: value for field, value in filters.items() if value is not None}
+    unknown = set(filters) - set(INDEXED_FIELDS)
+    if unknown:
+      raise TypeError(f"Cannot filter incidents on {', '.join(sorted(unknown))}")
+    candidates = [self._indexes[field].get(value, []) for field, value in filters.items()]
+    keys = min(candidates, key=len) if candidates else self._timeline
+    position = len(keys) if after is None else bisect_left(keys, decode_cursor(after))
+    checks = [(field, value) for field, value in filters.items() if self._indexes[field].get(value) is not keys]
+    matches: list[IncidentReport] = []
+    while position > 0 and (limit is None or len(matches) < limit):
+      position -= 1
+      incident = self._by_id[keys[position][1]]
+      if all(getattr(incident, field) == value for field, value in checks):
+        matches.append(incident)
+    more = position > 0 and limit is not None and len(matches) == limit
+    return matches, encode_cursor(self._keys[matches[-1].id]) if more else None
+
+
+def _remove(keys: list[Key], key: Key) -> None:
+  i = bisect_left(keys, key)
+  if i < len(keys) and keys[i] == key:
+    del keys[i]
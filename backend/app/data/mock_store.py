@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Final
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Collection, Final
 
 from dateutil import tz
+from pydantic import BaseModel
 
 from app.schemas.water import (
   CitizenReportCreate,
@@ -11,15 +14,25 @@ from app.schemas.water import (
   FairnessMetric,
   IncidentReport,
   PumpSchedule,
+  PumpScheduleCreate,
   PumpStation,
   ReservoirStatus,
   TelemetrySnapshot,
   WaterZone,
 )
+from app.data.incident_store import IncidentStore
+from app.data.schedule_store import ACTIVE_STATUSES, ScheduleConflict, ScheduleStore, optimized_schedule_prefix
+from app.data.telemetry_store import telemetry_store
 
 IST = tz.gettz("Asia/Kolkata")
 UTC = timezone.utc
 
+# Called as listener(kind, item) after every write, e.g. ("incident", IncidentReport).
+StoreListener = Callable[[str, BaseModel], None]
+_listeners: list[StoreListener] = []
+# Writes so far per kind, so readers can tell whether derived results are stale.
+_versions: Counter[str] = Counter()
+
 _zones: Final[list[WaterZone]] = [
   WaterZone(
     id="zone-1",
@@ -107,7 +120,9 @@ _zones: Final[list[WaterZone]] = [
   ),
 ]
 
-_telemetry: Final[list[TelemetrySnapshot]] = [
+_zones_by_id: Final[dict[str, WaterZone]] = {zone.id: zone for zone in _zones}
+
+_telemetry_seed: Final[list[TelemetrySnapshot]] = [
   TelemetrySnapshot(
     timestamp=datetime(2025, 11, 13, 8, 0, tzinfo=UTC),
     flow_ml=42.3,
@@ -131,6 +146,8 @@ _telemetry: Final[list[TelemetrySnapshot]] = [
   ),
 ]
 
+telemetry_store.extend(_telemetry_seed)
+
 _fairness: Final[list[FairnessMetric]] = [
   FairnessMetric(
     timestamp=datetime(2025, 11, 11, tzinfo=UTC),
@@ -155,7 +172,7 @@ _fairness: Final[list[FairnessMetric]] = [
   ),
 ]
 
-_incidents: list[IncidentReport] = [
+_incidents = IncidentStore([
   IncidentReport(
     id="incident-1",
     zone_id="zone-3",
@@ -176,6 +193,7 @@ _incidents: list[IncidentReport] = [
     description="Citizen-reported low pressure on Street 14.",
     reported_at=datetime(2025, 11, 13, 6, 40, tzinfo=UTC),
     status="resolved",
+    resolved_at=datetime(2025, 11, 13, 8, 20, tzinfo=UTC),
     coordinates=(21.2519, 81.6305),
   ),
   IncidentReport(
@@ -189,9 +207,9 @@ _incidents: list[IncidentReport] = [
     status="open",
     coordinates=(21.2445, 81.6662),
   ),
-]
+])
 
-_pump_schedules: list[PumpSchedule] = [
+_pump_schedules = ScheduleStore([
   PumpSchedule(
     id="sched-1",
     pump_id="pump-1",
@@ -222,7 +240,7 @@ _pump_schedules: list[PumpSchedule] = [
     status="scheduled",
     recommendation_reason="AI: Catch up to meet evening demand and reduce leaks.",
   ),
-]
+])
 
 _pump_stations: Final[list[PumpStation]] = [
   PumpStation(
@@ -232,6 +250,7 @@ _pump_stations: Final[list[PumpStation]] = [
     status="operational",
     energy_use_kw=420,
     health_score=0.92,
+    max_flow_lps=450,
   ),
   PumpStation(
     id="pump-2",
@@ -240,6 +259,7 @@ _pump_stations: Final[list[PumpStation]] = [
     status="operational",
     energy_use_kw=365,
     health_score=0.88,
+    max_flow_lps=500,
   ),
   PumpStation(
     id="pump-3",
@@ -248,9 +268,12 @@ _pump_stations: Final[list[PumpStation]] = [
     status="maintenance",
     energy_use_kw=150,
     health_score=0.65,
+    max_flow_lps=380,
   ),
 ]
 
+_pump_stations_by_id: dict[str, PumpStation] = {station.id: station for station in _pump_stations}
+
 _reservoirs: Final[list[ReservoirStatus]] = [
   ReservoirStatus(
     id="reservoir-1",
@@ -270,6 +293,8 @@ _reservoirs: Final[list[ReservoirStatus]] = [
   ),
 ]
 
+_reservoirs_by_id: dict[str, ReservoirStatus] = {reservoir.id: reservoir for reservoir in _reservoirs}
+
 _demand_forecast: list[DemandForecastPoint] = [
   DemandForecastPoint(
     timestamp=datetime(2025, 11, 13, 0, 0, tzinfo=IST),
@@ -302,29 +327,105 @@ _demand_forecast: list[DemandForecastPoint] = [
 ]
 
 
+def add_listener(listener: StoreListener) -> None:
+  _listeners.append(listener)
+
+
+def remove_listener(listener: StoreListener) -> None:
+  if listener in _listeners:
+    _listeners.remove(listener)
+
+
+def _notify(kind: str, item: BaseModel) -> None:
+  _versions[kind] += 1
+  for listener in list(_listeners):
+    listener(kind, item)
+
+
+def store_version(kind: str) -> int:
+  return _versions[kind]
+
+
 def list_zones() -> list[WaterZone]:
   return list(_zones)
 
 
+def get_zone(zone_id: str) -> WaterZone | None:
+  return _zones_by_id.get(zone_id)
+
+
+def known_zone_ids() -> Collection[str]:
+  return _zones_by_id.keys()
+
+
 def latest_telemetry() -> list[TelemetrySnapshot]:
-  return list(_telemetry)
+  return telemetry_store.latest_per_zone()
 
 
 def list_fairness_metrics() -> list[FairnessMetric]:
   return list(_fairness)
 
 
+def replace_fairness_metrics(metrics: list[FairnessMetric]) -> None:
+  """Swap in a freshly computed fairness history, oldest first."""
+  _fairness[:] = metrics
+  if metrics:
+    _notify("fairness", metrics[-1])
+
+
+def update_zone_fairness(zone_id: str, fairness_score: float, supply_hours_per_day: float, updated_at: datetime) -> WaterZone | None:
+  zone = _zones_by_id.get(zone_id)
+  if zone is None:
+    return None
+  if zone.fairness_score != fairness_score or zone.supply_hours_per_day != supply_hours_per_day:
+    zone.fairness_score = fairness_score
+    zone.supply_hours_per_day = supply_hours_per_day
+    zone.last_updated = updated_at
+    _notify("zone", zone)
+  return zone
+
+
 def list_incidents(zone_id: str | None = None, status: str | None = None) -> list[IncidentReport]:
-  incidents = _incidents
-  if zone_id:
-    incidents = [incident for incident in incidents if incident.zone_id == zone_id]
-  if status:
-    incidents = [incident for incident in incidents if incident.status == status]
-  return list(incidents)
+  """Every matching incident, newest first."""
+  return _incidents.page(zone_id=zone_id, status=status)[0]
+
+
+def page_incidents(
+  limit: int,
+  after: str | None = None,
+  zone_id: str | None = None,
+  status: str | None = None,
+  severity: str | None = None,
+  type: str | None = None,
+) -> tuple[list[IncidentReport], str | None]:
+  """Up to `limit` matching incidents older than the `after` cursor, newest first, and the next cursor."""
+  return _incidents.page(limit, after, zone_id=zone_id, status=status, severity=severity, type=type)
+
+
+def get_incident(incident_id: str) -> IncidentReport | None:
+  return _incidents.get(incident_id)
+
+
+def update_incident_status(incident_id: str, status: str) -> IncidentReport | None:
+  incident = _incidents.get(incident_id)
+  if incident is None:
+    return None
+  if incident.status != status:
+    incident.resolved_at = datetime.now(tz=UTC) if status == "resolved" else None
+    _incidents.set_status(incident_id, status)
+  _notify("incident", incident)
+  return incident
 
 
 def upsert_citizen_incident(payload: CitizenReportCreate) -> IncidentReport:
-  incident_id = f"citizen-{len(_incidents) + 1}"
+  """Store a report whose `zone_id` is resolved; reports without a location are placed at the zone centroid."""
+  # Random suffix so ids stay unique when several workers accept reports.
+  incident_id = f"citizen-{uuid.uuid4().hex[:8]}"
+  if payload.latitude is not None and payload.longitude is not None:
+    coordinates = (payload.latitude, payload.longitude)
+  else:
+    zone = _zones_by_id[payload.zone_id]
+    coordinates = (zone.centroid_latitude, zone.centroid_longitude)
   incident = IncidentReport(
     id=incident_id,
     zone_id=payload.zone_id,
@@ -334,9 +435,27 @@ def upsert_citizen_incident(payload: CitizenReportCreate) -> IncidentReport:
     description=payload.description,
     reported_at=datetime.now(tz=UTC),
     status="open",
-    coordinates=(21.251, 81.63),
+    coordinates=coordinates,
   )
-  _incidents.append(incident)
+  _incidents.put(incident)
+  _notify("incident", incident)
+  return incident
+
+
+def add_incident_reporter(incident_id: str) -> IncidentReport | None:
+  """Count one more citizen report of an existing incident."""
+  incident = _incidents.get(incident_id)
+  if incident is None:
+    return None
+  incident.reporter_count += 1
+  _notify("incident", incident)
+  return incident
+
+
+def apply_incident(incident: IncidentReport) -> IncidentReport:
+  """Insert or replace an incident by id (used for replicated writes)."""
+  _incidents.put(incident)
+  _notify("incident", incident)
   return incident
 
 
@@ -344,22 +463,145 @@ def list_pump_schedules() -> list[PumpSchedule]:
   return list(_pump_schedules)
 
 
+def get_pump_schedule(schedule_id: str) -> PumpSchedule | None:
+  return _pump_schedules.get(schedule_id)
+
+
+def query_pump_schedules(
+  since: datetime | None = None,
+  until: datetime | None = None,
+  pump_id: str | None = None,
+  zone_id: str | None = None,
+) -> list[PumpSchedule]:
+  """Schedules overlapping `[since, until)`, ordered by start time."""
+  return _pump_schedules.in_range(since, until, pump_id, zone_id)
+
+
+def running_pump_schedules(moment: datetime, pump_id: str | None = None, zone_id: str | None = None) -> list[PumpSchedule]:
+  return _pump_schedules.running_at(moment, pump_id, zone_id)
+
+
+def pump_schedule_conflicts(schedule: PumpSchedule, ignore: Collection[str] = ()) -> list[str]:
+  """Why `schedule` cannot run as planned: pump capacity or overlapping active schedules."""
+  if schedule.status not in ACTIVE_STATUSES:
+    return []
+  return _pump_schedules.conflicts(schedule, get_pump_station(schedule.pump_id), ignore)
+
+
+def new_pump_schedule(payload: PumpScheduleCreate) -> PumpSchedule:
+  """An unsaved `scheduled` run; store it with `apply_pump_schedule`."""
+  # Random suffix so ids stay unique when several workers accept schedules.
+  return PumpSchedule(id=f"sched-{uuid.uuid4().hex[:8]}", status="scheduled", **payload.model_dump())
+
+
 def approve_pump_schedule(schedule_id: str) -> PumpSchedule | None:
-  for schedule in _pump_schedules:
-    if schedule.id == schedule_id:
-      schedule.status = "running"
-      return schedule
-  return None
+  """Start a stored schedule; raises ScheduleConflict when it cannot run alongside the others."""
+  schedule = _pump_schedules.get(schedule_id)
+  if schedule is None:
+    return None
+  conflicts = pump_schedule_conflicts(schedule.model_copy(update={"status": "running"}))
+  if conflicts:
+    raise ScheduleConflict(conflicts)
+  schedule.status = "running"
+  _notify("schedule", schedule)
+  return schedule
+
+
+def apply_pump_schedule(schedule: PumpSchedule) -> PumpSchedule:
+  """Insert or replace a pump schedule by id, also for replicated writes.
+
+  Raises ScheduleConflict, storing nothing, when an active schedule exceeds
+  its pump or overlaps another active one on it.
+  """
+  conflicts = pump_schedule_conflicts(schedule)
+  if conflicts:
+    raise ScheduleConflict(conflicts)
+  _pump_schedules.put(schedule)
+  _notify("schedule", schedule)
+  return schedule
+
+
+def remove_pump_schedule(schedule_id: str) -> PumpSchedule | None:
+  """Delete a pump schedule by id, also for replicated deletes."""
+  schedule = _pump_schedules.remove(schedule_id)
+  if schedule is not None:
+    _notify("schedule_removed", schedule)
+  return schedule
+
+
+def optimized_pump_schedules(day: date) -> list[PumpSchedule]:
+  """The optimizer's stored plan for the UTC `day`."""
+  midnight = datetime(day.year, day.month, day.day, tzinfo=UTC)
+  prefix = optimized_schedule_prefix(day)
+  return [
+    schedule for schedule in _pump_schedules.in_range(midnight, midnight + timedelta(days=1))
+    if schedule.id.startswith(prefix)
+  ]
+
+
+def replace_optimized_pump_schedules(day: date, schedules: list[PumpSchedule]) -> list[PumpSchedule]:
+  """Store a new optimizer plan for `day` in place of the previous one.
+
+  Raises ScheduleConflict, changing nothing, when a run of the previous plan
+  was already approved or a new run cannot be active alongside the other
+  schedules. The previous runs are deleted before the new ones are stored,
+  so workers applying the replicated writes in order never see both plans.
+  """
+  previous = optimized_pump_schedules(day)
+  approved = [f"{schedule.id} is already {schedule.status}" for schedule in previous if schedule.status != "scheduled"]
+  if approved:
+    raise ScheduleConflict(approved)
+  replaced = {schedule.id for schedule in previous}
+  conflicts = [reason for schedule in schedules for reason in pump_schedule_conflicts(schedule, replaced)]
+  if conflicts:
+    raise ScheduleConflict(conflicts)
+  for schedule in previous:
+    remove_pump_schedule(schedule.id)
+  for schedule in schedules:
+    apply_pump_schedule(schedule)
+  return schedules
 
 
 def list_pump_stations() -> list[PumpStation]:
   return list(_pump_stations)
 
 
+def get_pump_station(pump_id: str) -> PumpStation | None:
+  return _pump_stations_by_id.get(pump_id)
+
+
+def apply_pump_station(station: PumpStation) -> PumpStation:
+  """Insert or replace a pump station by id."""
+  existing = _pump_stations_by_id.get(station.id)
+  if existing is None:
+    _pump_stations.append(station)
+  else:
+    _pump_stations[_pump_stations.index(existing)] = station
+  _pump_stations_by_id[station.id] = station
+  _notify("station", station)
+  return station
+
+
 def list_reservoirs() -> list[ReservoirStatus]:
   return list(_reservoirs)
 
 
+def get_reservoir(reservoir_id: str) -> ReservoirStatus | None:
+  return _reservoirs_by_id.get(reservoir_id)
+
+
+def apply_reservoir(reservoir: ReservoirStatus) -> ReservoirStatus:
+  """Insert or replace a reservoir by id."""
+  existing = _reservoirs_by_id.get(reservoir.id)
+  if existing is None:
+    _reservoirs.append(reservoir)
+  else:
+    _reservoirs[_reservoirs.index(existing)] = reservoir
+  _reservoirs_by_id[reservoir.id] = reservoir
+  _notify("reservoir", reservoir)
+  return reservoir
+
+
 def list_demand_forecast() -> list[DemandForecastPoint]:
   return list(_demand_forecast)
 
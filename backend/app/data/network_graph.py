@@ -0,0 +1,152 @@
+"""Hydraulic network topology indexed in both directions.
+
+Reservoirs, pumps and zones are nodes; edges follow water downstream
+(`ReservoirStatus.pumps_connected`, then `PumpStation.connected_zones`). Edges
+live in per-node lists that a station or reservoir update patches in place,
+and are compiled into CSR arrays (`indptr`/`indices`, downstream and
+upstream) on the first query after a change, so neighbour lookups cost
+O(degree).
+"""
+from __future__ import annotations
+
+from typing import Iterable, Sequence
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.data import mock_store
+from app.schemas.water import NetworkNodeKind as NodeKind, PumpStation, ReservoirStatus, WaterZone
+
+
+class Csr:
+  """Compressed sparse rows: the neighbours of node `n` are `indices[indptr[n]:indptr[n + 1]]`."""
+
+  def __init__(self, indptr: np.ndarray, indices: np.ndarray) -> None:
+    self.indptr = indptr
+    self.indices = indices
+
+  @classmethod
+  def from_lists(cls, lists: Sequence[Sequence[int]]) -> Csr:
+    lengths = np.fromiter((len(row) for row in lists), dtype=np.int64, count=len(lists))
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.fromiter((n for row in lists for n in row), dtype=np.int32, count=int(indptr[-1]))
+    return cls(indptr, indices)
+
+  def transpose(self, nodes: int) -> Csr:
+    sources = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+    order = np.argsort(self.indices, kind="stable")
+    indptr = np.zeros(nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(self.indices, minlength=nodes), out=indptr[1:])
+    return Csr(indptr, sources[order])
+
+  def neighbours(self, node: int) -> np.ndarray:
+    return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+
+class NetworkGraph:
+  def __init__(self) -> None:
+    self._index: dict[tuple[NodeKind, str], int] = {}
+    self._kinds: list[NodeKind] = []
+    self._ids: list[str] = []
+    self._names: list[str] = []
+    self._out: list[list[int]] = []
+    self._downstream: Csr | None = None
+    self._upstream: Csr | None = None
+    self.version = 0
+
+  @classmethod
+  def build(
+    cls,
+    zones: Iterable[WaterZone],
+    stations: Iterable[PumpStation],
+    reservoirs: Iterable[ReservoirStatus],
+  ) -> NetworkGraph:
+    graph = cls()
+    for zone in zones:
+      graph.set_zone(zone)
+    for station in stations:
+      graph.set_station(station)
+    for reservoir in reservoirs:
+      graph.set_reservoir(reservoir)
+    return graph
+
+  def __len__(self) -> int:
+    return len(self._ids)
+
+  def node(self, kind: NodeKind, node_id: str) -> int | None:
+    return self._index.get((kind, node_id))
+
+  def kind(self, node: int) -> NodeKind:
+    return self._kinds[node]
+
+  def node_id(self, node: int) -> str:
+    return self._ids[node]
+
+  def name(self, node: int) -> str:
+    return self._names[node]
+
+  def set_station(self, station: PumpStation) -> None:
+    self._set_edges(self._node("pump", station.id, station.name), "zone", station.connected_zones)
+
+  def set_reservoir(self, reservoir: ReservoirStatus) -> None:
+    self._set_edges(self._node("reservoir", reservoir.id, reservoir.name), "pump", reservoir.pumps_connected)
+
+  def set_zone(self, zone: WaterZone) -> None:
+    self._node("zone", zone.id, zone.name)
+
+  def on_store_write(self, kind: str, item: BaseModel) -> None:
+    if kind == "station":
+      self.set_station(item)
+    elif kind == "reservoir":
+      self.set_reservoir(item)
+    elif kind == "zone":
+      self.set_zone(item)
+
+  def downstream(self, node: int) -> np.ndarray:
+    return self._compiled()[0].neighbours(node)
+
+  def upstream(self, node: int) -> np.ndarray:
+    return self._compiled()[1].neighbours(node)
+
+  def downstream_ids(self, kind: NodeKind, node_id: str) -> list[str]:
+    node = self.node(kind, node_id)
+    return [] if node is None else [self._ids[n] for n in self.downstream(node).tolist()]
+
+  def upstream_ids(self, kind: NodeKind, node_id: str) -> list[str]:
+    node = self.node(kind, node_id)
+    return [] if node is None else [self._ids[n] for n in self.upstream(node).tolist()]
+
+  def _node(self, kind: NodeKind, node_id: str, name: str | None = None) -> int:
+    node = self._index.get((kind, node_id))
+    if node is None:
+      node = len(self._ids)
+      self._index[(kind, node_id)] = node
+      self._kinds.append(kind)
+      self._ids.append(node_id)
+      self._names.append(name or node_id)
+      self._out.append([])
+      self._invalidate()
+    elif name is not None:
+      self._names[node] = name
+    return node
+
+  def _set_edges(self, node: int, target_kind: NodeKind, target_ids: Iterable[str]) -> None:
+    targets = list(dict.fromkeys(self._node(target_kind, target_id) for target_id in target_ids))
+    if targets != self._out[node]:
+      self._out[node] = targets
+      self._invalidate()
+
+  def _invalidate(self) -> None:
+    self._downstream = self._upstream = None
+    self.version += 1
+
+  def _compiled(self) -> tuple[Csr, Csr]:
+    if self._downstream is None or self._upstream is None:
+      self._downstream = Csr.from_lists(self._out)
+      self._upstream = self._downstream.transpose(len(self._ids))
+    return self._downstream, self._upstream
+
+
+network_graph = NetworkGraph.build(mock_store.list_zones(), mock_store.list_pump_stations(), mock_store.list_reservoirs())
+mock_store.add_listener(network_graph.on_store_write)
@@ -0,0 +1,172 @@
+"""Pump schedules indexed by pump and zone for time queries.
+
+Each pump and each zone keeps its schedules as sorted interval arrays:
+parallel start, end and id lists ordered by start, plus the sorted lengths
+of the intervals it holds, the last being the longest. A schedule overlaps
+`[lo, hi)` only if it starts after `lo - longest` and before `hi`, so a query
+is two binary searches and a scan of that slice. "What is running at t" is
+the same query with `hi = t + 1`. Inserting or removing is a few binary
+searches and list inserts, and removing the longest interval shrinks the
+scan again, so a year of schedules for hundreds of pumps stays within
+milliseconds per query.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime
+from typing import Collection, Iterator
+
+from app.data.telemetry_store import to_epoch
+from app.schemas.water import PumpSchedule, PumpStation
+
+# Schedules that still occupy their pump; completed and paused runs do not conflict.
+ACTIVE_STATUSES = ("scheduled", "running")
+
+
+def optimized_schedule_prefix(day: date) -> str:
+  """Id prefix of the optimizer's runs for `day`, one per pump and zone."""
+  return f"opt-{day:%Y%m%d}-"
+
+
+class ScheduleConflict(ValueError):
+  """A schedule cannot be stored as it is; `reasons` says why."""
+
+  def __init__(self, reasons: list[str]) -> None:
+    super().__init__("; ".join(reasons))
+    self.reasons = reasons
+
+
+class IntervalList:
+  """Half-open `[start, end)` intervals sorted by start."""
+
+  def __init__(self) -> None:
+    self.starts: list[int] = []
+    self.ends: list[int] = []
+    self.ids: list[str] = []
+    self._lengths: list[int] = []
+
+  def __len__(self) -> int:
+    return len(self.ids)
+
+  @property
+  def longest(self) -> int:
+    return self._lengths[-1] if self._lengths else 0
+
+  def add(self, interval_id: str, start: int, end: int) -> None:
+    i = bisect_right(self.starts, start)
+    self.starts.insert(i, start)
+    self.ends.insert(i, end)
+    self.ids.insert(i, interval_id)
+    insort(self._lengths, end - start)
+
+  def remove(self, interval_id: str, start: int) -> None:
+    lo, hi = bisect_left(self.starts, start), bisect_right(self.starts, start)
+    for i in range(lo, hi):
+      if self.ids[i] == interval_id:
+        del self._lengths[bisect_left(self._lengths, self.ends[i] - start)]
+        del self.starts[i], self.ends[i], self.ids[i]
+        return
+
+  def overlapping(self, lo: int, hi: int) -> list[str]:
+    """Ids of intervals overlapping `[lo, hi)`, ordered by start."""
+    first = bisect_right(self.starts, lo - self.longest)
+    last = bisect_left(self.starts, hi)
+    return [self.ids[i] for i in range(first, last) if self.ends[i] > lo]
+
+
+class ScheduleStore:
+  def __init__(self, schedules: list[PumpSchedule] | None = None) -> None:
+    self._by_id: dict[str, PumpSchedule] = {}
+    self._spans: dict[str, tuple[int, int]] = {}
+    self._by_pump: dict[str, IntervalList] = {}
+    self._by_zone: dict[str, IntervalList] = {}
+    for schedule in schedules or []:
+      self.put(schedule)
+
+  def __len__(self) -> int:
+    return len(self._by_id)
+
+  def __iter__(self) -> Iterator[PumpSchedule]:
+    return iter(self._by_id.values())
+
+  def get(self, schedule_id: str) -> PumpSchedule | None:
+    return self._by_id.get(schedule_id)
+
+  def put(self, schedule: PumpSchedule) -> None:
+    """Insert or replace by id; a replacement keeps its place in insertion order."""
+    previous = self._by_id.get(schedule.id)
+    if previous is not None:
+      self._unindex(previous)
+    start, end = to_epoch(schedule.start_time_utc), to_epoch(schedule.end_time_utc)
+    self._by_id[schedule.id] = schedule
+    self._spans[schedule.id] = (start, end)
+    self._by_pump.setdefault(schedule.pump_id, IntervalList()).add(schedule.id, start, end)
+    self._by_zone.setdefault(schedule.zone_id, IntervalList()).add(schedule.id, start, end)
+
+  def remove(self, schedule_id: str) -> PumpSchedule | None:
+    schedule = self._by_id.pop(schedule_id, None)
+    if schedule is not None:
+      self._unindex(schedule)
+      del self._spans[schedule_id]
+    return schedule
+
+  def _unindex(self, schedule: PumpSchedule) -> None:
+    start, _ = self._spans[schedule.id]
+    self._by_pump[schedule.pump_id].remove(schedule.id, start)
+    self._by_zone[schedule.zone_id].remove(schedule.id, start)
+
+  def in_range(
+    self,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    pump_id: str | None = None,
+    zone_id: str | None = None,
+  ) -> list[PumpSchedule]:
+    """Schedules overlapping `[since, until)`, ordered by start time."""
+    lo = to_epoch(since) if since is not None else -(2**62)
+    hi = to_epoch(until) if until is not None else 2**62
+    return self._overlapping(lo, hi, pump_id, zone_id)
+
+  def _overlapping(self, lo: int, hi: int, pump_id: str | None, zone_id: str | None) -> list[PumpSchedule]:
+    if pump_id is not None:
+      indexes = [self._by_pump[pump_id]] if pump_id in self._by_pump else []
+    elif zone_id is not None:
+      indexes = [self._by_zone[zone_id]] if zone_id in self._by_zone else []
+    else:
+      indexes = list(self._by_pump.values())
+    matches = [self._by_id[schedule_id] for index in indexes for schedule_id in index.overlapping(lo, hi)]
+    if pump_id is not None and zone_id is not None:
+      matches = [schedule for schedule in matches if schedule.zone_id == zone_id]
+    if len(indexes) > 1:
+      matches.sort(key=lambda schedule: self._spans[schedule.id][0])
+    return matches
+
+  def running_at(self, moment: datetime, pump_id: str | None = None, zone_id: str | None = None) -> list[PumpSchedule]:
+    """Active schedules whose interval contains `moment`."""
+    t = to_epoch(moment)
+    return [
+      schedule
+      for schedule in self._overlapping(t, t + 1, pump_id, zone_id)
+      if schedule.status in ACTIVE_STATUSES
+    ]
+
+  def conflicts(self, schedule: PumpSchedule, station: PumpStation | None, ignore: Collection[str] = ()) -> list[str]:
+    """Reasons `schedule` cannot be active alongside the stored schedules but `ignore`; empty when it can."""
+    reasons = []
+    if station is None:
+      return [f"Unknown pump {schedule.pump_id}"]
+    if schedule.flow_rate_lps > station.max_flow_lps:
+      reasons.append(
+        f"Flow rate {schedule.flow_rate_lps:g} l/s exceeds {station.id} capacity of {station.max_flow_lps:g} l/s"
+      )
+    index = self._by_pump.get(schedule.pump_id)
+    if index is not None:
+      start, end = to_epoch(schedule.start_time_utc), to_epoch(schedule.end_time_utc)
+      for other_id in index.overlapping(start, end):
+        other = self._by_id[other_id]
+        if other_id != schedule.id and other_id not in ignore and other.status in ACTIVE_STATUSES:
+          reasons.append(
+            f"Overlaps {other_id} on {schedule.pump_id} "
+            f"({other.start_time_utc.isoformat()} to {other.end_time_utc.isoformat()})"
+          )
+    return reasons
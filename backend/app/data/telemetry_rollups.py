@@ -0,0 +1,219 @@
+"""Incremental per-zone rollup tiers for telemetry history.
+
+Each tier buckets readings into fixed-width windows (1 minute, 1 hour, 1 day)
+and keeps count, sum, min and max of every metric per zone and bucket. Tiers
+are updated from the same time-ordered column batches the raw store receives,
+so usually only the currently open bucket of each zone is rewritten. Late
+readings merge into the existing row of their older bucket; a zone without
+one gets a row inserted at the end of that bucket.
+"""
+from __future__ import annotations
+
+from typing import Mapping
+
+import numpy as np
+
+from app.data.columns import ColumnRing
+
+ROLLUP_METRICS = ("flow_ml", "pressure_psi", "energy_kw")
+
+ROLLUP_COLUMNS: Mapping[str, np.dtype] = {
+  "bucket": np.dtype(np.int64),
+  "zone": np.dtype(np.int32),
+  "count": np.dtype(np.int64),
+  **{f"{metric}_{stat}": np.dtype(np.float64) for metric in ROLLUP_METRICS for stat in ("sum", "min", "max")},
+}
+
+ROLLUP_RESOLUTIONS: Mapping[str, int] = {"1m": 60, "1h": 3_600, "1d": 86_400}
+
+
+def rollup_groups(columns: Mapping[str, np.ndarray], width_seconds: int) -> dict[str, np.ndarray]:
+  """Rollup rows, ordered by (bucket, zone), for a batch of raw reading columns."""
+  buckets = columns["timestamp"] // width_seconds * width_seconds
+  zones = columns["zone"]
+  order = np.lexsort((zones, buckets))
+  buckets, zones = buckets[order], zones[order]
+  starts = _group_starts(buckets, zones)
+  groups: dict[str, np.ndarray] = {
+    "bucket": buckets[starts],
+    "zone": zones[starts].astype(np.int32),
+    "count": np.diff(np.r_[starts, len(buckets)]),
+  }
+  for metric in ROLLUP_METRICS:
+    values = columns[metric][order].astype(np.float64)
+    groups[f"{metric}_sum"] = np.add.reduceat(values, starts)
+    groups[f"{metric}_min"] = np.minimum.reduceat(values, starts)
+    groups[f"{metric}_max"] = np.maximum.reduceat(values, starts)
+  return groups
+
+
+def coarsen(rows: Mapping[str, np.ndarray], width_seconds: int) -> dict[str, np.ndarray]:
+  """Merge rollup rows into wider buckets (e.g. hourly rows into daily ones)."""
+  if not len(rows["bucket"]):
+    return {name: np.asarray(rows[name])[:0] for name in ROLLUP_COLUMNS}
+  buckets = rows["bucket"] // width_seconds * width_seconds
+  zones = rows["zone"]
+  order = np.lexsort((zones, buckets))
+  buckets, zones = buckets[order], zones[order]
+  starts = _group_starts(buckets, zones)
+  merged: dict[str, np.ndarray] = {
+    "bucket": buckets[starts],
+    "zone": zones[starts].astype(np.int32),
+    "count": np.add.reduceat(rows["count"][order], starts),
+  }
+  for metric in ROLLUP_METRICS:
+    for stat, op in (("sum", np.add), ("min", np.minimum), ("max", np.maximum)):
+      name = f"{metric}_{stat}"
+      merged[name] = op.reduceat(rows[name][order], starts)
+  return merged
+
+
+def _group_starts(buckets: np.ndarray, zones: np.ndarray) -> np.ndarray:
+  return np.flatnonzero(np.r_[True, (buckets[1:] != buckets[:-1]) | (zones[1:] != zones[:-1])])
+
+
+class RollupTier:
+  """Rollup rows ordered by bucket start, one row per (bucket, zone)."""
+
+  def __init__(self, name: str, width_seconds: int, capacity: int) -> None:
+    self.name = name
+    self.width_seconds = width_seconds
+    self.ring = ColumnRing(capacity, ROLLUP_COLUMNS)
+    self._open_bucket: int | None = None
+    self._open_rows: dict[int, int] = {}
+
+  def __len__(self) -> int:
+    return len(self.ring)
+
+  @property
+  def open_bucket(self) -> int | None:
+    """Start of the newest bucket, the only one that can still receive readings."""
+    return self._open_bucket
+
+  def reset(self) -> None:
+    self.ring = ColumnRing(self.ring.capacity, ROLLUP_COLUMNS)
+    self._open_bucket = None
+    self._open_rows = {}
+
+  def load(self, rows: Mapping[str, np.ndarray]) -> None:
+    """Append finished rollup rows ordered by (bucket, zone), e.g. restored from disk."""
+    if not len(rows["bucket"]):
+      return
+    seqs = self.ring.extend(rows)
+    last_bucket = int(rows["bucket"][-1])
+    in_last = np.flatnonzero(rows["bucket"] == last_bucket)
+    self._open_bucket = last_bucket
+    self._open_rows = {
+      zone: seqs.start + index for zone, index in zip(rows["zone"][in_last].tolist(), in_last.tolist())
+    }
+
+  def update(self, columns: Mapping[str, np.ndarray]) -> None:
+    """Fold a time-ordered batch of raw readings into this tier."""
+    if not len(columns["timestamp"]):
+      return
+    groups = rollup_groups(columns, self.width_seconds)
+    if self._open_bucket is not None and groups["bucket"][0] < self._open_bucket:
+      late = groups["bucket"] < self._open_bucket
+      self._update_late({name: values[late] for name, values in groups.items()})
+      groups = {name: values[~late] for name, values in groups.items()}
+      if not len(groups["bucket"]):
+        return
+
+    # Groups in the still-open bucket merge into rows that already exist.
+    fresh = np.ones(len(groups["bucket"]), dtype=bool)
+    if self._open_bucket is not None:
+      in_open = np.flatnonzero(groups["bucket"] == self._open_bucket)
+      first_live = self.ring.first_seq
+      merge_groups = [
+        g for g in in_open.tolist()
+        if self._open_rows.get(int(groups["zone"][g]), -1) >= first_live
+      ]
+      if merge_groups:
+        self._merge(groups, np.array(merge_groups))
+        fresh[merge_groups] = False
+
+    if fresh.any():
+      seqs = self.ring.extend({name: values[fresh] for name, values in groups.items()})
+      last_bucket = int(groups["bucket"][-1])
+      if last_bucket != self._open_bucket:
+        self._open_bucket = last_bucket
+        self._open_rows = {}
+      new_zones = groups["zone"][fresh].tolist()
+      new_buckets = groups["bucket"][fresh].tolist()
+      for seq, zone, bucket in zip(seqs, new_zones, new_buckets):
+        if bucket == last_bucket:
+          self._open_rows[zone] = seq
+
+  def _update_late(self, groups: Mapping[str, np.ndarray]) -> None:
+    """Fold groups from buckets before the open one into their retained rows."""
+    lo, hi = self.span(int(groups["bucket"][0]), int(groups["bucket"][-1]) + 1)
+    retained = self.ring.window(lo, hi)
+    rows = {
+      (bucket, zone): lo + offset
+      for offset, (bucket, zone) in enumerate(zip(retained["bucket"].tolist(), retained["zone"].tolist()))
+    }
+    seqs = [rows.get(key, -1) for key in zip(groups["bucket"].tolist(), groups["zone"].tolist())]
+    existing = np.flatnonzero(np.array(seqs) >= 0)
+    if len(existing):
+      self._merge(groups, existing, np.array(seqs, dtype=np.int64)[existing])
+    missing = np.flatnonzero(np.array(seqs) < 0)
+    if not len(missing):
+      return
+    # Rows after the first missing bucket shift up; the stable sort keeps each bucket's rows in place.
+    start = self.ring.search("bucket", int(groups["bucket"][missing[0]]), side="right")
+    tail = self.ring.window(start, None)
+    merged = {name: np.concatenate([tail[name], groups[name][missing]]) for name in ROLLUP_COLUMNS}
+    order = np.argsort(merged["bucket"], kind="stable")
+    self.ring.replace_from(start, {name: values[order] for name, values in merged.items()})
+    open_lo = self.ring.search("bucket", self._open_bucket)
+    zones = self.ring.window(open_lo, None)["zone"].tolist()
+    self._open_rows = {zone: open_lo + offset for offset, zone in enumerate(zones)}
+
+  def _merge(self, groups: Mapping[str, np.ndarray], indexes: np.ndarray, seqs: np.ndarray | None = None) -> None:
+    ring = self.ring
+    if seqs is None:
+      seqs = np.array([self._open_rows[int(zone)] for zone in groups["zone"][indexes]], dtype=np.int64)
+    positions = seqs % ring.capacity
+    for name, combine in (("count", np.add), *(
+      (f"{metric}_{stat}", op)
+      for metric in ROLLUP_METRICS
+      for stat, op in (("sum", np.add), ("min", np.minimum), ("max", np.maximum))
+    )):
+      column = ring.columns[name]
+      merged = combine(column[positions], groups[name][indexes])
+      column[positions] = merged
+      column[positions + ring.capacity] = merged
+
+  def span(self, since: int | None, until: int | None) -> tuple[int, int]:
+    """Sequence range of rows whose bucket overlaps `[since, until)`."""
+    lo = self.ring.first_seq
+    if since is not None:
+      lo = self.ring.search("bucket", since // self.width_seconds * self.width_seconds)
+    hi = self.ring.count if until is None else self.ring.search("bucket", until)
+    return lo, max(lo, hi)
+
+  def window(self, since: int | None, until: int | None) -> dict[str, np.ndarray]:
+    return self.ring.window(*self.span(since, until))
+
+
+class TelemetryRollups:
+  """The 1 minute, 1 hour and 1 day tiers, finest first."""
+
+  def __init__(self, capacities: Mapping[str, int]) -> None:
+    self.tiers = [
+      RollupTier(name, width, capacities[name]) for name, width in ROLLUP_RESOLUTIONS.items()
+    ]
+
+  def reset(self) -> None:
+    for tier in self.tiers:
+      tier.reset()
+
+  def tier(self, name: str) -> RollupTier:
+    for tier in self.tiers:
+      if tier.name == name:
+        return tier
+    raise KeyError(name)
+
+  def update(self, columns: Mapping[str, np.ndarray]) -> None:
+    for tier in self.tiers:
+      tier.update(columns)
@@ -0,0 +1,342 @@
+"""Durable telemetry: fixed-width binary segment files rolled by time.
+
+Every reading the store accepts is appended to the segment covering its
+timestamp (`telemetry-<start>-<first_seq>.seg`, one per `segment_seconds`).
+Records are fixed-width little-endian structs behind a small header, so a
+segment is read back with `np.memmap` and no parse step. When a segment is
+sealed its hourly rollups are written next to it (`.1h.npy`); finished days
+are folded into `rollup-1d.npy`, and segments past the raw retention window
+are deleted by `compact`. Zone codes used in the records are persisted in
+`zones.json`.
+
+Only one process writes a directory (guarded by an exclusive file lock); other
+workers apply the same replicated telemetry and open the log read-only.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Mapping
+
+import numpy as np
+
+try:
+  import fcntl
+except ImportError:  # Windows
+  fcntl = None
+  import msvcrt
+
+from app.data.telemetry_rollups import ROLLUP_COLUMNS, coarsen, rollup_groups
+
+SEGMENT_MAGIC = b"FWTS"
+SEGMENT_VERSION = 1
+DAY_SECONDS = 86_400
+HOUR_SECONDS = 3_600
+
+# Packed, little-endian, 28 bytes per reading; `zone` is the store's interned zone code.
+SEGMENT_RECORD = np.dtype([
+  ("timestamp", "<i8"),
+  ("zone", "<i4"),
+  ("flow_ml", "<f4"),
+  ("pressure_psi", "<f4"),
+  ("energy_kw", "<f4"),
+  ("incidents_today", "<i4"),
+])
+
+ROLLUP_RECORD = np.dtype([(name, dtype.newbyteorder("<")) for name, dtype in ROLLUP_COLUMNS.items()])
+
+# magic, version, record size, segment start (epoch seconds), sequence number of the first record
+_HEADER = struct.Struct("<4sHHqq")
+_SEGMENT_NAME = re.compile(r"telemetry-(\d+)-(\d+)\.seg$")
+
+
+@dataclass
+class Segment:
+  path: Path
+  start: int
+  first_seq: int
+  rows: int
+
+  @property
+  def end_seq(self) -> int:
+    return self.first_seq + self.rows
+
+  @property
+  def rollup_path(self) -> Path:
+    return self.path.with_suffix(".1h.npy")
+
+  def records(self) -> np.ndarray:
+    """The segment's records as a read-only memory map (empty array when empty)."""
+    if not self.rows:
+      return np.zeros(0, dtype=SEGMENT_RECORD)
+    return np.memmap(self.path, dtype=SEGMENT_RECORD, mode="r", offset=_HEADER.size, shape=(self.rows,))
+
+
+def _empty_rollups() -> dict[str, np.ndarray]:
+  return {name: np.zeros(0, dtype=dtype) for name, dtype in ROLLUP_COLUMNS.items()}
+
+
+def _concat(parts: list[Mapping[str, np.ndarray]], names) -> dict[str, np.ndarray]:
+  return {name: np.concatenate([part[name] for part in parts]) for name in names}
+
+
+def _from_records(records: np.ndarray) -> dict[str, np.ndarray]:
+  return {name: np.asarray(records[name]) for name in SEGMENT_RECORD.names}
+
+
+def _try_lock(handle: BinaryIO) -> bool:
+  try:
+    if fcntl is not None:
+      fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+      msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+  except OSError:
+    return False
+  return True
+
+
+def _write_atomic(path: Path, write) -> None:
+  tmp = path.with_name(path.name + ".tmp")
+  with open(tmp, "wb") as handle:
+    write(handle)
+    handle.flush()
+    os.fsync(handle.fileno())
+  os.replace(tmp, path)
+
+
+class SegmentLog:
+  """Append-only telemetry segments in one directory, addressed by store sequence number."""
+
+  def __init__(self, directory: str | Path, segment_seconds: int = HOUR_SECONDS) -> None:
+    if segment_seconds <= 0 or DAY_SECONDS % segment_seconds:
+      raise ValueError("segment_seconds must divide one day")
+    self.directory = Path(directory)
+    self.segment_seconds = segment_seconds
+    self.writable = False
+    self.zone_ids: list[str | None] = [None]
+    self.segments: list[Segment] = []
+    # Days before this bucket start are folded into rollup-1d.npy.
+    self.daily_through: int | None = None
+    self._lock: BinaryIO | None = None
+    self._file: BinaryIO | None = None
+
+  @property
+  def zones_path(self) -> Path:
+    return self.directory / "zones.json"
+
+  @property
+  def daily_path(self) -> Path:
+    return self.directory / "rollup-1d.npy"
+
+  @property
+  def first_seq(self) -> int:
+    return self.segments[0].first_seq if self.segments else 0
+
+  @property
+  def head_seq(self) -> int:
+    return self.segments[-1].end_seq if self.segments else 0
+
+  def open(self) -> None:
+    """Scan the directory; takes the writer lock when no other process holds it."""
+    self.directory.mkdir(parents=True, exist_ok=True)
+    lock = open(self.directory / ".lock", "wb")
+    if _try_lock(lock):
+      self._lock, self.writable = lock, True
+    else:
+      lock.close()
+    self._scan()
+    if self.writable and self.segments:
+      # A torn final record from a crash is dropped; sealed segments missing rollups get them now.
+      last = self.segments[-1]
+      os.truncate(last.path, _HEADER.size + last.rows * SEGMENT_RECORD.itemsize)
+      for segment in self.segments[:-1]:
+        if not segment.rollup_path.exists():
+          self._seal(segment)
+
+  def close(self) -> None:
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+    if self._lock is not None:
+      self._lock.close()
+      self._lock = None
+    self.writable = False
+
+  def _scan(self) -> None:
+    segments = []
+    for path in self.directory.glob("telemetry-*.seg"):
+      match = _SEGMENT_NAME.search(path.name)
+      if match is None:
+        continue
+      rows = max(0, path.stat().st_size - _HEADER.size) // SEGMENT_RECORD.itemsize
+      segments.append(Segment(path, int(match[1]), int(match[2]), rows))
+    self.segments = sorted(segments, key=lambda segment: segment.first_seq)
+    if self.zones_path.exists():
+      self.zone_ids = json.loads(self.zones_path.read_text())
+    if self.daily_path.exists():
+      buckets = np.load(self.daily_path, mmap_mode="r")["bucket"]
+      self.daily_through = int(buckets[-1]) + DAY_SECONDS if len(buckets) else None
+
+  def sync_zones(self, zone_ids: list[str | None]) -> None:
+    """Persist zone codes before any record that references a new one."""
+    if not self.writable or len(zone_ids) == len(self.zone_ids):
+      return
+    self.zone_ids = list(zone_ids)
+    _write_atomic(self.zones_path, lambda handle: handle.write(json.dumps(self.zone_ids).encode()))
+
+  def append(self, columns: Mapping[str, np.ndarray], first_seq: int) -> None:
+    """Write a time-ordered batch whose first row has sequence number `first_seq`."""
+    if not self.writable or not len(columns["timestamp"]):
+      return
+    if first_seq != self.head_seq and self.segments:
+      raise ValueError(f"segment log is at seq {self.head_seq}, batch starts at {first_seq}")
+    records = np.empty(len(columns["timestamp"]), dtype=SEGMENT_RECORD)
+    for name in SEGMENT_RECORD.names:
+      records[name] = columns[name]
+    buckets = records["timestamp"] // self.segment_seconds * self.segment_seconds
+    bounds = np.r_[0, np.flatnonzero(buckets[1:] != buckets[:-1]) + 1, len(records)]
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+      segment = self._segment_for(int(buckets[lo]), first_seq + lo)
+      self._file.write(records[lo:hi].tobytes())
+      segment.rows += hi - lo
+    self._file.flush()
+
+  def replace_from(self, first_seq: int, columns: Mapping[str, np.ndarray]) -> None:
+    """Rewrite the open segment from `first_seq` on with a time-ordered batch."""
+    if not self.writable:
+      return
+    current = self.segments[-1] if self.segments else None
+    if current is None or not current.first_seq <= first_seq <= current.end_seq:
+      raise ValueError(f"seq {first_seq} is not in the open segment")
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+    current.rows = first_seq - current.first_seq
+    os.truncate(current.path, _HEADER.size + current.rows * SEGMENT_RECORD.itemsize)
+    self.append(columns, first_seq)
+
+  def _segment_for(self, start: int, seq: int) -> Segment:
+    current = self.segments[-1] if self.segments else None
+    if current is not None and current.start == start:
+      if self._file is None:
+        self._file = open(current.path, "ab")
+      return current
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+    if current is not None:
+      self._seal(current)
+    segment = Segment(self.directory / f"telemetry-{start}-{seq}.seg", start, seq, 0)
+    self._file = open(segment.path, "wb")
+    self._file.write(_HEADER.pack(SEGMENT_MAGIC, SEGMENT_VERSION, SEGMENT_RECORD.itemsize, start, seq))
+    self.segments.append(segment)
+    return segment
+
+  def _seal(self, segment: Segment) -> None:
+    rows = rollup_groups(_from_records(segment.records()), HOUR_SECONDS)
+    _write_atomic(segment.rollup_path, lambda handle: np.save(handle, self._rollup_records(rows)))
+
+  def window(self, lo_seq: int, hi_seq: int) -> dict[str, np.ndarray]:
+    """Copies of the records with sequence numbers in `[lo_seq, hi_seq)`."""
+    if not self.writable and hi_seq > self.head_seq:
+      self._scan()
+    parts = []
+    for segment in self.segments:
+      if segment.end_seq <= lo_seq or segment.first_seq >= hi_seq:
+        continue
+      lo = max(lo_seq - segment.first_seq, 0)
+      hi = min(hi_seq - segment.first_seq, segment.rows)
+      parts.append(_from_records(np.array(segment.records()[lo:hi])))
+    if not parts:
+      return _from_records(np.zeros(0, dtype=SEGMENT_RECORD))
+    return _concat(parts, SEGMENT_RECORD.names)
+
+  def search_timestamp(self, timestamp: int) -> int:
+    """Sequence number of the first stored reading at or after `timestamp`."""
+    for segment in self.segments:
+      if segment.start + self.segment_seconds <= timestamp or not segment.rows:
+        continue
+      return segment.first_seq + int(np.searchsorted(segment.records()["timestamp"], timestamp))
+    return self.head_seq
+
+  def hourly_rollups(self, max_rows: int | None = None, since: int | None = None) -> dict[str, np.ndarray]:
+    """Hourly rollup rows of sealed segments (newest `max_rows`, or buckets from `since`)."""
+    parts: list[np.ndarray] = []
+    rows = 0
+    for segment in reversed(self.segments[:-1]):
+      if since is not None and segment.start < since:
+        break
+      if max_rows is not None and rows >= max_rows:
+        break
+      if segment.rollup_path.exists():
+        records = np.load(segment.rollup_path)
+      else:
+        records = self._rollup_records(rollup_groups(_from_records(segment.records()), HOUR_SECONDS))
+      parts.append(records)
+      rows += len(records)
+    if not parts:
+      return _empty_rollups()
+    records = np.concatenate(parts[::-1])
+    if max_rows is not None:
+      records = records[-max_rows:]
+    return {name: np.asarray(records[name]) for name in ROLLUP_COLUMNS}
+
+  def daily_rollups(self) -> dict[str, np.ndarray]:
+    """Daily rollup rows: compacted days from disk plus sealed segments not yet folded."""
+    parts = []
+    if self.daily_path.exists():
+      records = np.load(self.daily_path)
+      parts.append({name: records[name] for name in ROLLUP_COLUMNS})
+    parts.append(coarsen(self.hourly_rollups(since=self.daily_through), DAY_SECONDS))
+    return _concat(parts, ROLLUP_COLUMNS)
+
+  def open_segment_rows(self) -> dict[str, np.ndarray]:
+    """Raw readings of the newest (still open) segment."""
+    if not self.segments:
+      return _from_records(np.zeros(0, dtype=SEGMENT_RECORD))
+    last = self.segments[-1]
+    return self.window(last.first_seq, last.end_seq)
+
+  def compact(self, now: int, raw_retention_seconds: int) -> int:
+    """Fold finished days into `rollup-1d.npy` and drop raw segments past retention.
+
+    Returns the number of segments removed.
+    """
+    if not self.writable or len(self.segments) < 2:
+      return 0
+    open_day = self.segments[-1].start // DAY_SECONDS * DAY_SECONDS
+    folded_from = self.daily_through or self.segments[0].start // DAY_SECONDS * DAY_SECONDS
+    if folded_from < open_day:
+      hourly = self.hourly_rollups(since=folded_from)
+      finished = hourly["bucket"] < open_day
+      days = coarsen({name: values[finished] for name, values in hourly.items()}, DAY_SECONDS)
+      if len(days["bucket"]):
+        existing = np.load(self.daily_path) if self.daily_path.exists() else np.zeros(0, dtype=ROLLUP_RECORD)
+        merged = np.concatenate([existing, self._rollup_records(days)])
+        _write_atomic(self.daily_path, lambda handle: np.save(handle, merged))
+      self.daily_through = open_day
+
+    if self.daily_through is None:
+      # Every segment is still in the open day; nothing is folded, so nothing may be dropped.
+      return 0
+    cutoff = min((now - raw_retention_seconds) // DAY_SECONDS * DAY_SECONDS, self.daily_through)
+    expired = [
+      segment for segment in self.segments[:-1]
+      if segment.start + self.segment_seconds <= cutoff
+    ]
+    for segment in expired:
+      segment.path.unlink(missing_ok=True)
+      segment.rollup_path.unlink(missing_ok=True)
+    self.segments = self.segments[len(expired):]
+    return len(expired)
+
+  @staticmethod
+  def _rollup_records(rows: Mapping[str, np.ndarray]) -> np.ndarray:
+    records = np.empty(len(rows["bucket"]), dtype=ROLLUP_RECORD)
+    for name in ROLLUP_COLUMNS:
+      records[name] = rows[name]
+    return records
@@ -0,0 +1,407 @@
+"""Columnar, fixed-capacity telemetry store.
+
+Readings live in NumPy columns inside a mirrored ring buffer: every row is
+written at `i` and `i + capacity`, so any window of the most recent rows is a
+single contiguous slice. Time-range queries therefore return views instead of
+copies, and appends are O(1) regardless of how much history is retained.
+
+With a `SegmentLog` attached, every batch is also written to disk; queries
+reaching back past the ring read the older rows from memory-mapped segments.
+
+Rows stay in timestamp order. A batch reaching back before the newest row,
+such as a gateway's buffered upload, is merged into the tail: the rows after
+its oldest reading are rewritten together with it, in the ring, the rollups
+and the open segment. That is allowed back to `earliest_timestamp`.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Iterable, Mapping
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.data.columns import ColumnRing
+from app.data.telemetry_rollups import TelemetryRollups
+from app.data.telemetry_segments import SegmentLog
+from app.schemas.water import TelemetrySnapshot
+
+UTC = timezone.utc
+# float32 columns carry ~7 significant digits; round on the way out so 42.3 stays 42.3.
+FLOAT_DECIMALS = 3
+
+TELEMETRY_COLUMNS: Mapping[str, np.dtype] = {
+  "timestamp": np.dtype(np.int64),
+  "zone": np.dtype(np.int32),
+  "flow_ml": np.dtype(np.float32),
+  "pressure_psi": np.dtype(np.float32),
+  "energy_kw": np.dtype(np.float32),
+  "incidents_today": np.dtype(np.int32),
+}
+
+
+def to_epoch(value: datetime) -> int:
+  """Epoch seconds for `value`; naive datetimes are treated as UTC."""
+  if value.tzinfo is None:
+    value = value.replace(tzinfo=UTC)
+  return int(value.timestamp())
+
+
+def from_epoch(value: int) -> datetime:
+  return datetime.fromtimestamp(int(value), tz=UTC)
+
+
+def _decimals(column: np.ndarray) -> list[float]:
+  return np.round(column.astype(np.float64), FLOAT_DECIMALS).tolist()
+
+
+@dataclass(frozen=True)
+class TelemetryFrame:
+  """Column arrays for a slice of telemetry; views into the store when unfiltered."""
+
+  first_seq: int
+  columns: dict[str, np.ndarray]
+
+  def __len__(self) -> int:
+    return len(self.columns["timestamp"])
+
+
+# Called with the store and each appended, time-ordered column batch.
+BatchObserver = Callable[["TelemetryStore", Mapping[str, np.ndarray]], None]
+
+
+class TelemetryStore:
+  """Append-only telemetry history with interned zone ids and per-zone latest lookup."""
+
+  def __init__(self, capacity: int, rollups: TelemetryRollups | None = None, reorder_seconds: int = 3_600) -> None:
+    self._ring = ColumnRing(capacity, TELEMETRY_COLUMNS)
+    self.rollups = rollups
+    self.reorder_seconds = reorder_seconds
+    # Code 0 is reserved for citywide readings without a zone.
+    self._zone_ids: list[str | None] = [None]
+    self._zone_codes: dict[str | None, int] = {None: 0}
+    self._latest_seq = np.full(16, -1, dtype=np.int64)
+    # Head sequence number after the write that last changed each zone's newest reading.
+    self._changed_at = np.full(16, -1, dtype=np.int64)
+    self.archive: SegmentLog | None = None
+    self._observers: list[BatchObserver] = []
+
+  def __len__(self) -> int:
+    return len(self._ring)
+
+  @property
+  def capacity(self) -> int:
+    return self._ring.capacity
+
+  @property
+  def head_seq(self) -> int:
+    """Sequence number the next appended row will receive."""
+    return self._ring.count
+
+  @property
+  def last_timestamp(self) -> int | None:
+    if not len(self._ring):
+      return None
+    return int(self._ring.get("timestamp", self._ring.count - 1))
+
+  @property
+  def earliest_timestamp(self) -> int | None:
+    """Oldest timestamp a new reading can still be stored with; None while empty.
+
+    That is `reorder_seconds` before the newest reading, but never before
+    the oldest row of a full ring or, with an archive, the open segment;
+    sealed segments are not rewritten.
+    """
+    last = self.last_timestamp
+    if last is None:
+      return None
+    earliest = last - self.reorder_seconds
+    if len(self._ring) == self._ring.capacity:
+      earliest = max(earliest, int(self._ring.get("timestamp", self._ring.first_seq)))
+    if self.archive is not None:
+      width = self.archive.segment_seconds
+      earliest = max(earliest, last // width * width)
+    return earliest
+
+  def intern_zone(self, zone_id: str | None) -> int:
+    code = self._zone_codes.get(zone_id)
+    if code is None:
+      code = len(self._zone_ids)
+      self._zone_codes[zone_id] = code
+      self._zone_ids.append(zone_id)
+      if code >= len(self._latest_seq):
+        self._latest_seq = _grown(self._latest_seq)
+        self._changed_at = _grown(self._changed_at)
+    return code
+
+  def zone_code(self, zone_id: str | None) -> int | None:
+    return self._zone_codes.get(zone_id)
+
+  def zone_id(self, code: int) -> str | None:
+    return self._zone_ids[code]
+
+  @property
+  def zone_count(self) -> int:
+    return len(self._zone_ids)
+
+  def latest_timestamps(self, codes: np.ndarray) -> np.ndarray:
+    """Timestamp of each zone's newest retained reading; -1 where there is none."""
+    seqs = self._latest_seq[codes]
+    retained = seqs >= self._ring.first_seq
+    timestamps = self._ring.columns["timestamp"][seqs % self._ring.capacity]
+    return np.where(retained, timestamps, -1)
+
+  def append(self, snapshot: TelemetrySnapshot) -> int:
+    timestamp = to_epoch(snapshot.timestamp)
+    last = self.last_timestamp
+    if last is not None and timestamp < last:
+      raise ValueError("telemetry must be appended in timestamp order")
+    zone = self.intern_zone(snapshot.zone_id)
+    row = {
+      "timestamp": timestamp,
+      "zone": zone,
+      "flow_ml": snapshot.flow_ml,
+      "pressure_psi": snapshot.pressure_psi,
+      "energy_kw": snapshot.energy_kw,
+      "incidents_today": snapshot.incidents_today,
+    }
+    seq = self._ring.append(row)
+    self._latest_seq[zone] = seq
+    self._changed_at[zone] = self._ring.count
+    if self.rollups is not None or self.archive is not None or self._observers:
+      columns = {name: np.array([value], dtype=TELEMETRY_COLUMNS[name]) for name, value in row.items()}
+      if self.rollups is not None:
+        self.rollups.update(columns)
+      self._archive(columns, seq)
+      self._notify(columns)
+    return seq
+
+  def extend(self, snapshots: Iterable[TelemetrySnapshot]) -> None:
+    for snapshot in snapshots:
+      self.append(snapshot)
+
+  def extend_columns(self, columns: Mapping[str, np.ndarray]) -> range:
+    """Add a time-ordered batch of column arrays in a single write.
+
+    `columns` must hold every store column with `zone` already interned. A
+    batch reaching back before the newest row is merged in and may not start
+    before `earliest_timestamp`. Returns the sequence numbers written, which
+    then include the rows after the batch's first one.
+    """
+    timestamps = columns["timestamp"]
+    if not len(timestamps):
+      return range(self._ring.count, self._ring.count)
+    if np.any(timestamps[1:] < timestamps[:-1]):
+      raise ValueError("telemetry batches must be in timestamp order")
+    last = self.last_timestamp
+    if last is None or timestamps[0] >= last:
+      rows = columns
+      seqs = self._ring.extend(columns)
+    else:
+      if timestamps[0] < self.earliest_timestamp:
+        raise ValueError("telemetry batch reaches back before the earliest storable timestamp")
+      # Existing rows come first among equal timestamps, so the merge is stable.
+      start = self._ring.search("timestamp", int(timestamps[0]), side="right")
+      tail = self._ring.window(start, None)
+      merged = {name: np.concatenate([tail[name], columns[name]]) for name in TELEMETRY_COLUMNS}
+      order = np.argsort(merged["timestamp"], kind="stable")
+      rows = {name: values[order] for name, values in merged.items()}
+      seqs = self._ring.replace_from(start, rows)
+    self._index_latest(rows["zone"], seqs)
+    self._changed_at[np.unique(columns["zone"])] = self._ring.count
+    if self.rollups is not None:
+      self.rollups.update(columns)
+    self._archive(rows, seqs.start)
+    self._notify(columns)
+    return seqs
+
+  def add_observer(self, observer: BatchObserver) -> None:
+    if observer not in self._observers:
+      self._observers.append(observer)
+
+  def remove_observer(self, observer: BatchObserver) -> None:
+    if observer in self._observers:
+      self._observers.remove(observer)
+
+  def _notify(self, columns: Mapping[str, np.ndarray]) -> None:
+    for observer in self._observers:
+      observer(self, columns)
+
+  def _index_latest(self, zones: np.ndarray, seqs: range) -> None:
+    # The last occurrence of each zone in the batch is its newest reading.
+    unique, offsets = np.unique(zones[::-1], return_index=True)
+    self._latest_seq[unique] = seqs.stop - 1 - offsets
+
+  def _archive(self, columns: Mapping[str, np.ndarray], first_seq: int) -> None:
+    if self.archive is not None:
+      self.archive.sync_zones(self._zone_ids)
+      if first_seq < self.archive.head_seq:
+        self.archive.replace_from(first_seq, columns)
+      else:
+        self.archive.append(columns, first_seq)
+
+  def attach_archive(self, archive: SegmentLog) -> None:
+    """Restore from `archive` (already opened) and write every later batch to it.
+
+    The newest `capacity` readings are copied into the ring and the rollup
+    tiers are rebuilt from the persisted hourly and daily rollups plus the
+    open segment; older raw readings stay on disk and are memory-mapped by
+    queries that reach back that far. An empty archive is seeded with the
+    rows already in memory instead.
+    """
+    if not archive.head_seq:
+      self.archive = archive
+      if len(self._ring):
+        self._archive(self._ring.window(), self._ring.first_seq)
+      return
+
+    self._zone_ids = list(archive.zone_ids)
+    self._zone_codes = {zone_id: code for code, zone_id in enumerate(self._zone_ids)}
+    self._latest_seq = np.full(max(16, 2 * len(self._zone_ids)), -1, dtype=np.int64)
+    self._changed_at = np.full(len(self._latest_seq), -1, dtype=np.int64)
+    self._ring = ColumnRing(self._ring.capacity, TELEMETRY_COLUMNS)
+    tail_seq = max(archive.first_seq, archive.head_seq - self._ring.capacity)
+    self._ring.skip_to(tail_seq)
+    tail = archive.window(tail_seq, archive.head_seq)
+    self._index_latest(tail["zone"], self._ring.extend(tail))
+    self._changed_at[np.unique(tail["zone"])] = self._ring.count
+
+    if self.rollups is not None:
+      self.rollups.reset()
+      open_rows = archive.open_segment_rows()
+      for tier in self.rollups.tiers:
+        if tier.name == "1h":
+          tier.load(archive.hourly_rollups(max_rows=tier.ring.capacity))
+          tier.update(open_rows)
+        elif tier.name == "1d":
+          tier.load(archive.daily_rollups())
+          tier.update(open_rows)
+        else:
+          tier.update(tail)
+    self.archive = archive
+
+  def search_timestamp(self, timestamp: int) -> int:
+    """Sequence number of the first retained reading at or after `timestamp`."""
+    return self._ring.search("timestamp", timestamp)
+
+  def window_seqs(self, lo_seq: int | None = None, hi_seq: int | None = None) -> dict[str, np.ndarray]:
+    return self._ring.window(lo_seq, hi_seq)
+
+  def window(self, since: datetime | None = None, until: datetime | None = None) -> TelemetryFrame:
+    """Readings with `since <= timestamp < until`.
+
+    Views into the ring, unless `since` reaches back past it and an archive is
+    attached; then the older rows are copied out of the mapped segments.
+    """
+    ring = self._ring
+    lo = ring.first_seq if since is None else self._search(to_epoch(since))
+    hi = ring.count if until is None else self._search(to_epoch(until))
+    if lo >= ring.first_seq or self.archive is None:
+      return TelemetryFrame(first_seq=max(lo, ring.first_seq), columns=ring.window(lo, hi))
+    older = self.archive.window(lo, min(hi, ring.first_seq))
+    newer = ring.window(ring.first_seq, hi)
+    return TelemetryFrame(
+      first_seq=lo,
+      columns={name: np.concatenate([older[name], newer[name]]) for name in TELEMETRY_COLUMNS},
+    )
+
+  def _search(self, timestamp: int) -> int:
+    ring = self._ring
+    if self.archive is not None and len(ring) and timestamp < ring.get("timestamp", ring.first_seq):
+      return self.archive.search_timestamp(timestamp)
+    return ring.search("timestamp", timestamp)
+
+  def query(
+    self,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    zone_id: str | None = None,
+    limit: int | None = None,
+  ) -> TelemetryFrame:
+    frame = self.window(since, until)
+    if zone_id is not None:
+      code = self._zone_codes.get(zone_id)
+      if code is None:
+        return TelemetryFrame(first_seq=frame.first_seq, columns={k: v[:0] for k, v in frame.columns.items()})
+      (rows,) = np.nonzero(frame.columns["zone"] == code)
+      if limit is not None:
+        rows = rows[-limit:]
+      return TelemetryFrame(first_seq=frame.first_seq, columns={k: v[rows] for k, v in frame.columns.items()})
+    if limit is not None and len(frame) > limit:
+      skip = len(frame) - limit
+      return TelemetryFrame(first_seq=frame.first_seq + skip, columns={k: v[skip:] for k, v in frame.columns.items()})
+    return frame
+
+  def latest_seqs(self) -> np.ndarray:
+    """Sequence numbers of each zone's newest retained reading, oldest first."""
+    seqs = self._latest_seq[:len(self._zone_ids)]
+    seqs = seqs[seqs >= self._ring.first_seq]
+    return np.sort(seqs)
+
+  def latest_changed_since(self, seq: int) -> list[TelemetrySnapshot]:
+    """Newest reading of every zone written to since the head was at `seq`."""
+    zones = np.flatnonzero(self._changed_at[:len(self._zone_ids)] > seq)
+    seqs = self._latest_seq[zones]
+    return [self.snapshot(int(seq)) for seq in np.sort(seqs[seqs >= self._ring.first_seq])]
+
+  def latest_per_zone(self) -> list[TelemetrySnapshot]:
+    return [self.snapshot(int(seq)) for seq in self.latest_seqs()]
+
+  def latest_for_zone(self, zone_id: str | None) -> TelemetrySnapshot | None:
+    code = self.zone_code(zone_id)
+    if code is None:
+      return None
+    seq = int(self._latest_seq[code])
+    return self.snapshot(seq) if seq >= self._ring.first_seq else None
+
+  def snapshot(self, seq: int) -> TelemetrySnapshot:
+    ring = self._ring
+    return TelemetrySnapshot(
+      timestamp=from_epoch(ring.get("timestamp", seq)),
+      zone_id=self._zone_ids[int(ring.get("zone", seq))],
+      flow_ml=round(float(ring.get("flow_ml", seq)), FLOAT_DECIMALS),
+      pressure_psi=round(float(ring.get("pressure_psi", seq)), FLOAT_DECIMALS),
+      energy_kw=round(float(ring.get("energy_kw", seq)), FLOAT_DECIMALS),
+      incidents_today=int(ring.get("incidents_today", seq)),
+    )
+
+  def to_snapshots(self, frame: TelemetryFrame) -> list[TelemetrySnapshot]:
+    columns = frame.columns
+    zone_ids = self._zone_ids
+    return [
+      TelemetrySnapshot(
+        timestamp=from_epoch(timestamp),
+        zone_id=zone_ids[zone],
+        flow_ml=flow,
+        pressure_psi=pressure,
+        energy_kw=energy,
+        incidents_today=incidents,
+      )
+      for timestamp, zone, flow, pressure, energy, incidents in zip(
+        columns["timestamp"].tolist(),
+        columns["zone"].tolist(),
+        _decimals(columns["flow_ml"]),
+        _decimals(columns["pressure_psi"]),
+        _decimals(columns["energy_kw"]),
+        columns["incidents_today"].tolist(),
+      )
+    ]
+
+
+def _grown(values: np.ndarray) -> np.ndarray:
+  grown = np.full(2 * len(values), -1, dtype=values.dtype)
+  grown[:len(values)] = values
+  return grown
+
+
+_settings = get_settings()
+telemetry_store = TelemetryStore(
+  capacity=_settings.telemetry_capacity,
+  rollups=TelemetryRollups({
+    "1m": _settings.telemetry_rollup_capacity_1m,
+    "1h": _settings.telemetry_rollup_capacity_1h,
+    "1d": _settings.telemetry_rollup_capacity_1d,
+  }),
+  reorder_seconds=_settings.telemetry_reorder_seconds,
+)
@@ -0,0 +1,203 @@
+"""Spatial index over zone boundaries for point and map-view lookups.
+
+Zones are bucketed on a uniform grid sized from their typical bounding box,
+so a lookup reads one cell and checks a handful of bounding boxes. Candidates
+that pass are tested exactly by even-odd ray casting. Each polygon also
+splits its edges into horizontal slabs, so the ray only meets the edges that
+span its latitude rather than every vertex of the boundary. Holes and
+multi-polygons fall out of the even-odd rule. A map view reads the cells it
+covers and keeps the zones whose bounding box meets it.
+
+Coordinates follow GeoJSON: `[longitude, latitude]`. Zone writes re-index
+the zone when its geometry changes.
+"""
+from __future__ import annotations
+
+from typing import Iterable, Sequence
+
+from pydantic import BaseModel
+
+from app.data import mock_store
+from app.schemas.water import WaterZone
+
+# Edges per slab aimed for when splitting a boundary.
+SLAB_EDGES = 8
+MAX_GRID_CELLS = 1 << 22
+
+
+class ZoneShape:
+  """One zone's boundary as slabs of non-horizontal edges `(y1, y2, x1, dx/dy)`."""
+
+  def __init__(self, zone_id: str, rings: Sequence[Sequence[Sequence[float]]]) -> None:
+    self.zone_id = zone_id
+    edges = []
+    for ring in rings:
+      for (x1, y1), (x2, y2) in zip(ring, [*ring[1:], ring[0]]):
+        if y1 != y2:
+          edges.append((y1, y2, x1, (x2 - x1) / (y2 - y1)))
+    xs = [point[0] for ring in rings for point in ring]
+    ys = [point[1] for ring in rings for point in ring]
+    self.bbox = (min(xs), min(ys), max(xs), max(ys))
+    self._slab_count = max(1, len(edges) // SLAB_EDGES)
+    self._slab_height = (self.bbox[3] - self.bbox[1]) / self._slab_count or 1.0
+    self._slabs: list[list[tuple[float, float, float, float]]] = [[] for _ in range(self._slab_count)]
+    for edge in edges:
+      for slab in range(self._slab(min(edge[0], edge[1])), self._slab(max(edge[0], edge[1])) + 1):
+        self._slabs[slab].append(edge)
+
+  def _slab(self, y: float) -> int:
+    return min(max(int((y - self.bbox[1]) / self._slab_height), 0), self._slab_count - 1)
+
+  def contains(self, x: float, y: float) -> bool:
+    min_x, min_y, max_x, max_y = self.bbox
+    if not (min_x <= x <= max_x and min_y <= y <= max_y):
+      return False
+    inside = False
+    for y1, y2, x1, slope in self._slabs[self._slab(y)]:
+      if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * slope:
+        inside = not inside
+    return inside
+
+
+def polygon_rings(geometry: dict[str, object]) -> list[list[list[float]]]:
+  """Every ring of a GeoJSON Polygon or MultiPolygon; empty for other geometry."""
+  kind, coordinates = geometry.get("type"), geometry.get("coordinates") or []
+  if kind == "Polygon":
+    return [ring for ring in coordinates if len(ring) >= 3]
+  if kind == "MultiPolygon":
+    return [ring for polygon in coordinates for ring in polygon if len(ring) >= 3]
+  return []
+
+
+class ZoneIndex:
+  def __init__(self) -> None:
+    self._shapes: dict[str, ZoneShape] = {}
+    self._geometry: dict[str, dict[str, object]] = {}
+    self._order: dict[str, int] = {}
+    self._cells: dict[int, list[ZoneShape]] = {}
+    self._origin = (0.0, 0.0)
+    self._cell_size = (1.0, 1.0)
+    self._columns = 1
+    self._rows = 1
+
+  @classmethod
+  def build(cls, zones: Iterable[WaterZone]) -> ZoneIndex:
+    index = cls()
+    for zone in zones:
+      index._set_shape(zone.id, zone.geojson.geometry)
+    index._rebuild()
+    return index
+
+  def __len__(self) -> int:
+    return len(self._shapes)
+
+  def on_store_write(self, kind: str, item: BaseModel) -> None:
+    if kind == "zone":
+      self.set_zone(item)
+
+  def set_zone(self, zone: WaterZone) -> None:
+    if self._geometry.get(zone.id) == zone.geojson.geometry:
+      return
+    previous = self._shapes.get(zone.id)
+    shape = self._set_shape(zone.id, zone.geojson.geometry)
+    if shape is None or not self._covers(shape.bbox):
+      self._rebuild()
+      return
+    if previous is not None:
+      for cell in self._cells_of(previous.bbox):
+        self._cells[cell].remove(previous)
+    for cell in self._cells_of(shape.bbox):
+      bucket = self._cells.setdefault(cell, [])
+      bucket.append(shape)
+      bucket.sort(key=lambda other: self._order[other.zone_id])
+
+  def _set_shape(self, zone_id: str, geometry: dict[str, object]) -> ZoneShape | None:
+    self._geometry[zone_id] = geometry
+    self._order.setdefault(zone_id, len(self._order))
+    rings = polygon_rings(geometry)
+    if not rings:
+      self._shapes.pop(zone_id, None)
+      return None
+    self._shapes[zone_id] = shape = ZoneShape(zone_id, rings)
+    return shape
+
+  def _rebuild(self) -> None:
+    shapes = sorted(self._shapes.values(), key=lambda shape: self._order[shape.zone_id])
+    self._cells = {}
+    if not shapes:
+      return
+    min_x = min(shape.bbox[0] for shape in shapes)
+    min_y = min(shape.bbox[1] for shape in shapes)
+    max_x = max(shape.bbox[2] for shape in shapes)
+    max_y = max(shape.bbox[3] for shape in shapes)
+    # Cells the size of a typical zone: each zone spans a few cells and each cell a few zones.
+    widths = sorted(shape.bbox[2] - shape.bbox[0] for shape in shapes)
+    heights = sorted(shape.bbox[3] - shape.bbox[1] for shape in shapes)
+    cell_w = max(widths[len(widths) // 2], (max_x - min_x) / 4096, 1e-9)
+    cell_h = max(heights[len(heights) // 2], (max_y - min_y) / 4096, 1e-9)
+    self._origin = (min_x, min_y)
+    self._cell_size = (cell_w, cell_h)
+    self._columns = int((max_x - min_x) / cell_w) + 1
+    self._rows = int((max_y - min_y) / cell_h) + 1
+    while self._columns * self._rows > MAX_GRID_CELLS:
+      self._cell_size = (self._cell_size[0] * 2, self._cell_size[1] * 2)
+      self._columns = int((max_x - min_x) / self._cell_size[0]) + 1
+      self._rows = int((max_y - min_y) / self._cell_size[1]) + 1
+    for shape in shapes:
+      for cell in self._cells_of(shape.bbox):
+        self._cells.setdefault(cell, []).append(shape)
+
+  def _covers(self, bbox: tuple[float, float, float, float]) -> bool:
+    (x0, y0), (cell_w, cell_h) = self._origin, self._cell_size
+    return (
+      bool(self._cells)
+      and bbox[0] >= x0 and bbox[1] >= y0
+      and bbox[2] < x0 + self._columns * cell_w and bbox[3] < y0 + self._rows * cell_h
+    )
+
+  def _column(self, x: float) -> int:
+    return int((x - self._origin[0]) / self._cell_size[0])
+
+  def _row(self, y: float) -> int:
+    return int((y - self._origin[1]) / self._cell_size[1])
+
+  def _cells_of(self, bbox: tuple[float, float, float, float]) -> list[int]:
+    first_column, last_column = max(self._column(bbox[0]), 0), min(self._column(bbox[2]), self._columns - 1)
+    first_row, last_row = max(self._row(bbox[1]), 0), min(self._row(bbox[3]), self._rows - 1)
+    return [
+      row * self._columns + column
+      for row in range(first_row, last_row + 1)
+      for column in range(first_column, last_column + 1)
+    ]
+
+  def locate(self, latitude: float, longitude: float) -> str | None:
+    """Id of the zone containing the point; the first zone listed when boundaries overlap."""
+    column, row = self._column(longitude), self._row(latitude)
+    if not (0 <= column < self._columns and 0 <= row < self._rows):
+      return None
+    for shape in self._cells.get(row * self._columns + column, ()):
+      if shape.contains(longitude, latitude):
+        return shape.zone_id
+    return None
+
+  def intersecting(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> list[str]:
+    """Ids of zones whose bounding box meets the box, in listing order."""
+    bbox = (min_lon, min_lat, max_lon, max_lat)
+    columns = min(self._column(max_lon), self._columns - 1) - max(self._column(min_lon), 0) + 1
+    rows = min(self._row(max_lat), self._rows - 1) - max(self._row(min_lat), 0) + 1
+    if columns <= 0 or rows <= 0 or not self._cells:
+      return []
+    if columns * rows > len(self._shapes):
+      # A view wider than the zones are many: checking every zone is cheaper than every cell.
+      candidates = self._shapes.values()
+    else:
+      candidates = {id(shape): shape for cell in self._cells_of(bbox) for shape in self._cells.get(cell, ())}.values()
+    matches = [
+      shape.zone_id for shape in candidates
+      if shape.bbox[0] <= bbox[2] and bbox[0] <= shape.bbox[2] and shape.bbox[1] <= bbox[3] and bbox[1] <= shape.bbox[3]
+    ]
+    return sorted(matches, key=self._order.__getitem__)
+
+
+zone_index = ZoneIndex.build(mock_store.list_zones())
+mock_store.add_listener(zone_index.on_store_write)
@@ -1,11 +1,43 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
-from app.routers import auth, incidents, insights, pumps, stream, telemetry, zones, billing, rewards_emergency
+from app.routers import auth, incidents, insights, network, pumps, simulations, stream, telemetry, zones, billing, rewards_emergency
+from app.data.telemetry_store import telemetry_store
+from app.services.anomaly_detection import anomaly_detector
+from app.services.fairness import fairness_pipeline
+from app.services.insights import network_health
+from app.services.reservoir_projection import reservoir_projector
+from app.services.simulation import scenario_simulator
+from app.services.store_sync import store_sync
+from app.services.telemetry_persistence import telemetry_persistence
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+  telemetry_persistence.start()
+  await store_sync.start()
+  if settings.enable_anomaly_detection:
+    telemetry_store.add_observer(anomaly_detector.observe)
+  telemetry_store.add_observer(reservoir_projector.observe)
+  telemetry_store.add_observer(network_health.observe)
+  fairness_pipeline.start()
+  try:
+    yield
+  finally:
+    fairness_pipeline.stop()
+    scenario_simulator.shutdown()
+    telemetry_store.remove_observer(network_health.observe)
+    telemetry_store.remove_observer(reservoir_projector.observe)
+    telemetry_store.remove_observer(anomaly_detector.observe)
+    await store_sync.stop()
+    telemetry_persistence.stop()
+
+
 app = FastAPI(
   title=settings.project_name,
   version="0.1.0",
@@ -13,6 +45,7 @@ app = FastAPI(
   docs_url=f"{settings.api_prefix}/docs",
   redoc_url=f"{settings.api_prefix}/redoc",
   openapi_url=f"{settings.api_prefix}/openapi.json",
+  lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -28,6 +61,8 @@ app.include_router(zones.router, prefix=settings.api_prefix)
 app.include_router(telemetry.router, prefix=settings.api_prefix)
 app.include_router(incidents.router, prefix=settings.api_prefix)
 app.include_router(pumps.router, prefix=settings.api_prefix)
+app.include_router(network.router, prefix=settings.api_prefix)
+app.include_router(simulations.router, prefix=settings.api_prefix)
 app.include_router(insights.router, prefix=settings.api_prefix)
 app.include_router(stream.router, prefix=settings.api_prefix)
 app.include_router(billing.router, prefix=settings.api_prefix)
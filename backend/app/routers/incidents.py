@@ -1,31 +1,79 @@
-from fastapi import APIRouter, HTTPException, Query, status
+from fastapi import APIRouter, HTTPException, Query, Response, status
 
+from app.core.config import get_settings
 from app.data import mock_store
-from app.schemas.water import CitizenReportCreate, IncidentReport
+from app.data.zone_index import zone_index
+from app.schemas.water import (
+  CitizenReportCreate,
+  IncidentReport,
+  IncidentSeverity,
+  IncidentStatus,
+  IncidentStatusUpdate,
+  IncidentType,
+)
+from app.services.incident_clustering import incident_clusterer
 
 router = APIRouter(prefix="/incidents", tags=["incidents"])
 
+# Response header carrying the `after` cursor of the next page; absent on the last page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def incident_page(response: Response, limit: int, after: str | None, **filters: str | None) -> list[IncidentReport]:
+  try:
+    incidents, next_cursor = mock_store.page_incidents(limit, after, **filters)
+  except ValueError as exc:
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)) from exc
+  if next_cursor is not None:
+    response.headers[NEXT_CURSOR_HEADER] = next_cursor
+  return incidents
+
 
 @router.get("/", response_model=list[IncidentReport], summary="List incidents")
 async def list_incidents(
+  response: Response,
   zone_id: str | None = Query(default=None, description="Filter incidents by zone"),
-  status_filter: str | None = Query(
+  status_filter: IncidentStatus | None = Query(
     default=None,
     alias="status",
     description="Filter incidents by status (open, acknowledged, resolved)",
   ),
+  severity: IncidentSeverity | None = Query(default=None),
+  incident_type: IncidentType | None = Query(default=None, alias="type"),
+  limit: int = Query(default=100, ge=1, le=1_000, description="Page size, newest first"),
+  after: str | None = Query(default=None, description=f"Cursor from the previous page's {NEXT_CURSOR_HEADER} header"),
 ) -> list[IncidentReport]:
-  return mock_store.list_incidents(zone_id=zone_id, status=status_filter)
+  return incident_page(response, limit, after, zone_id=zone_id, status=status_filter, severity=severity, type=incident_type)
 
 
 @router.post(
   "/",
   response_model=IncidentReport,
   status_code=status.HTTP_201_CREATED,
-  summary="Submit citizen incident report",
+  summary="Submit citizen incident report; duplicates of an open incident nearby return it with 200",
 )
-async def create_incident(payload: CitizenReportCreate) -> IncidentReport:
-  if payload.zone_id not in {zone.id for zone in mock_store.list_zones()}:
+async def create_incident(payload: CitizenReportCreate, response: Response) -> IncidentReport:
+  if payload.latitude is not None and payload.longitude is not None:
+    # The reported location wins over the ward picked in the form.
+    located = zone_index.locate(payload.latitude, payload.longitude)
+    if located is None and payload.zone_id is None:
+      raise HTTPException(status_code=404, detail="Location is outside every zone")
+    if located is not None:
+      payload = payload.model_copy(update={"zone_id": located})
+  if mock_store.get_zone(payload.zone_id) is None:
     raise HTTPException(status_code=404, detail="Unknown zone")
+  if get_settings().enable_incident_dedup:
+    merged = incident_clusterer.merge(payload)
+    if merged is not None:
+      # Counted against an incident already open nearby rather than created.
+      response.status_code = status.HTTP_200_OK
+      return merged
   return mock_store.upsert_citizen_incident(payload)
 
+
+@router.patch("/{incident_id}", response_model=IncidentReport, summary="Change an incident's status")
+async def update_incident(incident_id: str, payload: IncidentStatusUpdate) -> IncidentReport:
+  incident = mock_store.update_incident_status(incident_id, payload.status)
+  if incident is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Incident not found")
+  return incident
@@ -1,11 +1,20 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Response, status
 
-from app.services import insights
+from app.schemas.water import ResponseCacheStats
+from app.services.insights import network_health
+from app.services.response_cache import response_cache
 
 router = APIRouter(prefix="/insights", tags=["insights"])
 
 
 @router.get("/summary", summary="AI insights summary")
-async def get_network_summary() -> dict[str, object]:
-  return insights.summarize_network_health()
+async def get_network_summary(if_none_match: str | None = Header(default=None)) -> Response:
+  etag = network_health.etag
+  if if_none_match is not None and etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+  return Response(content=network_health.encoded(), media_type="application/json", headers={"ETag": etag})
 
+
+@router.get("/cache-stats", response_model=list[ResponseCacheStats], summary="Hit, miss and coalesce counts of computed endpoints")
+async def get_cache_stats() -> list[ResponseCacheStats]:
+  return response_cache.stats()
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException
+
+from app.data.network_graph import NodeKind, network_graph
+from app.schemas.water import NetworkNeighbours, NetworkNode
+
+router = APIRouter(prefix="/network", tags=["network"])
+
+
+def _node(node: int) -> NetworkNode:
+  return NetworkNode(id=network_graph.node_id(node), kind=network_graph.kind(node), name=network_graph.name(node))
+
+
+def _lookup(kind: NodeKind, node_id: str) -> int:
+  node = network_graph.node(kind, node_id)
+  if node is None:
+    raise HTTPException(status_code=404, detail=f"{kind.capitalize()} not found")
+  return node
+
+
+@router.get(
+  "/zones/{zone_id}/upstream",
+  response_model=NetworkNeighbours,
+  summary="Pumps and reservoirs that feed a zone",
+)
+async def get_zone_upstream(zone_id: str) -> NetworkNeighbours:
+  zone = _lookup("zone", zone_id)
+  pumps = network_graph.upstream(zone).tolist()
+  reservoirs = dict.fromkeys(reservoir for pump in pumps for reservoir in network_graph.upstream(pump).tolist())
+  return NetworkNeighbours(
+    node=_node(zone),
+    pumps=[_node(pump) for pump in pumps],
+    reservoirs=[_node(reservoir) for reservoir in reservoirs],
+  )
+
+
+@router.get(
+  "/pumps/{pump_id}/downstream",
+  response_model=NetworkNeighbours,
+  summary="Zones supplied by a pump station",
+)
+async def get_pump_downstream(pump_id: str) -> NetworkNeighbours:
+  pump = _lookup("pump", pump_id)
+  return NetworkNeighbours(node=_node(pump), zones=[_node(zone) for zone in network_graph.downstream(pump).tolist()])
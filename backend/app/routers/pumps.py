@@ -1,14 +1,84 @@
-from fastapi import APIRouter, HTTPException, status
+from datetime import datetime, timedelta, timezone
 
+from fastapi import APIRouter, HTTPException, Query, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
 from app.data import mock_store
-from app.schemas.water import PumpSchedule, PumpStation, ReservoirStatus
+from app.data.schedule_store import ScheduleConflict
+from app.data.telemetry_store import telemetry_store
+from app.schemas.water import (
+  EnergyCostReport,
+  PumpSchedule,
+  PumpScheduleCreate,
+  ProjectedReservoir,
+  PumpStation,
+  ReservoirStatus,
+  ScheduleOptimizationRequest,
+  ScheduleOptimizationResult,
+)
+from app.services import schedule_optimizer
+from app.services.energy_cost import energy_cost_report, tariff
+from app.services.reservoir_projection import reservoir_projector
 
 router = APIRouter(prefix="/pumps", tags=["pump-operations"])
 
 
 @router.get("/schedules", response_model=list[PumpSchedule], summary="Pump schedules")
-async def list_schedules() -> list[PumpSchedule]:
-  return mock_store.list_pump_schedules()
+async def list_schedules(
+  since: datetime | None = Query(default=None, alias="from", description="Only schedules still running at or after this time"),
+  until: datetime | None = Query(default=None, alias="to", description="Only schedules starting before this time"),
+  pump_id: str | None = Query(default=None),
+  zone_id: str | None = Query(default=None),
+) -> list[PumpSchedule]:
+  if since is None and until is None and pump_id is None and zone_id is None:
+    return mock_store.list_pump_schedules()
+  return mock_store.query_pump_schedules(since, until, pump_id, zone_id)
+
+
+@router.post(
+  "/schedules",
+  response_model=PumpSchedule,
+  status_code=status.HTTP_201_CREATED,
+  summary="Schedule a pump run",
+)
+async def create_schedule(payload: PumpScheduleCreate) -> PumpSchedule:
+  if mock_store.get_zone(payload.zone_id) is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown zone")
+  if mock_store.get_pump_station(payload.pump_id) is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown pump")
+  try:
+    return mock_store.apply_pump_schedule(mock_store.new_pump_schedule(payload))
+  except ScheduleConflict as exc:
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=exc.reasons)
+
+
+@router.get("/schedules/running", response_model=list[PumpSchedule], summary="Schedules running at a moment")
+async def running_schedules(
+  at: datetime | None = Query(default=None, description="Defaults to now"),
+  pump_id: str | None = Query(default=None),
+  zone_id: str | None = Query(default=None),
+) -> list[PumpSchedule]:
+  return mock_store.running_pump_schedules(at or datetime.now(timezone.utc), pump_id, zone_id)
+
+
+@router.post(
+  "/schedules/optimize",
+  response_model=ScheduleOptimizationResult,
+  summary="Generate a day's fairness-constrained pump schedules",
+)
+async def optimize_schedules(request: ScheduleOptimizationRequest | None = None) -> ScheduleOptimizationResult:
+  settings = get_settings()
+  if not settings.enable_schedule_optimizer:
+    raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Schedule optimizer is disabled")
+  day = request.day if request and request.day else (datetime.now(timezone.utc) + timedelta(days=1)).date()
+  result = await run_in_threadpool(schedule_optimizer.optimize_from_store, day, settings)
+  # Stored on the event loop so store listeners (replication, realtime) run where they expect.
+  try:
+    mock_store.replace_optimized_pump_schedules(day, result.schedules)
+  except ScheduleConflict as exc:
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=exc.reasons)
+  return result
 
 
 @router.post(
@@ -17,7 +87,10 @@ async def list_schedules() -> list[PumpSchedule]:
   summary="Approve schedule for execution",
 )
 async def approve_schedule(schedule_id: str) -> PumpSchedule:
-  schedule = mock_store.approve_pump_schedule(schedule_id)
+  try:
+    schedule = mock_store.approve_pump_schedule(schedule_id)
+  except ScheduleConflict as exc:
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=exc.reasons)
   if schedule is None:
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Schedule not found")
   return schedule
@@ -28,7 +101,62 @@ async def list_pump_stations() -> list[PumpStation]:
   return mock_store.list_pump_stations()
 
 
-@router.get("/reservoirs", response_model=list[ReservoirStatus], summary="Reservoir storage levels")
-async def list_reservoirs() -> list[ReservoirStatus]:
-  return mock_store.list_reservoirs()
+@router.put("/stations/{station_id}", response_model=PumpStation, summary="Add or replace a pump station")
+async def put_pump_station(station_id: str, payload: PumpStation) -> PumpStation:
+  if payload.id != station_id:
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Station id does not match the path")
+  unknown = [zone_id for zone_id in payload.connected_zones if mock_store.get_zone(zone_id) is None]
+  if unknown:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown zones: {', '.join(unknown)}")
+  return mock_store.apply_pump_station(payload)
+
+
+@router.get(
+  "/reservoirs",
+  response_model=list[ProjectedReservoir] | list[ReservoirStatus],
+  summary="Reservoir storage levels",
+)
+async def list_reservoirs(
+  projection: bool = Query(default=False, description="Add projected hourly levels and hours until empty"),
+) -> list[ProjectedReservoir] | list[ReservoirStatus]:
+  reservoirs = mock_store.list_reservoirs()
+  if not projection:
+    return reservoirs
+  projections = reservoir_projector.projections(reservoirs)
+  return [
+    ProjectedReservoir(**reservoir.model_dump(), projection=projections[reservoir.id])
+    for reservoir in reservoirs
+  ]
+
+
+@router.put("/reservoirs/{reservoir_id}", response_model=ReservoirStatus, summary="Add or replace a reservoir")
+async def put_reservoir(reservoir_id: str, payload: ReservoirStatus) -> ReservoirStatus:
+  if payload.id != reservoir_id:
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Reservoir id does not match the path")
+  unknown = [pump_id for pump_id in payload.pumps_connected if mock_store.get_pump_station(pump_id) is None]
+  if unknown:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown pumps: {', '.join(unknown)}")
+  return mock_store.apply_reservoir(payload)
+
 
+@router.get("/energy-cost", response_model=EnergyCostReport, summary="Time-of-use energy cost by zone and pump")
+async def get_energy_cost(
+  since: datetime | None = Query(default=None, description="Start of the range; 24 hours before `until` by default"),
+  until: datetime | None = Query(default=None, description="End of the range (exclusive); now by default"),
+) -> EnergyCostReport:
+  until = until or datetime.now(timezone.utc)
+  since = since or until - timedelta(days=1)
+  if since.tzinfo is None:
+    since = since.replace(tzinfo=timezone.utc)
+  if until.tzinfo is None:
+    until = until.replace(tzinfo=timezone.utc)
+  if since >= until:
+    raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="since must be before until")
+  return energy_cost_report(
+    telemetry_store,
+    mock_store.query_pump_schedules(since, until),
+    mock_store.list_pump_stations(),
+    tariff,
+    since,
+    until,
+  )
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.schemas.water import SimulationBatchResult, SimulationRequest
+from app.services.simulation import scenario_simulator
+
+router = APIRouter(prefix="/simulations", tags=["simulations"])
+
+
+@router.post("", response_model=SimulationBatchResult, summary="Run a batch of what-if scenarios")
+async def run_simulations(request: SimulationRequest) -> SimulationBatchResult:
+  try:
+    return await scenario_simulator.run(request)
+  except ValueError as exc:
+    raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
@@ -1,26 +1,133 @@
-import asyncio
+import inspect
 import json
-from datetime import datetime, timezone
+from collections.abc import Awaitable, Callable
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
 
-from app.data import mock_store
+from app.schemas.water import StreamStats
+from app.services.broadcaster import (
+  telemetry_broadcaster,
+  telemetry_delta_broadcaster,
+)
+from app.services.connections import ClientConnection, client_connections
+from app.services.incident_stream import incident_stream
 
 router = APIRouter(prefix="/ws", tags=["realtime"])
 
 
+def _split(value: str | None) -> list[str] | None:
+  if value is None:
+    return None
+  return [item.strip() for item in value.split(",") if item.strip()]
+
+
+async def _serve_subscription_changes(
+  websocket: WebSocket,
+  connection: ClientConnection,
+  change: Callable[..., Awaitable[None] | None],
+  filter_key: str = "types",
+) -> None:
+  """Apply `{"action": "subscribe"|"unsubscribe", "zones": [...], <filter_key>: [...]}` messages.
+
+  `change` receives the connection, the action, `zones` and the `filter_key`
+  list as keywords, and may be a coroutine function. Frames are pushed
+  through the connection's outbound queue; this loop only handles
+  subscription changes until the client disconnects or the connection is
+  dropped as a slow consumer.
+  """
+  while True:
+    message = await websocket.receive_text()
+    if connection.closed:
+      return
+    try:
+      request = json.loads(message)
+      if not isinstance(request, dict):
+        raise ValueError("Subscription message must be a JSON object")
+      zones, filters = request.get("zones", []), request.get(filter_key, [])
+      if not isinstance(zones, list) or not isinstance(filters, list):
+        raise ValueError(f"zones and {filter_key} must be lists")
+      changed = change(
+        connection,
+        request.get("action"),
+        zones=[str(item) for item in zones],
+        **{filter_key: [str(item) for item in filters]},
+      )
+      if inspect.isawaitable(changed):
+        await changed
+    except ValueError as exc:
+      connection.offer(json.dumps({"type": "error", "detail": str(exc)}))
+
+
+@router.get("/stats", response_model=StreamStats)
+async def stream_stats() -> StreamStats:
+  """Outbound queue depth, lag and dropped frames of this worker's realtime clients."""
+  return client_connections.stats()
+
+
 @router.websocket("/telemetry")
-async def telemetry_stream(websocket: WebSocket) -> None:
+async def telemetry_stream(
+  websocket: WebSocket,
+  zones: str | None = Query(default=None, description="Comma-separated zone ids; all zones when omitted"),
+  types: str | None = Query(default=None, description="Comma-separated: telemetry, incidents, schedules"),
+) -> None:
   await websocket.accept()
+  connection = client_connections.open(websocket, stream="telemetry")
   try:
-    while True:
-      payload = {
-        "type": "telemetry_snapshot",
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "data": [snapshot.model_dump() for snapshot in mock_store.latest_telemetry()],
-      }
-      await websocket.send_text(json.dumps(payload))
-      await asyncio.sleep(5)
+    await telemetry_broadcaster.subscribe(connection, types=_split(types), zones=_split(zones))
+    await _serve_subscription_changes(websocket, connection, telemetry_broadcaster.change_subscription)
+  except ValueError as exc:
+    await websocket.close(code=1008, reason=str(exc))
   except WebSocketDisconnect:
     return
+  finally:
+    telemetry_broadcaster.unsubscribe(connection)
+    client_connections.release(connection)
+
 
+@router.websocket("/telemetry/v2")
+async def telemetry_delta_stream(
+  websocket: WebSocket,
+  since_seq: int | None = Query(default=None, ge=0),
+  since_epoch: str | None = Query(default=None, description="`epoch` of the frame `since_seq` came from"),
+  zones: str | None = Query(default=None, description="Comma-separated zone ids; all zones when omitted"),
+  types: str | None = Query(default=None, description="Comma-separated: telemetry, incidents, schedules"),
+) -> None:
+  """Full snapshot (or replayed deltas after `since_seq` of the same `since_epoch`), then per-tick deltas."""
+  await websocket.accept()
+  connection = client_connections.open(websocket, stream="telemetry/v2")
+  try:
+    await telemetry_delta_broadcaster.subscribe(
+      connection, types=_split(types), zones=_split(zones), since_seq=since_seq, since_epoch=since_epoch,
+    )
+    await _serve_subscription_changes(websocket, connection, telemetry_delta_broadcaster.change_subscription)
+  except ValueError as exc:
+    await websocket.close(code=1008, reason=str(exc))
+  except WebSocketDisconnect:
+    return
+  finally:
+    telemetry_delta_broadcaster.unsubscribe(connection)
+    client_connections.release(connection)
+
+
+@router.websocket("/incidents")
+async def incident_event_stream(
+  websocket: WebSocket,
+  zones: str | None = Query(default=None, description="Comma-separated zone ids; all zones when omitted"),
+  severities: str | None = Query(default=None, description="Comma-separated: low, moderate, critical"),
+) -> None:
+  """Incident created, status-changed, merged and updated events as they are written.
+
+  Send `{"action": "subscribe"|"unsubscribe", "zones": [...], "severities": [...]}` to change filters.
+  """
+  await websocket.accept()
+  connection = client_connections.open(websocket, stream="incidents")
+  try:
+    incident_stream.subscribe(connection, zones=_split(zones), severities=_split(severities))
+    await _serve_subscription_changes(websocket, connection, incident_stream.change, filter_key="severities")
+  except ValueError as exc:
+    await websocket.close(code=1008, reason=str(exc))
+  except WebSocketDisconnect:
+    return
+  finally:
+    incident_stream.unsubscribe(connection)
+    client_connections.release(connection)
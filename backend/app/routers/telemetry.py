@@ -1,22 +1,137 @@
-from fastapi import APIRouter
+from datetime import datetime
 
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from pydantic import TypeAdapter
+
+from app.core.config import get_settings
 from app.data import mock_store
-from app.schemas.water import DemandForecastPoint, FairnessMetric, TelemetrySnapshot
+from app.data.telemetry_store import telemetry_store
+from app.schemas.water import (
+  DemandForecastPoint,
+  FairnessMetric,
+  TelemetryIngestResult,
+  TelemetryRollupPoint,
+  TelemetrySnapshot,
+)
+from app.services import telemetry_history, telemetry_ingest
+from app.services.demand_forecast import ALL_ZONES, current_hour, demand_forecaster
+from app.services.response_cache import response_cache
+from app.services.store_sync import store_sync
 
 router = APIRouter(prefix="/telemetry", tags=["telemetry"])
 
+_fairness_json = TypeAdapter(list[FairnessMetric])
+_forecast_json = TypeAdapter(list[DemandForecastPoint])
+
+
+@router.get(
+  "/",
+  response_model=list[TelemetrySnapshot] | list[TelemetryRollupPoint],
+  summary="City telemetry readings or rollups",
+)
+async def get_citywide_telemetry(
+  since: datetime | None = Query(default=None, description="Only readings at or after this time"),
+  until: datetime | None = Query(default=None, description="Only readings strictly before this time"),
+  zone_id: str | None = Query(default=None, description="Filter readings by zone"),
+  resolution: str | None = Query(
+    default=None,
+    description="Coarsest acceptable spacing, e.g. raw, 15m, 1h, 1d; served from 1m/1h/1d rollups",
+  ),
+  max_points: int | None = Query(
+    default=None,
+    ge=1,
+    le=10_000,
+    description="Point budget; coarser rollup tiers are used until the range fits",
+  ),
+  limit: int = Query(default=500, ge=1, le=10_000, description="Maximum number of most recent points when max_points is not set"),
+) -> list[TelemetrySnapshot] | list[TelemetryRollupPoint]:
+  try:
+    return telemetry_history.query_history(
+      telemetry_store,
+      since=since,
+      until=until,
+      zone_id=zone_id,
+      resolution=resolution,
+      max_points=max_points,
+      limit=limit,
+    )
+  except ValueError as exc:
+    raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
 
-@router.get("/", response_model=list[TelemetrySnapshot], summary="Latest city telemetry")
-async def get_citywide_telemetry() -> list[TelemetrySnapshot]:
-  return mock_store.latest_telemetry()
+
+@router.post(
+  "/ingest",
+  response_model=TelemetryIngestResult,
+  summary="Bulk ingest a batch of sensor readings",
+  openapi_extra={
+    "requestBody": {
+      "required": True,
+      "content": {
+        "application/x-ndjson": {"schema": {"type": "string"}},
+        telemetry_ingest.BINARY_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+      },
+    }
+  },
+)
+async def ingest_telemetry(request: Request) -> TelemetryIngestResult:
+  media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+  body = await request.body()
+  try:
+    batch = telemetry_ingest.decode(body, media_type)
+  except telemetry_ingest.UnsupportedMediaType as exc:
+    raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc))
+  except ValueError as exc:
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+  if len(batch) > get_settings().telemetry_ingest_max_rows:
+    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Batch has too many rows")
+  accepted, checked = telemetry_ingest.validate(batch, known_zones=mock_store.known_zone_ids())
+  # Every worker, this one included, applies the batch when it arrives on the telemetry channel.
+  try:
+    applied = await store_sync.publish_telemetry(accepted)
+  except TimeoutError:
+    raise HTTPException(
+      status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+      detail="Telemetry batch was published but not confirmed as stored",
+    )
+  return telemetry_ingest.settle(checked, applied)
 
 
 @router.get("/fairness", response_model=list[FairnessMetric], summary="Fairness metrics history")
-async def get_fairness_metrics() -> list[FairnessMetric]:
-  return mock_store.list_fairness_metrics()
+async def get_fairness_metrics() -> Response:
+  body = await response_cache("telemetry_fairness").get(
+    "history",
+    mock_store.store_version("fairness"),
+    lambda: _fairness_json.dump_json(mock_store.list_fairness_metrics()),
+  )
+  return Response(content=body, media_type="application/json")
 
 
 @router.get("/demand-forecast", response_model=list[DemandForecastPoint], summary="Demand forecast horizon")
-async def get_demand_forecast() -> list[DemandForecastPoint]:
-  return mock_store.list_demand_forecast()
+async def get_demand_forecast(
+  zone_id: str | None = Query(default=None, description="Forecast a single zone; every zone with enough history by default"),
+  horizon_hours: int = Query(default=24, ge=1, le=168, description="Hours ahead, starting with the current hour"),
+) -> Response:
+  if zone_id is not None and mock_store.get_zone(zone_id) is None:
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown zone")
+  enabled = get_settings().enable_demand_forecast
+  start = current_hour()
+  # The forecaster refreshes under its lock inside the offloaded encode, never on the event loop.
+  body = await response_cache("telemetry_demand_forecast").get(
+    (zone_id, horizon_hours),
+    (enabled, demand_forecaster.source_version, start),
+    lambda: _forecast_body(enabled, zone_id, horizon_hours, start),
+    offload=True,
+  )
+  return Response(content=body, media_type="application/json")
+
 
+def _forecast_body(enabled: bool, zone_id: str | None, horizon_hours: int, start: int) -> bytes:
+  if enabled:
+    body = demand_forecaster.encoded(ALL_ZONES if zone_id is None else zone_id, horizon_hours, start)
+    if body is not None:
+      return body
+  if zone_id is not None:
+    # The static forecast is citywide; a zone without enough history has no forecast yet.
+    return b"[]"
+  # Not enough telemetry history yet: serve the planning team's static forecast.
+  return _forecast_json.dump_json(mock_store.list_demand_forecast())
@@ -1,14 +1,45 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 
 from app.data import mock_store
+from app.data.zone_index import zone_index
+from app.routers.incidents import NEXT_CURSOR_HEADER, incident_page
 from app.schemas.water import IncidentReport, WaterZone
+from app.services.zone_geometry import zone_geometry
 
 router = APIRouter(prefix="/zones", tags=["zones"])
 
 
 @router.get("/", response_model=list[WaterZone], summary="List all distribution zones")
-async def get_zones() -> list[WaterZone]:
-  return mock_store.list_zones()
+async def get_zones(
+  zoom: int | None = Query(default=None, ge=0, le=24, description="Map zoom to simplify boundaries for; full precision when omitted"),
+) -> Response:
+  return Response(content=zone_geometry.encoded_zones(zoom), media_type="application/json")
+
+
+@router.get("/bbox", response_model=list[WaterZone], summary="Zones within a map view")
+async def get_zones_in_view(
+  min_lat: float = Query(..., ge=-90, le=90),
+  min_lon: float = Query(..., ge=-180, le=180),
+  max_lat: float = Query(..., ge=-90, le=90),
+  max_lon: float = Query(..., ge=-180, le=180),
+  zoom: int | None = Query(default=None, ge=0, le=24, description="Map zoom to simplify boundaries for; full precision when omitted"),
+) -> Response:
+  if min_lat > max_lat or min_lon > max_lon:
+    raise HTTPException(status_code=422, detail="min_lat and min_lon must not exceed max_lat and max_lon")
+  zone_ids = zone_index.intersecting(min_lat, min_lon, max_lat, max_lon)
+  return Response(content=zone_geometry.encoded_zones(zoom, zone_ids), media_type="application/json")
+
+
+@router.get("/locate", response_model=WaterZone, summary="Zone containing a point")
+async def locate_zone(
+  lat: float = Query(..., ge=-90, le=90, description="Latitude in degrees"),
+  lon: float = Query(..., ge=-180, le=180, description="Longitude in degrees"),
+) -> WaterZone:
+  zone_id = zone_index.locate(lat, lon)
+  zone = mock_store.get_zone(zone_id) if zone_id is not None else None
+  if zone is None:
+    raise HTTPException(status_code=404, detail="No zone contains this point")
+  return zone
 
 
 @router.get("/{zone_id}", response_model=WaterZone, summary="Get zone details by ID")
@@ -24,6 +55,11 @@ async def get_zone(zone_id: str) -> WaterZone:
   response_model=list[IncidentReport],
   summary="Incidents reported in this zone",
 )
-async def get_zone_incidents(zone_id: str) -> list[IncidentReport]:
-  return mock_store.list_incidents(zone_id=zone_id)
+async def get_zone_incidents(
+  zone_id: str,
+  response: Response,
+  limit: int = Query(default=100, ge=1, le=1_000, description="Page size, newest first"),
+  after: str | None = Query(default=None, description=f"Cursor from the previous page's {NEXT_CURSOR_HEADER} header"),
+) -> list[IncidentReport]:
+  return incident_page(response, limit, after, zone_id=zone_id)
 
@@ -1,12 +1,13 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Literal, Sequence
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 PressureLevel = Literal['low', 'medium', 'high']
 IncidentSeverity = Literal['low', 'moderate', 'critical']
 IncidentSource = Literal['sensor', 'citizen']
+IncidentStatus = Literal['open', 'acknowledged', 'resolved']
 IncidentType = Literal['leak', 'low_pressure', 'contamination', 'outage', 'over_pumping']
 ScheduleStatus = Literal['scheduled', 'running', 'paused', 'completed']
 
@@ -40,6 +41,59 @@ class TelemetrySnapshot(BaseModel):
   incidents_today: int = Field(..., ge=0)
 
 
+class MetricRollup(BaseModel):
+  min: float
+  max: float
+  mean: float
+  sum: float
+
+
+class TelemetryRollupPoint(BaseModel):
+  timestamp: datetime
+  zone_id: str | None = None
+  resolution_seconds: int = Field(..., gt=0)
+  count: int = Field(..., ge=0)
+  flow_ml: MetricRollup
+  pressure_psi: MetricRollup
+  energy_kw: MetricRollup
+
+
+class TelemetryIngestResult(BaseModel):
+  accepted: int = Field(..., ge=0)
+  rejected: int = Field(..., ge=0)
+  rejection_reasons: dict[str, int] = Field(default_factory=dict)
+
+
+class StreamClientStats(BaseModel):
+  id: int
+  stream: str
+  policy: str
+  connected_at: datetime
+  queued_frames: int = Field(..., ge=0)
+  lag_seconds: float = Field(..., ge=0)
+  frames_sent: int = Field(..., ge=0)
+  frames_dropped: int = Field(..., ge=0)
+  missed_frames: int = Field(..., ge=0)
+  bytes_sent: int = Field(..., ge=0)
+
+
+class StreamStats(BaseModel):
+  connections: int = Field(..., ge=0)
+  lagging_connections: int = Field(..., ge=0)
+  max_lag_seconds: float = Field(..., ge=0)
+  frames_dropped: int = Field(..., ge=0)
+  clients: list[StreamClientStats]
+
+
+class ResponseCacheStats(BaseModel):
+  name: str
+  entries: int = Field(..., ge=0)
+  in_flight: int = Field(..., ge=0)
+  hits: int = Field(..., ge=0)
+  misses: int = Field(..., ge=0, description="Computations started")
+  coalesced: int = Field(..., ge=0, description="Requests that awaited a computation already in flight")
+
+
 class DemandForecastPoint(BaseModel):
   timestamp: datetime
   demand_ml: float = Field(..., ge=0)
@@ -57,6 +111,35 @@ class PumpSchedule(BaseModel):
   recommendation_reason: str | None = None
 
 
+class PumpScheduleCreate(BaseModel):
+  pump_id: str
+  zone_id: str
+  start_time_utc: datetime
+  end_time_utc: datetime
+  flow_rate_lps: float = Field(..., gt=0)
+  recommendation_reason: str | None = None
+
+  @model_validator(mode="after")
+  def _ends_after_start(self) -> "PumpScheduleCreate":
+    if self.end_time_utc <= self.start_time_utc:
+      raise ValueError("end_time_utc must be after start_time_utc")
+    return self
+
+
+class ScheduleOptimizationRequest(BaseModel):
+  day: date | None = Field(default=None, description="UTC day to plan; tomorrow by default")
+
+
+class ScheduleOptimizationResult(BaseModel):
+  day: date
+  min_supply_hours: float = Field(..., ge=0, le=24)
+  zone_supply_hours: dict[str, float]
+  schedules: list[PumpSchedule]
+  energy_kwh: float = Field(default=0, ge=0)
+  energy_cost: float = Field(default=0, ge=0)
+  solve_seconds: float = Field(..., ge=0)
+
+
 class PumpStation(BaseModel):
   id: str
   name: str
@@ -64,6 +147,7 @@ class PumpStation(BaseModel):
   status: Literal['operational', 'maintenance', 'offline']
   energy_use_kw: float = Field(..., ge=0)
   health_score: float = Field(..., ge=0, le=1)
+  max_flow_lps: float = Field(default=450, ge=0)
 
 
 class ReservoirStatus(BaseModel):
@@ -75,6 +159,100 @@ class ReservoirStatus(BaseModel):
   pumps_connected: Sequence[str]
 
 
+class ReservoirProjection(BaseModel):
+  reservoir_id: str
+  start_time: datetime
+  step_hours: float = Field(..., gt=0)
+  levels_ml: list[float] = Field(..., description="Level at the start and after each step")
+  min_level_ml: float = Field(..., ge=0)
+  hours_until_empty: float | None = Field(default=None, ge=0, description="None when it lasts the whole horizon")
+
+
+class TariffBand(BaseModel):
+  name: str
+  start_hour: float = Field(..., ge=0, le=24, description="Local time")
+  end_hour: float = Field(..., ge=0, le=24, description="Local time; earlier than start_hour wraps past midnight")
+  price_per_kwh: float = Field(..., ge=0)
+
+
+class EnergyCostRollup(BaseModel):
+  id: str | None = Field(default=None, description="Zone or pump id; None for citywide meters")
+  energy_kwh: float = Field(..., ge=0)
+  cost: float = Field(..., ge=0)
+
+
+class EnergyCostReport(BaseModel):
+  start: datetime
+  end: datetime
+  currency: str
+  resolution_seconds: int = Field(..., description="Rollup tier the metered figures were priced from")
+  energy_kwh: float = Field(..., ge=0, description="Metered across all zones")
+  cost: float = Field(..., ge=0, description="Metered across all zones")
+  zones: list[EnergyCostRollup] = Field(..., description="Metered telemetry energy per zone")
+  pumps: list[EnergyCostRollup] = Field(..., description="Scheduled pump runs at rated power")
+  tariff: list[TariffBand]
+
+
+class ProjectedReservoir(ReservoirStatus):
+  projection: ReservoirProjection
+
+
+class SimulationScenario(BaseModel):
+  name: str
+  pumps_offline: list[str] = Field(default_factory=list)
+  excluded_schedule_ids: list[str] = Field(default_factory=list)
+  extra_schedules: list[PumpSchedule] = Field(default_factory=list)
+  zone_supply_cut_hours: dict[str, float] = Field(
+    default_factory=dict,
+    description="Hours of scheduled supply removed per zone, taken from the end of its last runs",
+  )
+  reservoir_levels_ml: dict[str, float] = Field(default_factory=dict, description="Override starting levels")
+  reservoir_inflow_ml_per_hour: dict[str, float] = Field(default_factory=dict)
+  demand_multiplier: float = Field(default=1.0, ge=0)
+
+
+class SimulationRequest(BaseModel):
+  scenarios: list[SimulationScenario] = Field(..., min_length=1, max_length=500)
+  start_time: datetime | None = Field(default=None, description="Defaults to the start of the current hour")
+  hours: int = Field(default=24, ge=1, le=72)
+  step_minutes: int = Field(default=1, ge=1, le=60)
+
+
+class ScenarioResult(BaseModel):
+  name: str
+  min_supply_hours: float = Field(..., ge=0)
+  average_supply_hours: float = Field(..., ge=0)
+  fairness_score: float = Field(..., ge=0, le=1)
+  delivered_ml: float = Field(..., ge=0)
+  unmet_demand_ml: float = Field(..., ge=0)
+  zone_supply_hours: dict[str, float]
+  reservoirs: list[ReservoirProjection]
+
+
+class SimulationBatchResult(BaseModel):
+  start_time: datetime
+  hours: int
+  step_minutes: int
+  scenarios: list[ScenarioResult]
+  elapsed_seconds: float = Field(..., ge=0)
+
+
+NetworkNodeKind = Literal['reservoir', 'pump', 'zone']
+
+
+class NetworkNode(BaseModel):
+  id: str
+  kind: NetworkNodeKind
+  name: str
+
+
+class NetworkNeighbours(BaseModel):
+  node: NetworkNode
+  reservoirs: list[NetworkNode] = Field(default_factory=list)
+  pumps: list[NetworkNode] = Field(default_factory=list)
+  zones: list[NetworkNode] = Field(default_factory=list)
+
+
 class IncidentReport(BaseModel):
   id: str
   zone_id: str
@@ -83,18 +261,36 @@ class IncidentReport(BaseModel):
   severity: IncidentSeverity
   description: str
   reported_at: datetime
-  status: Literal['open', 'acknowledged', 'resolved']
+  status: IncidentStatus
+  # When the status last became "resolved"; None while unresolved.
+  resolved_at: datetime | None = None
   coordinates: tuple[float, float]
+  # Citizen reports merged into this incident, counting the first.
+  reporter_count: int = Field(default=1, ge=1)
+
+
+class IncidentStatusUpdate(BaseModel):
+  status: IncidentStatus
 
 
 class CitizenReportCreate(BaseModel):
   name: str
   phone: str
   ward_number: int = Field(..., ge=1)
-  zone_id: str
+  zone_id: str | None = None
   type: IncidentType
   description: str
   photo_url: str | None = None
+  latitude: float | None = Field(default=None, ge=-90, le=90)
+  longitude: float | None = Field(default=None, ge=-180, le=180)
+
+  @model_validator(mode="after")
+  def _has_location(self) -> "CitizenReportCreate":
+    if (self.latitude is None) != (self.longitude is None):
+      raise ValueError("latitude and longitude must be given together")
+    if self.zone_id is None and self.latitude is None:
+      raise ValueError("zone_id or latitude and longitude are required")
+    return self
 
 
 class FairnessMetric(BaseModel):
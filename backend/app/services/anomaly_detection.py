@@ -0,0 +1,234 @@
+"""Streaming anomaly detection over ingested telemetry.
+
+Keeps, per zone and metric, an exponentially weighted mean and variance plus
+the previous reading, and checks every new reading against them before folding
+it in. Each reading costs O(1) work and history is never rescanned. A batch is
+processed in rounds: round `r` holds the `r`-th reading of every zone in the
+batch, so each round is one vectorized update over distinct zones.
+
+Rules, each with a per-zone cooldown:
+
+- `flow_surge`: flow far above its running mean (likely leak).
+- `pressure_low`: pressure far below its running mean.
+- `energy_spike`: pump energy far above its running mean (over-pumping).
+- `pressure_drop`: pressure falling faster than `pressure_drop_psi_per_minute`.
+
+Incident ids are derived from zone, rule and reading timestamp, so every
+worker applying the same telemetry log derives the same incidents.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Callable, Mapping
+
+import numpy as np
+
+from app.core.config import Settings, get_settings
+from app.data import mock_store
+from app.data.telemetry_store import TelemetryStore, from_epoch
+from app.schemas.water import IncidentReport, IncidentSeverity, IncidentType
+from app.services.store_sync import store_sync
+
+METRICS = ("flow_ml", "pressure_psi", "energy_kw")
+_FLOW, _PRESSURE, _ENERGY = range(3)
+
+# (rule key, metric index, direction, incident type); direction +1 flags highs, -1 lows.
+Z_RULES: tuple[tuple[str, int, int, IncidentType], ...] = (
+  ("flow_surge", _FLOW, 1, "leak"),
+  ("pressure_low", _PRESSURE, -1, "low_pressure"),
+  ("energy_spike", _ENERGY, 1, "over_pumping"),
+)
+RULES = (*(rule[0] for rule in Z_RULES), "pressure_drop")
+_DROP = len(Z_RULES)
+
+_METRIC_LABELS = {
+  _FLOW: ("Flow", "ML"),
+  _PRESSURE: ("Pressure", "psi"),
+  _ENERGY: ("Pump energy", "kW"),
+}
+
+logger = logging.getLogger(__name__)
+
+IncidentSink = Callable[[list[IncidentReport]], None]
+
+
+class AnomalyDetector:
+  def __init__(
+    self,
+    alpha: float,
+    z_threshold: float,
+    warmup_readings: int,
+    pressure_drop_psi_per_minute: float,
+    cooldown_seconds: int,
+    on_incidents: IncidentSink | None = None,
+  ) -> None:
+    self.alpha = alpha
+    self.z_threshold = z_threshold
+    self.warmup_readings = warmup_readings
+    self.pressure_drop_psi_per_minute = pressure_drop_psi_per_minute
+    self.cooldown_seconds = cooldown_seconds
+    self.on_incidents = on_incidents
+    self.readings_seen = 0
+    self._mean = np.zeros((0, len(METRICS)))
+    self._var = np.zeros((0, len(METRICS)))
+    self._last = np.zeros((0, len(METRICS)))
+    self._last_ts = np.zeros(0, dtype=np.int64)
+    self._count = np.zeros(0, dtype=np.int64)
+    self._last_alert = np.zeros((0, len(RULES)), dtype=np.int64)
+
+  @classmethod
+  def from_settings(cls, settings: Settings, on_incidents: IncidentSink | None = None) -> AnomalyDetector:
+    return cls(
+      alpha=settings.anomaly_ewma_alpha,
+      z_threshold=settings.anomaly_z_threshold,
+      warmup_readings=settings.anomaly_warmup_readings,
+      pressure_drop_psi_per_minute=settings.anomaly_pressure_drop_psi_per_minute,
+      cooldown_seconds=settings.anomaly_cooldown_seconds,
+      on_incidents=on_incidents,
+    )
+
+  def observe(self, store: TelemetryStore, columns: Mapping[str, np.ndarray]) -> list[IncidentReport]:
+    """Fold a time-ordered batch into the running statistics; returns new incidents."""
+    zones = np.asarray(columns["zone"], dtype=np.int64)
+    if not len(zones):
+      return []
+    self._grow(int(zones.max()) + 1)
+    timestamps = np.asarray(columns["timestamp"], dtype=np.int64)
+    values = np.column_stack([np.asarray(columns[metric], dtype=np.float64) for metric in METRICS])
+
+    # Rank of each reading among its zone's readings in this batch.
+    order = np.argsort(zones, kind="stable")
+    sorted_zones = zones[order]
+    starts = np.flatnonzero(np.r_[True, sorted_zones[1:] != sorted_zones[:-1]])
+    rank = np.empty(len(zones), dtype=np.int64)
+    rank[order] = np.arange(len(zones)) - np.repeat(starts, np.diff(np.r_[starts, len(zones)]))
+    by_round = np.argsort(rank, kind="stable")
+    bounds = np.r_[0, np.cumsum(np.bincount(rank))]
+
+    alerts: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+      rows = by_round[lo:hi]
+      alerts.extend(self._step(rows, zones[rows], timestamps[rows], values[rows]))
+    self.readings_seen += len(zones)
+
+    incidents = self._incidents(store, alerts, zones, timestamps, values) if alerts else []
+    if incidents and self.on_incidents is not None:
+      self.on_incidents(incidents)
+    return incidents
+
+  def _step(
+    self,
+    rows: np.ndarray,
+    zones: np.ndarray,
+    timestamps: np.ndarray,
+    values: np.ndarray,
+  ) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """One vectorized update over readings from distinct zones."""
+    mean, var, count = self._mean[zones], self._var[zones], self._count[zones]
+    flagged: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+    warm = count >= self.warmup_readings
+    # Floor the deviation so a perfectly flat series does not alert on noise.
+    sd = np.maximum(np.sqrt(var), 1e-3 + 0.01 * np.abs(mean))
+    scores = (values - mean) / sd
+    for rule, (_, metric, direction, _) in enumerate(Z_RULES):
+      score = direction * scores[:, metric]
+      flagged.append(self._flag(rows, zones, timestamps, rule, warm & (score > self.z_threshold), score))
+
+    seen = count > 0
+    minutes = np.maximum(timestamps - self._last_ts[zones], 1) / 60
+    drop_rate = (self._last[zones, _PRESSURE] - values[:, _PRESSURE]) / minutes
+    flagged.append(self._flag(
+      rows, zones, timestamps, _DROP, seen & (drop_rate > self.pressure_drop_psi_per_minute), drop_rate,
+    ))
+
+    # West's incremental EWMA mean/variance; the first reading seeds the mean.
+    diff = values - mean
+    increment = self.alpha * diff
+    first = ~seen
+    self._mean[zones] = np.where(first[:, None], values, mean + increment)
+    self._var[zones] = np.where(first[:, None], 0.0, (1 - self.alpha) * (var + diff * increment))
+    self._last[zones] = values
+    self._last_ts[zones] = timestamps
+    self._count[zones] = count + 1
+    return [alert for alert in flagged if len(alert[0])]
+
+  def _flag(
+    self,
+    rows: np.ndarray,
+    zones: np.ndarray,
+    timestamps: np.ndarray,
+    rule: int,
+    hit: np.ndarray,
+    score: np.ndarray,
+  ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Zone code 0 holds citywide readings, which have no zone to raise an incident in.
+    hit &= (zones != 0) & (timestamps - self._last_alert[zones, rule] >= self.cooldown_seconds)
+    hit_zones = zones[hit]
+    self._last_alert[hit_zones, rule] = timestamps[hit]
+    return rows[hit], np.full(len(hit_zones), rule), score[hit]
+
+  def _incidents(
+    self,
+    store: TelemetryStore,
+    alerts: list[tuple[np.ndarray, np.ndarray, np.ndarray]],
+    zones: np.ndarray,
+    timestamps: np.ndarray,
+    values: np.ndarray,
+  ) -> list[IncidentReport]:
+    rows = np.concatenate([alert[0] for alert in alerts])
+    rules = np.concatenate([alert[1] for alert in alerts])
+    scores = np.concatenate([alert[2] for alert in alerts])
+    incidents = []
+    for index in np.argsort(rows, kind="stable").tolist():
+      row, rule, score = int(rows[index]), int(rules[index]), float(scores[index])
+      zone_id = store.zone_id(int(zones[row]))
+      timestamp = int(timestamps[row])
+      zone = mock_store.get_zone(zone_id)
+      if zone is None:
+        # Incidents are placed at the zone centroid; readings for unknown zones have none.
+        logger.warning("Skipping %s alert for unknown zone %s", RULES[rule], zone_id)
+        continue
+      incidents.append(IncidentReport(
+        id=f"sensor-{zone_id}-{RULES[rule]}-{timestamp}",
+        zone_id=zone_id,
+        reported_by="sensor",
+        type="low_pressure" if rule == _DROP else Z_RULES[rule][3],
+        severity=self._severity(rule, score),
+        description=self._describe(rule, score, values[row]),
+        reported_at=from_epoch(timestamp),
+        status="open",
+        coordinates=(zone.centroid_latitude, zone.centroid_longitude),
+      ))
+    return incidents
+
+  def _severity(self, rule: int, score: float) -> IncidentSeverity:
+    threshold = self.pressure_drop_psi_per_minute if rule == _DROP else self.z_threshold
+    return "critical" if score >= 2 * threshold else "moderate"
+
+  def _describe(self, rule: int, score: float, values: np.ndarray) -> str:
+    if rule == _DROP:
+      return f"Rapid pressure drop detected: {score:.1f} psi/min, now {values[_PRESSURE]:.1f} psi."
+    _, metric, direction, _ = Z_RULES[rule]
+    label, unit = _METRIC_LABELS[metric]
+    side = "above" if direction > 0 else "below"
+    return f"{label} {values[metric]:.1f} {unit} is {score:.1f} standard deviations {side} its recent average."
+
+  def _grow(self, zones: int) -> None:
+    size = len(self._count)
+    if zones <= size:
+      return
+    grown = max(zones, 2 * size, 16)
+
+    def pad(array: np.ndarray, fill=0) -> np.ndarray:
+      padded = np.full((grown, *array.shape[1:]), fill, dtype=array.dtype)
+      padded[:size] = array
+      return padded
+
+    self._mean, self._var, self._last = pad(self._mean), pad(self._var), pad(self._last)
+    self._last_ts, self._count = pad(self._last_ts), pad(self._count)
+    # Far enough in the past that the first alert of a zone is never held back.
+    self._last_alert = pad(self._last_alert, np.iinfo(np.int64).min // 2)
+
+
+anomaly_detector = AnomalyDetector.from_settings(get_settings(), on_incidents=store_sync.apply_derived_incidents)
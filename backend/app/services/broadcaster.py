@@ -0,0 +1,421 @@
+"""Single-producer, topic-routed fan-out of realtime frames to WebSocket subscribers.
+
+One background task builds each tick's frames. Every frame is encoded once per
+topic and the same text is offered to the outbound queue of every connection
+subscribed to it, so per-tick work follows the number of subscribed topics
+rather than clients x zones, and a slow client never stalls the producer.
+Topics are (message type, zone) pairs; `ALL_ZONES` covers every zone.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Iterable
+
+from app.core.config import get_settings
+from app.data.telemetry_store import TelemetryStore, telemetry_store
+from app.schemas.water import TelemetrySnapshot
+from app.services.connections import ClientConnection
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_TYPES = ("telemetry", "incidents", "schedules")
+ALL_ZONES = "*"
+
+Topic = tuple[str, str]
+
+
+class Subscription:
+  """Message types and zones one connection wants; everything by default."""
+
+  def __init__(
+    self,
+    connection: ClientConnection,
+    types: Iterable[str] | None = None,
+    zones: Iterable[str] | None = None,
+  ) -> None:
+    self.connection = connection
+    self.types = set(MESSAGE_TYPES if types is None else _checked_types(types))
+    self.zones = {ALL_ZONES} if zones is None else set(zones)
+
+  def topics(self) -> set[Topic]:
+    # A wildcard subscription already covers every zone topic.
+    zones = {ALL_ZONES} if ALL_ZONES in self.zones else self.zones
+    return {(message_type, zone) for message_type in self.types for zone in zones}
+
+
+def _checked_types(types: Iterable[str]) -> list[str]:
+  types = list(types)
+  unknown = [message_type for message_type in types if message_type not in MESSAGE_TYPES]
+  if unknown:
+    raise ValueError(f"Unknown message types: {', '.join(map(str, unknown))}")
+  return types
+
+
+class TopicHub:
+  """Live connections indexed by the topics they subscribe to."""
+
+  def __init__(self) -> None:
+    self._subscriptions: dict[ClientConnection, Subscription] = {}
+    self._index: dict[Topic, set[ClientConnection]] = {}
+
+  def __len__(self) -> int:
+    return len(self._subscriptions)
+
+  def register(
+    self,
+    connection: ClientConnection,
+    types: Iterable[str] | None = None,
+    zones: Iterable[str] | None = None,
+  ) -> Subscription:
+    subscription = Subscription(connection, types, zones)
+    self.unregister(connection)
+    self._subscriptions[connection] = subscription
+    self._index_topics(connection, subscription.topics())
+    return subscription
+
+  def unregister(self, connection: ClientConnection) -> None:
+    subscription = self._subscriptions.pop(connection, None)
+    if subscription is not None:
+      self._unindex_topics(connection, subscription.topics())
+
+  def subscription(self, connection: ClientConnection) -> Subscription | None:
+    return self._subscriptions.get(connection)
+
+  def change(
+    self,
+    connection: ClientConnection,
+    action: str,
+    types: Iterable[str] = (),
+    zones: Iterable[str] = (),
+  ) -> set[Topic]:
+    """Apply a subscribe/unsubscribe request; returns the topics newly added.
+
+    A connection dropped by `deliver` has no subscription left and gains nothing.
+    """
+    subscription = self._subscriptions.get(connection)
+    if subscription is None:
+      return set()
+    types, zones = set(_checked_types(types)), set(zones)
+    before = subscription.topics()
+    if action == "subscribe":
+      subscription.types |= types
+      subscription.zones |= zones
+    elif action == "unsubscribe":
+      subscription.types -= types
+      subscription.zones -= zones
+    else:
+      raise ValueError(f"Unknown action: {action}")
+    after = subscription.topics()
+    self._unindex_topics(connection, before - after)
+    self._index_topics(connection, after - before)
+    return after - before
+
+  def zones(self, message_type: str) -> list[str]:
+    """Zones (including `ALL_ZONES`) with at least one subscriber for `message_type`."""
+    return [zone for kind, zone in self._index if kind == message_type]
+
+  def subscribers(self, topics: Iterable[Topic]) -> set[ClientConnection]:
+    connections: set[ClientConnection] = set()
+    for topic in topics:
+      connections |= self._index.get(topic, set())
+    return connections
+
+  def publish(self, topics: Iterable[Topic], frame: str) -> int:
+    """Queue `frame` once for every connection subscribed to any of `topics`."""
+    return self.deliver((connection, frame) for connection in self.subscribers(topics))
+
+  def publish_many(self, frames: Iterable[tuple[Topic, str]]) -> int:
+    """Queue one frame per topic for that topic's subscribers."""
+    return self.deliver(
+      (connection, frame) for topic, frame in frames for connection in list(self._index.get(topic, ()))
+    )
+
+  def deliver(self, deliveries: Iterable[tuple[ClientConnection, str]]) -> int:
+    """Offer each (connection, frame) pair, dropping connections that have closed."""
+    delivered = 0
+    closed = []
+    for connection, frame in deliveries:
+      if connection.offer(frame):
+        delivered += 1
+      else:
+        closed.append(connection)
+    for connection in closed:
+      self.unregister(connection)
+    return delivered
+
+  def _index_topics(self, connection: ClientConnection, topics: Iterable[Topic]) -> None:
+    for topic in topics:
+      self._index.setdefault(topic, set()).add(connection)
+
+  def _unindex_topics(self, connection: ClientConnection, topics: Iterable[Topic]) -> None:
+    for topic in topics:
+      connections = self._index.get(topic)
+      if connections is not None:
+        connections.discard(connection)
+        if not connections:
+          del self._index[topic]
+
+
+class Broadcaster:
+  """Runs one producer per tick while at least one subscriber is connected.
+
+  `build_frame(zone)` returns the encoded telemetry frame for one zone topic
+  (`ALL_ZONES` for the citywide frame), or None when there is nothing to send.
+  """
+
+  def __init__(
+    self,
+    build_frame: Callable[[str], str | None],
+    interval_seconds: float,
+    hub: TopicHub | None = None,
+  ) -> None:
+    self.build_frame = build_frame
+    self.interval_seconds = interval_seconds
+    self.hub = hub or TopicHub()
+    self.frames_built = 0
+    self._latest_frames: dict[str, str] = {}
+    self._producer: asyncio.Task[None] | None = None
+
+  @property
+  def running(self) -> bool:
+    return self._producer is not None and not self._producer.done()
+
+  async def subscribe(
+    self,
+    connection: ClientConnection,
+    types: Iterable[str] | None = None,
+    zones: Iterable[str] | None = None,
+  ) -> None:
+    """Register `connection` and immediately send it the latest frame of each telemetry topic."""
+    subscription = self.hub.register(connection, types, zones)
+    self._send_latest(connection, subscription.topics())
+    self.start()
+
+  async def change_subscription(
+    self,
+    connection: ClientConnection,
+    action: str,
+    types: Iterable[str] = (),
+    zones: Iterable[str] = (),
+  ) -> None:
+    added = self.hub.change(connection, action, types, zones)
+    self._send_latest(connection, added)
+
+  def unsubscribe(self, connection: ClientConnection) -> None:
+    self.hub.unregister(connection)
+    if not len(self.hub):
+      self.stop()
+
+  def start(self) -> None:
+    if not self.running:
+      self._producer = asyncio.create_task(self._run())
+
+  def stop(self) -> None:
+    if self._producer is not None:
+      self._producer.cancel()
+      self._producer = None
+
+  def publish_event(self, message_type: str, zone_id: str | None, frame: str) -> int:
+    """Fan out an out-of-band frame (e.g. an incident event) immediately."""
+    topics = [(message_type, ALL_ZONES)]
+    if zone_id is not None:
+      topics.append((message_type, zone_id))
+    return self.hub.publish(topics, frame)
+
+  async def tick(self) -> int:
+    """Build one frame per subscribed telemetry topic and fan it out."""
+    latest: dict[str, str] = {}
+    for zone in self.hub.zones("telemetry"):
+      frame = self._produce(zone)
+      if frame is not None:
+        latest[zone] = frame
+    self._latest_frames = latest
+    return self.hub.publish_many((("telemetry", zone), frame) for zone, frame in latest.items())
+
+  def _send_latest(self, connection: ClientConnection, topics: Iterable[Topic]) -> None:
+    for message_type, zone in sorted(topics):
+      if message_type != "telemetry":
+        continue
+      frame = self._latest_frames.get(zone) if self.running else None
+      if frame is None:
+        frame = self._produce(zone)
+      if frame is not None:
+        self.hub.deliver([(connection, frame)])
+
+  def _produce(self, zone: str) -> str | None:
+    frame = self.build_frame(zone)
+    if frame is not None:
+      self.frames_built += 1
+    return frame
+
+  async def _run(self) -> None:
+    while True:
+      await asyncio.sleep(self.interval_seconds)
+      try:
+        await self.tick()
+      except Exception:
+        logger.exception("Telemetry broadcast tick failed")
+
+
+class DeltaBroadcaster(Broadcaster):
+  """Telemetry stream v2: one full snapshot, then sequenced per-tick deltas.
+
+  Each delta carries only the zones whose latest reading changed since the
+  previous tick. Recent deltas are kept in a bounded replay buffer so a client
+  reconnecting with `since_seq` catches up without a full resync. Zone-filtered
+  subscribers get the same `seq` numbering with only their zones' rows.
+
+  `seq` counts this process's ticks only, so every frame also carries the
+  stream's `epoch`, new per process. A client resuming with another epoch (a
+  restart, or another worker) gets a full snapshot instead of a replay.
+  """
+
+  def __init__(self, store: TelemetryStore, interval_seconds: float, replay_frames: int) -> None:
+    super().__init__(build_frame=lambda zone: None, interval_seconds=interval_seconds)
+    self.store = store
+    self.epoch = uuid.uuid4().hex
+    self.seq = 0
+    # (seq, changed rows by zone, encoded all-zones delta)
+    self._replay: deque[tuple[int, dict[str | None, list[dict]], str]] = deque(maxlen=replay_frames)
+    self._store_head = store.head_seq
+    self._snapshot: tuple[int, str] | None = None
+
+  async def subscribe(
+    self,
+    connection: ClientConnection,
+    types: Iterable[str] | None = None,
+    zones: Iterable[str] | None = None,
+    since_seq: int | None = None,
+    since_epoch: str | None = None,
+  ) -> None:
+    # Nothing here awaits, so a tick cannot slip in between catch-up and registration.
+    subscription = self.hub.register(connection, types, zones)
+    frames = self._catch_up(subscription.zones, since_seq, since_epoch) if "telemetry" in subscription.types else []
+    self.hub.deliver((connection, frame) for frame in frames)
+    self.start()
+
+  async def change_subscription(
+    self,
+    connection: ClientConnection,
+    action: str,
+    types: Iterable[str] = (),
+    zones: Iterable[str] = (),
+  ) -> None:
+    added = self.hub.change(connection, action, types, zones)
+    zones_added = {zone for message_type, zone in added if message_type == "telemetry"}
+    self.hub.deliver((connection, frame) for frame in self._snapshot_frames(zones_added))
+
+  async def tick(self) -> int:
+    head = self.store.head_seq
+    if head == self._store_head:
+      return 0
+    changed = self.store.latest_changed_since(self._store_head)
+    self._store_head = head
+    self.seq += 1
+    rows_by_zone: dict[str | None, list[dict]] = {}
+    for snapshot in changed:
+      rows_by_zone.setdefault(snapshot.zone_id, []).append(snapshot.model_dump(mode="json"))
+    all_frame = _encode_rows("telemetry_delta", [row for rows in rows_by_zone.values() for row in rows], self.seq, epoch=self.epoch)
+    self._replay.append((self.seq, rows_by_zone, all_frame))
+
+    frames: list[tuple[Topic, str]] = []
+    for zone in self.hub.zones("telemetry"):
+      if zone == ALL_ZONES:
+        frames.append((("telemetry", zone), all_frame))
+      elif zone in rows_by_zone:
+        frames.append((("telemetry", zone), _encode_rows("telemetry_delta", rows_by_zone[zone], self.seq, zone, self.epoch)))
+    self.frames_built += len(frames)
+    return self.hub.publish_many(frames)
+
+  def _catch_up(self, zones: set[str], since_seq: int | None, since_epoch: str | None = None) -> list[str]:
+    if since_epoch != self.epoch:
+      # Sequence numbers from another process's stream say nothing about this one.
+      since_seq = None
+    if since_seq is not None and since_seq == self.seq:
+      return []
+    if since_seq is not None and self._replay and self._replay[0][0] - 1 <= since_seq < self.seq:
+      frames: list[str] = []
+      for seq, rows_by_zone, all_frame in self._replay:
+        if seq <= since_seq:
+          continue
+        if ALL_ZONES in zones:
+          frames.append(all_frame)
+        else:
+          frames.extend(
+            _encode_rows("telemetry_delta", rows_by_zone[zone], seq, zone, self.epoch)
+            for zone in sorted(zones)
+            if zone in rows_by_zone
+          )
+      return frames
+    return self._snapshot_frames(zones)
+
+  def _snapshot_frames(self, zones: set[str]) -> list[str]:
+    if ALL_ZONES in zones:
+      if self._snapshot is None or self._snapshot[0] != self.seq:
+        self._snapshot = (self.seq, _encode_frame("telemetry_snapshot", self.store.latest_per_zone(), self.seq, epoch=self.epoch))
+      return [self._snapshot[1]]
+    frames = []
+    for zone in sorted(zones):
+      snapshot = self.store.latest_for_zone(zone)
+      if snapshot is not None:
+        frames.append(_encode_frame("telemetry_snapshot", [snapshot], self.seq, zone, self.epoch))
+    return frames
+
+
+def _encode_rows(
+  frame_type: str,
+  rows: list[dict],
+  seq: int | None = None,
+  zone_id: str | None = None,
+  epoch: str | None = None,
+) -> str:
+  payload: dict[str, object] = {
+    "type": frame_type,
+    "timestamp": datetime.now(timezone.utc).isoformat(),
+    "data": rows,
+  }
+  if zone_id is not None:
+    payload["zone_id"] = zone_id
+  if seq is not None:
+    payload["seq"] = seq
+  if epoch is not None:
+    payload["epoch"] = epoch
+  return json.dumps(payload)
+
+
+def _encode_frame(
+  frame_type: str,
+  snapshots: list[TelemetrySnapshot],
+  seq: int | None = None,
+  zone_id: str | None = None,
+  epoch: str | None = None,
+) -> str:
+  return _encode_rows(frame_type, [snapshot.model_dump(mode="json") for snapshot in snapshots], seq, zone_id, epoch)
+
+
+def build_telemetry_frame(zone: str = ALL_ZONES, store: TelemetryStore = telemetry_store) -> str | None:
+  if zone == ALL_ZONES:
+    return _encode_frame("telemetry_snapshot", store.latest_per_zone())
+  snapshot = store.latest_for_zone(zone)
+  if snapshot is None:
+    return None
+  return _encode_frame("telemetry_snapshot", [snapshot], zone_id=zone)
+
+
+_settings = get_settings()
+
+telemetry_broadcaster = Broadcaster(
+  build_frame=build_telemetry_frame,
+  interval_seconds=_settings.telemetry_broadcast_interval_seconds,
+)
+
+telemetry_delta_broadcaster = DeltaBroadcaster(
+  store=telemetry_store,
+  interval_seconds=_settings.telemetry_broadcast_interval_seconds,
+  replay_frames=_settings.telemetry_replay_frames,
+)
@@ -0,0 +1,207 @@
+"""Per-connection outbound queues for realtime WebSocket clients.
+
+Producers never await a client's socket: they offer frames to its bounded
+queue and a per-connection writer task drains it. When a client falls behind,
+its queue applies the configured slow-consumer policy instead of growing:
+
+- `drop_oldest`: discard the oldest queued frame to make room.
+- `coalesce`: discard everything queued and keep only the newest frame.
+- `disconnect`: drop new frames and close the connection after
+  `max_missed_frames` consecutive misses.
+
+Queued frames are the shared pre-encoded strings, so a full queue holds
+references, not copies.
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Literal, Protocol
+
+from app.core.config import Settings, get_settings
+from app.schemas.water import StreamClientStats, StreamStats
+
+logger = logging.getLogger(__name__)
+
+SlowConsumerPolicy = Literal["drop_oldest", "coalesce", "disconnect"]
+
+# "Try again later": the server gave up on a client that stopped reading.
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+_ids = itertools.count(1)
+
+
+class FrameSink(Protocol):
+  async def send_text(self, data: str) -> None: ...
+
+
+class ClientConnection:
+  """A client socket behind a bounded outbound queue and its own writer task."""
+
+  def __init__(
+    self,
+    sink: FrameSink,
+    max_frames: int,
+    policy: SlowConsumerPolicy,
+    max_missed_frames: int,
+    stream: str = "telemetry",
+  ) -> None:
+    self.id = next(_ids)
+    self.sink = sink
+    self.max_frames = max(1, max_frames)
+    self.policy = policy
+    self.max_missed_frames = max_missed_frames
+    self.stream = stream
+    self.connected_at = datetime.now(timezone.utc)
+    self.closed = False
+    self.frames_sent = 0
+    self.frames_dropped = 0
+    self.bytes_sent = 0
+    # Frames lost since the client last accepted one.
+    self.missed_frames = 0
+    self._queue: deque[tuple[float, str]] = deque()
+    self._in_flight_since: float | None = None
+    self._ready = asyncio.Event()
+    self._writer: asyncio.Task[None] | None = None
+
+  @property
+  def queued_frames(self) -> int:
+    return len(self._queue)
+
+  @property
+  def lag_seconds(self) -> float:
+    """Age of the oldest frame not yet accepted by the client's socket."""
+    oldest = self._in_flight_since
+    if oldest is None and self._queue:
+      oldest = self._queue[0][0]
+    return 0.0 if oldest is None else time.monotonic() - oldest
+
+  def start(self) -> ClientConnection:
+    if self._writer is None and not self.closed:
+      self._writer = asyncio.create_task(self._write())
+    return self
+
+  def offer(self, frame: str) -> bool:
+    """Queue `frame` without blocking; False once the connection is closed."""
+    if self.closed:
+      return False
+    if len(self._queue) >= self.max_frames:
+      if self.policy == "disconnect":
+        self._miss(1)
+        if self.missed_frames >= self.max_missed_frames:
+          self.close()
+          return False
+        return True
+      if self.policy == "coalesce":
+        self._miss(len(self._queue))
+        self._queue.clear()
+      else:
+        self._miss(1)
+        self._queue.popleft()
+    self._queue.append((time.monotonic(), frame))
+    self._ready.set()
+    return True
+
+  def stop(self) -> None:
+    """Stop writing and release queued frames; the socket is left to its owner."""
+    self.closed = True
+    self._queue.clear()
+    if self._writer is not None:
+      self._writer.cancel()
+      self._writer = None
+
+  def close(self) -> None:
+    """Give up on a slow client: stop writing and close its socket."""
+    if self.closed:
+      return
+    self.stop()
+    close = getattr(self.sink, "close", None)
+    if close is not None:
+      asyncio.ensure_future(self._close_sink(close))
+
+  def stats(self) -> StreamClientStats:
+    return StreamClientStats(
+      id=self.id,
+      stream=self.stream,
+      policy=self.policy,
+      connected_at=self.connected_at,
+      queued_frames=self.queued_frames,
+      lag_seconds=round(self.lag_seconds, 3),
+      frames_sent=self.frames_sent,
+      frames_dropped=self.frames_dropped,
+      missed_frames=self.missed_frames,
+      bytes_sent=self.bytes_sent,
+    )
+
+  def _miss(self, frames: int) -> None:
+    self.frames_dropped += frames
+    self.missed_frames += frames
+
+  async def _close_sink(self, close) -> None:
+    try:
+      await asyncio.wait_for(close(code=SLOW_CONSUMER_CLOSE_CODE, reason="slow consumer"), timeout=5)
+    except Exception:
+      pass
+
+  async def _write(self) -> None:
+    while True:
+      while not self._queue:
+        self._ready.clear()
+        await self._ready.wait()
+      self._in_flight_since, frame = self._queue.popleft()
+      try:
+        await self.sink.send_text(frame)
+      except asyncio.CancelledError:
+        raise
+      except Exception:
+        logger.debug("Closing realtime connection %s after a failed send", self.id)
+        self._writer = None
+        self.stop()
+        return
+      self._in_flight_since = None
+      self.frames_sent += 1
+      self.bytes_sent += len(frame)
+      self.missed_frames = 0
+
+
+class ConnectionRegistry:
+  """Live connections of this worker, for lag metrics."""
+
+  def __init__(self, settings: Settings) -> None:
+    self.settings = settings
+    self._connections: set[ClientConnection] = set()
+
+  def __len__(self) -> int:
+    return len(self._connections)
+
+  def open(self, sink: FrameSink, stream: str) -> ClientConnection:
+    connection = ClientConnection(
+      sink,
+      max_frames=self.settings.websocket_queue_frames,
+      policy=self.settings.websocket_slow_consumer_policy,
+      max_missed_frames=self.settings.websocket_max_missed_frames,
+      stream=stream,
+    )
+    self._connections.add(connection)
+    return connection.start()
+
+  def release(self, connection: ClientConnection) -> None:
+    self._connections.discard(connection)
+    connection.stop()
+
+  def stats(self) -> StreamStats:
+    clients = [connection.stats() for connection in self._connections]
+    return StreamStats(
+      connections=len(clients),
+      lagging_connections=sum(1 for client in clients if client.queued_frames or client.lag_seconds),
+      max_lag_seconds=max((client.lag_seconds for client in clients), default=0.0),
+      frames_dropped=sum(client.frames_dropped for client in clients),
+      clients=clients,
+    )
+
+
+client_connections = ConnectionRegistry(get_settings())
@@ -0,0 +1,208 @@
+"""Per-zone demand forecasts fitted from the hourly telemetry rollup tier.
+
+Every finished hourly bucket contributes its mean flow to a `[zones, 168]`
+hour-of-week profile (sum and count, folded in with `np.add.at`), so a refresh
+only touches rollup rows that closed since the previous one. A zone's baseline
+for an hour of the week is its profile mean there, falling back to the same
+hour of day across the week and then to the zone's overall mean while history
+is short. Forecasts scale the baseline by the zone's recent level: the ratio
+of the last day's demand to what the baseline expected for it. Forecasts
+start at the current hour, however far the newest telemetry lags behind it.
+
+Encoded forecasts are cached per zone, horizon and start hour until new
+buckets close.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app.core.config import Settings, get_settings
+from app.data.columns import ColumnRing
+from app.data.telemetry_rollups import RollupTier
+from app.data.telemetry_store import TelemetryStore, from_epoch, telemetry_store
+
+HOUR = 3_600
+WEEK_HOURS = 168
+# Ratio of recent to expected demand is kept within these bounds.
+LEVEL_BOUNDS = (0.5, 2.0)
+
+ALL_ZONES = object()
+
+
+def current_hour() -> int:
+  return int(time.time()) // HOUR * HOUR
+
+
+def hour_of_week(buckets: np.ndarray) -> np.ndarray:
+  """Monday 00:00 UTC is 0; the epoch fell on a Thursday, 72 hours into its week."""
+  return (buckets // HOUR + 72) % WEEK_HOURS
+
+
+class DemandForecaster:
+  def __init__(
+    self,
+    store: TelemetryStore,
+    min_history_hours: int,
+    recent_hours: int = 24,
+    cache_entries: int = 4_096,
+  ) -> None:
+    self.store = store
+    self.min_history_hours = min_history_hours
+    self.recent_hours = recent_hours
+    self.cache_entries = cache_entries
+    self.generation = 0
+    self._ring: ColumnRing | None = None
+    self._folded_seq = 0
+    self._through_bucket: int | None = None
+    self._sum = np.zeros((0, WEEK_HOURS))
+    self._count = np.zeros((0, WEEK_HOURS), dtype=np.int64)
+    self._baseline = np.zeros((0, WEEK_HOURS))
+    self._level = np.zeros(0)
+    self._ready = np.zeros(0, dtype=bool)
+    self._cache: OrderedDict[tuple[object, int, int], bytes] = OrderedDict()
+    # Readers may run in worker threads (the optimizer, cached endpoints).
+    self._lock = threading.RLock()
+
+  @classmethod
+  def from_settings(cls, store: TelemetryStore, settings: Settings) -> DemandForecaster:
+    return cls(store, min_history_hours=settings.demand_forecast_min_history_hours)
+
+  @property
+  def source_version(self) -> tuple[int, int | None] | None:
+    """Changes whenever `refresh` has something to fold; cheap and lock-free."""
+    tier = self._tier()
+    return None if tier is None else (id(tier.ring), tier.open_bucket)
+
+  def _tier(self) -> RollupTier | None:
+    if self.store.rollups is None:
+      return None
+    return self.store.rollups.tier("1h")
+
+  def refresh(self) -> bool:
+    """Fold hourly buckets closed since the last refresh; True when anything changed."""
+    with self._lock:
+      return self._refresh()
+
+  def _refresh(self) -> bool:
+    tier = self._tier()
+    if tier is None or tier.open_bucket is None:
+      return False
+    if tier.ring is not self._ring:
+      # The tier was rebuilt (e.g. restored from disk); start over.
+      self._ring = tier.ring
+      self._folded_seq = 0
+      self._through_bucket = None
+      self._sum = np.zeros((0, WEEK_HOURS))
+      self._count = np.zeros((0, WEEK_HOURS), dtype=np.int64)
+    open_bucket = tier.open_bucket
+    if open_bucket == self._through_bucket:
+      return False
+    lo = max(self._folded_seq, tier.ring.first_seq)
+    hi = max(lo, tier.ring.search("bucket", open_bucket))
+    rows = tier.ring.window(lo, hi)
+    self._folded_seq = hi
+    self._through_bucket = open_bucket
+    self._fold(rows)
+    self._fit(tier, open_bucket)
+    self.generation += 1
+    self._cache.clear()
+    return True
+
+  def _fold(self, rows: dict[str, np.ndarray]) -> None:
+    zones = rows["zone"].astype(np.int64)
+    zone_count = max(self.store.zone_count, len(self._sum))
+    if zone_count > len(self._sum):
+      grown_sum = np.zeros((zone_count, WEEK_HOURS))
+      grown_count = np.zeros((zone_count, WEEK_HOURS), dtype=np.int64)
+      grown_sum[:len(self._sum)] = self._sum
+      grown_count[:len(self._count)] = self._count
+      self._sum, self._count = grown_sum, grown_count
+    if not len(zones):
+      return
+    cells = zones * WEEK_HOURS + hour_of_week(rows["bucket"])
+    np.add.at(self._sum.reshape(-1), cells, rows["flow_ml_sum"] / rows["count"])
+    np.add.at(self._count.reshape(-1), cells, 1)
+
+  def _fit(self, tier: RollupTier, open_bucket: int) -> None:
+    """Recompute baselines and recent levels for every zone at once."""
+    total = self._count.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+      weekly = self._sum / self._count
+      daily = self._sum.reshape(-1, 7, 24).sum(axis=1) / self._count.reshape(-1, 7, 24).sum(axis=1)
+      overall = self._sum.sum(axis=1) / total
+    daily = np.where(np.isnan(daily), overall[:, None], daily)
+    baseline = np.where(np.isnan(weekly), np.tile(daily, 7), weekly)
+    self._baseline = np.nan_to_num(baseline)
+    self._ready = total >= self.min_history_hours
+
+    recent = tier.window(open_bucket - self.recent_hours * HOUR, open_bucket)
+    zones = recent["zone"].astype(np.int64)
+    actual = np.bincount(zones, recent["flow_ml_sum"] / recent["count"], minlength=len(self._sum))
+    expected = np.bincount(
+      zones, self._baseline[zones, hour_of_week(recent["bucket"])], minlength=len(self._sum),
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+      level = actual / expected
+    self._level = np.clip(np.where(expected > 0, level, 1.0), *LEVEL_BOUNDS)
+
+  def forecast_matrix(
+    self,
+    horizon_hours: int,
+    codes: np.ndarray | None = None,
+    start: int | None = None,
+  ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Zone codes, bucket starts and a `[zones, horizon]` array of forecast demand.
+
+    Buckets begin with the hour containing `start`, the current hour by default.
+    """
+    self.refresh()
+    if codes is None:
+      codes = np.flatnonzero(self._ready)
+    first = current_hour() if start is None else start // HOUR * HOUR
+    buckets = first + HOUR * np.arange(horizon_hours, dtype=np.int64)
+    demand = self._baseline[codes][:, hour_of_week(buckets)] * self._level[codes, None]
+    return codes, buckets, np.maximum(demand, 0.0)
+
+  def has_forecast(self, zone_id: str | None | object = ALL_ZONES) -> bool:
+    self.refresh()
+    if zone_id is ALL_ZONES:
+      return bool(self._ready.any())
+    code = self.store.zone_code(zone_id)
+    return code is not None and code < len(self._ready) and bool(self._ready[code])
+
+  def encoded(self, zone_id: str | None | object, horizon_hours: int, start: int | None = None) -> bytes | None:
+    """JSON array of forecast points from the hour containing `start`, or None when there is not enough history."""
+    with self._lock:
+      return self._encode(zone_id, horizon_hours, current_hour() if start is None else start // HOUR * HOUR)
+
+  def _encode(self, zone_id: str | None | object, horizon_hours: int, start: int) -> bytes | None:
+    if not self.has_forecast(zone_id):
+      return None
+    key = (zone_id, horizon_hours, start)
+    cached = self._cache.get(key)
+    if cached is not None:
+      self._cache.move_to_end(key)
+      return cached
+    codes = None if zone_id is ALL_ZONES else np.array([self.store.zone_code(zone_id)])
+    codes, buckets, demand = self.forecast_matrix(horizon_hours, codes, start)
+    timestamps = [from_epoch(bucket).isoformat().replace("+00:00", "Z") for bucket in buckets.tolist()]
+    points = []
+    for code, row in zip(codes.tolist(), np.round(demand, 2).tolist()):
+      zone = json.dumps(self.store.zone_id(code))
+      points.extend(
+        f'{{"timestamp":"{timestamp}","demand_ml":{value},"zone_id":{zone}}}'
+        for timestamp, value in zip(timestamps, row)
+      )
+    body = f"[{','.join(points)}]".encode()
+    self._cache[key] = body
+    if len(self._cache) > self.cache_entries:
+      self._cache.popitem(last=False)
+    return body
+
+
+demand_forecaster = DemandForecaster.from_settings(telemetry_store, get_settings())
@@ -0,0 +1,174 @@
+"""Time-of-use electricity pricing for pumps and metered telemetry.
+
+Tariff bands are set in local time and repeat every day. The engine keeps
+the running price integral at every band edge, so the cost of any interval
+is a difference of two `np.interp` lookups. Costing a whole array of
+schedules or rollup rows is then a handful of vector operations.
+
+Metered cost is priced from the hourly rollup tier. Where the hourly rows
+have aged out, the daily tier covers the rest of the range. Each row's mean
+kW is treated as constant across its bucket.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Sequence
+
+import numpy as np
+
+from app.core.config import Settings, get_settings
+from app.data.telemetry_rollups import RollupTier
+from app.data.telemetry_store import TelemetryStore, from_epoch, to_epoch
+from app.schemas.water import EnergyCostReport, EnergyCostRollup, PumpSchedule, PumpStation, TariffBand
+
+DAY_SECONDS = 86_400
+HOUR_SECONDS = 3_600
+# Pumps do not run while their schedule is paused.
+RUNNING_STATUSES = ("scheduled", "running", "completed")
+
+
+class Tariff:
+  def __init__(self, bands: Sequence[TariffBand], utc_offset_minutes: int = 0, currency: str = "INR") -> None:
+    self.bands = list(bands)
+    self.offset = utc_offset_minutes * 60
+    self.currency = currency
+    segments: list[tuple[float, float, float]] = []
+    for band in self.bands:
+      start, end = band.start_hour * HOUR_SECONDS, band.end_hour * HOUR_SECONDS
+      if end > start:
+        segments.append((start, end, band.price_per_kwh))
+      else:
+        segments.extend([(start, DAY_SECONDS, band.price_per_kwh), (0.0, end, band.price_per_kwh)])
+    segments = sorted(segment for segment in segments if segment[1] > segment[0])
+    edges = [0.0, *(end for _, end, _ in segments)]
+    if [start for start, _, _ in segments] != edges[:-1] or edges[-1] != DAY_SECONDS:
+      raise ValueError("Tariff bands must cover the day exactly once")
+    self._edges = np.array(edges)
+    self._prices = np.array([price for _, _, price in segments])
+    # Price x hours accumulated from local midnight to each edge.
+    self._integral = np.r_[0.0, np.cumsum(np.diff(self._edges) * self._prices)] / HOUR_SECONDS
+    self.daily = float(self._integral[-1])
+
+  @classmethod
+  def from_settings(cls, settings: Settings) -> Tariff:
+    bands = [
+      TariffBand(name=name, start_hour=start, end_hour=end, price_per_kwh=price)
+      for name, start, end, price in settings.energy_tariff_bands
+    ]
+    return cls(bands, settings.energy_tariff_utc_offset_minutes, settings.energy_tariff_currency)
+
+  def price_at(self, epochs: np.ndarray) -> np.ndarray:
+    local = (np.asarray(epochs, dtype=np.float64) + self.offset) % DAY_SECONDS
+    return self._prices[np.searchsorted(self._edges, local, side="right") - 1]
+
+  def integral(self, epochs: np.ndarray) -> np.ndarray:
+    """Cost of drawing 1 kW from the epoch up to each of `epochs`."""
+    days, seconds = np.divmod(np.asarray(epochs, dtype=np.float64) + self.offset, DAY_SECONDS)
+    return days * self.daily + np.interp(seconds, self._edges, self._integral)
+
+  def cost(self, start: np.ndarray, end: np.ndarray, kw: np.ndarray) -> np.ndarray:
+    """Cost of drawing `kw` over each `[start, end)` epoch interval."""
+    return np.asarray(kw) * (self.integral(end) - self.integral(start))
+
+  def cheapest_starts(self, day_start: int, durations: np.ndarray, step_seconds: int = 60) -> np.ndarray:
+    """Offset from `day_start` of the cheapest window of each duration that ends within the day."""
+    durations = np.minimum(np.asarray(durations, dtype=np.float64), DAY_SECONDS)
+    offsets = np.arange(0, DAY_SECONDS + 1, step_seconds, dtype=np.float64)
+    costs = self.integral(day_start + offsets[None, :] + durations[:, None]) - self.integral(day_start + offsets)[None, :]
+    costs[offsets[None, :] + durations[:, None] > DAY_SECONDS] = np.inf
+    # Earliest of the windows that tie, up to rounding in the integral.
+    best = costs.min(axis=1, keepdims=True)
+    return offsets[np.argmax(costs <= best + 1e-9 * np.maximum(np.abs(best), 1.0), axis=1)]
+
+
+def schedule_energy(
+  schedules: Sequence[PumpSchedule],
+  stations: Sequence[PumpStation],
+  tariff: Tariff,
+  since: int | None = None,
+  until: int | None = None,
+) -> tuple[list[str], np.ndarray, np.ndarray]:
+  """Pump ids with the kWh and cost of their runs at rated power, clipped to `[since, until)`."""
+  rated = {station.id: station.energy_use_kw for station in stations}
+  runs = [schedule for schedule in schedules if schedule.status in RUNNING_STATUSES and schedule.pump_id in rated]
+  start = np.array([schedule.start_time_utc.timestamp() for schedule in runs], dtype=np.float64)
+  end = np.array([schedule.end_time_utc.timestamp() for schedule in runs], dtype=np.float64)
+  if since is not None:
+    start = np.maximum(start, since)
+  if until is not None:
+    end = np.minimum(end, until)
+  end = np.maximum(end, start)
+  kw = np.array([rated[schedule.pump_id] for schedule in runs], dtype=np.float64)
+  pump_ids, pump_of_run = np.unique(np.array([schedule.pump_id for schedule in runs], dtype=object), return_inverse=True)
+  energy = np.bincount(pump_of_run, kw * (end - start) / HOUR_SECONDS, minlength=len(pump_ids))
+  cost = np.bincount(pump_of_run, tariff.cost(start, end, kw), minlength=len(pump_ids))
+  return pump_ids.tolist(), energy, cost
+
+
+def _priced_rows(tier: RollupTier, tariff: Tariff, rows: dict[str, np.ndarray], since: int, until: int) -> tuple[np.ndarray, ...]:
+  start = np.maximum(rows["bucket"], since)
+  end = np.maximum(np.minimum(rows["bucket"] + tier.width_seconds, until), start)
+  kw = rows["energy_kw_sum"] / np.maximum(rows["count"], 1)
+  return rows["zone"].astype(np.int64), kw * (end - start) / HOUR_SECONDS, tariff.cost(start, end, kw)
+
+
+def metered_energy(
+  store: TelemetryStore,
+  tariff: Tariff,
+  since: int,
+  until: int,
+) -> tuple[int, np.ndarray, np.ndarray]:
+  """Coarsest rollup width used, and kWh and cost per zone code over `[since, until)`."""
+  energy, cost = np.zeros(store.zone_count), np.zeros(store.zone_count)
+  if store.rollups is None:
+    return HOUR_SECONDS, energy, cost
+  hourly, daily = store.rollups.tier("1h"), store.rollups.tier("1d")
+  first_hour = int(hourly.ring.get("bucket", hourly.ring.first_seq)) if len(hourly) else until
+  parts = [(hourly, hourly.window(max(since, first_hour), until), max(since, first_hour), until)]
+  resolution = hourly.width_seconds
+  if since < first_hour:
+    # Days before the hourly tier's oldest row, the last one priced only up to that row.
+    rows = daily.window(since, first_hour)
+    if len(rows["bucket"]):
+      parts.append((daily, rows, since, first_hour))
+      resolution = daily.width_seconds
+  for tier, rows, lo, hi in parts:
+    zones, row_energy, row_cost = _priced_rows(tier, tariff, rows, lo, hi)
+    energy += np.bincount(zones, row_energy, minlength=len(energy))[:len(energy)]
+    cost += np.bincount(zones, row_cost, minlength=len(cost))[:len(cost)]
+  return resolution, energy, cost
+
+
+def energy_cost_report(
+  store: TelemetryStore,
+  schedules: Sequence[PumpSchedule],
+  stations: Sequence[PumpStation],
+  tariff: Tariff,
+  since: datetime,
+  until: datetime,
+) -> EnergyCostReport:
+  lo, hi = to_epoch(since), to_epoch(until)
+  resolution, zone_energy, zone_cost = metered_energy(store, tariff, lo, hi)
+  pump_ids, pump_energy, pump_cost = schedule_energy(schedules, stations, tariff, lo, hi)
+  return EnergyCostReport(
+    start=from_epoch(lo),
+    end=from_epoch(hi),
+    currency=tariff.currency,
+    resolution_seconds=resolution,
+    energy_kwh=round(float(zone_energy.sum()), 3),
+    cost=round(float(zone_cost.sum()), 2),
+    zones=[
+      EnergyCostRollup(id=store.zone_id(code), energy_kwh=round(energy, 3), cost=round(cost, 2))
+      for code, (energy, cost) in enumerate(zip(zone_energy.tolist(), zone_cost.tolist()))
+      if energy > 0
+    ],
+    pumps=[
+      EnergyCostRollup(id=pump_id, energy_kwh=round(energy, 3), cost=round(cost, 2))
+      for pump_id, energy, cost in zip(pump_ids, pump_energy.tolist(), pump_cost.tolist())
+      if energy > 0
+    ],
+    tariff=tariff.bands,
+  )
+
+
+tariff = Tariff.from_settings(get_settings())
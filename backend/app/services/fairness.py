@@ -0,0 +1,311 @@
+"""Fairness metrics computed from telemetry and incidents.
+
+Finished hourly rollup buckets are folded into per-zone, per-day supply hours
+(hours whose mean flow exceeds `fairness_supply_flow_threshold_ml`) and
+delivered volume (sum of hourly mean flow). Days live in a ring of
+`fairness_window_days + 1` columns, so a refresh only reads buckets closed
+since the previous one and only rescores the days they touched.
+
+For each complete day, across the zones reporting that day:
+
+- `citywide_score` is 1 minus the population-weighted Gini coefficient of
+  litres delivered per person;
+- `underserved_wards` counts zones below `fairness_underserved_lpcd`;
+- `average_supply_hours` is the mean of zone supply hours;
+- `complaints_resolved_pct` is the share of citizen reports filed up to the
+  end of the day that had been resolved by then.
+
+Citizen reports are counted per filing day and per resolution day as
+incident writes arrive, so scoring a day reads two small running totals
+rather than every incident, and a past day keeps the resolutions it had.
+
+Zone `fairness_score` is the share of the per-capita norm
+(`optimizer_per_capita_demand_lpd`) delivered over the last
+`fairness_score_days` complete days, and `supply_hours_per_day` their mean.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import Settings, get_settings
+from app.data import mock_store
+from app.data.columns import ColumnRing
+from app.data.telemetry_store import TelemetryStore, from_epoch, telemetry_store
+from app.schemas.water import FairnessMetric, IncidentReport, WaterZone
+
+logger = logging.getLogger(__name__)
+
+DAY_SECONDS = 86_400
+
+
+def weighted_gini(values: np.ndarray, weights: np.ndarray) -> np.ndarray:
+  """Gini coefficient of each column of `values`, weighting rows by `weights`.
+
+  Computed from the Lorenz curve of every column at once; columns with no
+  weight or no total are reported as 0 and 1 respectively.
+  """
+  order = np.argsort(values, axis=0, kind="stable")
+  sorted_values = np.take_along_axis(values, order, axis=0)
+  sorted_weights = np.take_along_axis(weights, order, axis=0)
+  population = np.cumsum(sorted_weights, axis=0)
+  amount = np.cumsum(sorted_weights * sorted_values, axis=0)
+  total_population, total_amount = population[-1], amount[-1]
+  with np.errstate(invalid="ignore", divide="ignore"):
+    p = np.vstack([np.zeros(values.shape[1]), population / total_population])
+    lorenz = np.vstack([np.zeros(values.shape[1]), amount / total_amount])
+  gini = 1 - np.sum(np.diff(p, axis=0) * (lorenz[1:] + lorenz[:-1]), axis=0)
+  gini = np.where(total_amount > 0, gini, 1.0)
+  return np.clip(np.where(total_population > 0, gini, 0.0), 0.0, 1.0)
+
+
+def _epoch_day(moment: datetime) -> int:
+  return int(moment.timestamp()) // DAY_SECONDS
+
+
+def _through(counts: Counter[int], days: np.ndarray) -> np.ndarray:
+  """Running total of `counts` up to and including each of `days`."""
+  keys = np.array(sorted(counts), dtype=np.int64)
+  totals = np.r_[0, np.cumsum([counts[key] for key in keys.tolist()])]
+  return totals[np.searchsorted(keys, days, side="right")]
+
+
+class ComplaintLedger:
+  """Citizen reports filed and resolved per day, kept current from incident writes."""
+
+  def __init__(self, incidents: Iterable[IncidentReport] = ()) -> None:
+    # Incident id -> (day filed, day resolved or None).
+    self._days: dict[str, tuple[int, int | None]] = {}
+    self._filed: Counter[int] = Counter()
+    self._resolved: Counter[int] = Counter()
+    # Earliest day whose resolution share changed since the last `take_changed_from`.
+    self._changed_from: int | None = None
+    for incident in incidents:
+      self.record(incident)
+
+  def record(self, incident: IncidentReport) -> None:
+    if incident.reported_by != "citizen":
+      return
+    filed = _epoch_day(incident.reported_at)
+    resolved = None
+    if incident.status == "resolved":
+      # A resolved report without `resolved_at` counts as resolved the day it was filed.
+      resolved = max(filed, _epoch_day(incident.resolved_at or incident.reported_at))
+    previous = self._days.get(incident.id)
+    if previous == (filed, resolved):
+      return
+    if previous is not None:
+      self._count(*previous, -1)
+    self._count(filed, resolved, 1)
+    self._days[incident.id] = (filed, resolved)
+    # Nothing is resolved before it is filed, so no earlier day is affected.
+    changed = filed if previous is None else min(filed, previous[0])
+    self._changed_from = changed if self._changed_from is None else min(self._changed_from, changed)
+
+  def _count(self, filed: int, resolved: int | None, step: int) -> None:
+    for counts, day in ((self._filed, filed), (self._resolved, resolved)):
+      if day is not None:
+        counts[day] += step
+        if not counts[day]:
+          del counts[day]
+
+  def take_changed_from(self) -> int | None:
+    """Earliest day whose share changed since the previous call, if any."""
+    changed, self._changed_from = self._changed_from, None
+    return changed
+
+  def resolution(self, days: np.ndarray) -> np.ndarray:
+    """Resolved share of citizen reports filed by the end of each day (1 when there are none)."""
+    filed = _through(self._filed, days)
+    return np.where(filed > 0, _through(self._resolved, days) / np.maximum(filed, 1), 1.0)
+
+
+class FairnessPipeline:
+  def __init__(self, store: TelemetryStore, settings: Settings, incidents: Iterable[IncidentReport] = ()) -> None:
+    self.store = store
+    self.settings = settings
+    self.complaints = ComplaintLedger(incidents)
+    self.window_days = settings.fairness_window_days
+    self.history: dict[int, FairnessMetric] = {}
+    self._columns = self.window_days + 1
+    self._ring: ColumnRing | None = None
+    self._folded_seq = 0
+    self._complete_day: int | None = None
+    self._reset_days()
+    self._task: asyncio.Task[None] | None = None
+
+  def _reset_days(self) -> None:
+    self._column_day = np.full(self._columns, -1, dtype=np.int64)
+    self._hours = np.zeros((0, self._columns))
+    self._volume = np.zeros((0, self._columns))
+    self._observed = np.zeros((0, self._columns), dtype=np.int64)
+
+  def start(self) -> None:
+    self.refresh()
+    self._task = asyncio.create_task(self._run())
+
+  def stop(self) -> None:
+    if self._task is not None:
+      self._task.cancel()
+      self._task = None
+
+  async def _run(self) -> None:
+    while True:
+      await asyncio.sleep(self.settings.fairness_refresh_interval_seconds)
+      try:
+        self.refresh()
+      except Exception:
+        logger.exception("Fairness metrics refresh failed")
+
+  def on_store_write(self, kind: str, item: BaseModel) -> None:
+    if kind == "incident":
+      self.complaints.record(item)
+
+  def recompute(self) -> bool:
+    """Drop folded state and rebuild everything from the hourly tier."""
+    self._ring = None
+    return self.refresh()
+
+  def refresh(self) -> bool:
+    """Fold newly closed hourly buckets and publish rescored days; True when anything was written."""
+    tier = self.store.rollups.tier("1h") if self.store.rollups is not None else None
+    if tier is None or tier.open_bucket is None:
+      return False
+    if tier.ring is not self._ring:
+      self._ring = tier.ring
+      self._folded_seq = 0
+      self._complete_day = None
+      self.history = {}
+      self._reset_days()
+    lo = max(self._folded_seq, tier.ring.first_seq)
+    hi = max(lo, tier.ring.search("bucket", tier.open_bucket))
+    complete_day = tier.open_bucket // DAY_SECONDS
+    touched = self.fold(tier.ring.window(lo, hi), since_day=complete_day - self.window_days)
+    self._folded_seq = hi
+
+    first = min(touched) if touched else complete_day
+    if self._complete_day is not None:
+      first = min(first, self._complete_day)
+    complaints_changed = self.complaints.take_changed_from()
+    if complaints_changed is not None:
+      first = min(first, complaints_changed)
+    self._complete_day = complete_day
+    days = [day for day in range(max(first, complete_day - self.window_days), complete_day) if self._has_day(day)]
+    if not days:
+      return False
+    zones = mock_store.list_zones()
+    scored = self.score_days(np.array(days), zones)
+    if not scored:
+      return False
+    self.history.update(scored)
+    for day in [day for day in self.history if day < complete_day - self.window_days]:
+      del self.history[day]
+    self._publish(complete_day, zones)
+    return True
+
+  def fold(self, rows: dict[str, np.ndarray], since_day: int | None = None) -> set[int]:
+    """Add finished hourly rollup rows to the day columns; returns the days touched."""
+    codes = self.store.zone_count
+    if codes > len(self._hours):
+      grown = max(codes, 2 * len(self._hours))
+      self._hours, self._volume, self._observed = (
+        np.vstack([array, np.zeros((grown - len(array), self._columns), dtype=array.dtype)])
+        for array in (self._hours, self._volume, self._observed)
+      )
+    if since_day is not None and len(rows["bucket"]) and rows["bucket"][0] < since_day * DAY_SECONDS:
+      keep = rows["bucket"] >= since_day * DAY_SECONDS
+      rows = {name: column[keep] for name, column in rows.items()}
+    if not len(rows["bucket"]):
+      return set()
+    days = rows["bucket"] // DAY_SECONDS
+    unique_days = np.unique(days)
+    # A column is reused once its previous day has left the window.
+    columns = unique_days % self._columns
+    stale = self._column_day[columns] != unique_days
+    for column in columns[stale].tolist():
+      self._hours[:, column] = 0
+      self._volume[:, column] = 0
+      self._observed[:, column] = 0
+    self._column_day[columns] = unique_days
+
+    flow = rows["flow_ml_sum"] / rows["count"]
+    cells = rows["zone"].astype(np.int64) * self._columns + days % self._columns
+    size = self._hours.size
+    self._hours += np.bincount(cells, flow > self.settings.fairness_supply_flow_threshold_ml, size).reshape(self._hours.shape)
+    self._volume += np.bincount(cells, flow, size).reshape(self._volume.shape)
+    self._observed += np.bincount(cells, minlength=size).reshape(self._observed.shape)
+    return set(unique_days.tolist())
+
+  def _has_day(self, day: int) -> bool:
+    return bool(self._column_day[day % self._columns] == day)
+
+  def _zone_frame(self, zones: list[WaterZone]) -> tuple[np.ndarray, np.ndarray, list[WaterZone]]:
+    """Store codes and populations of the zones that have telemetry."""
+    pairs = [(self.store.zone_code(zone.id), zone) for zone in zones]
+    pairs = [(code, zone) for code, zone in pairs if code is not None and code < len(self._hours)]
+    codes = np.array([code for code, _ in pairs], dtype=np.int64)
+    population = np.array([zone.population_served for _, zone in pairs], dtype=np.float64)
+    return codes, population, [zone for _, zone in pairs]
+
+  def score_days(self, days: np.ndarray, zones: list[WaterZone]) -> dict[int, FairnessMetric]:
+    """Metrics for each of `days` on which at least one known zone reported."""
+    codes, population, _ = self._zone_frame(zones)
+    columns = days % self._columns
+    observed = self._observed[np.ix_(codes, columns)] > 0
+    hours = self._hours[np.ix_(codes, columns)]
+    with np.errstate(invalid="ignore", divide="ignore"):
+      lpcd = np.where(population[:, None] > 0, self._volume[np.ix_(codes, columns)] * 1e6 / population[:, None], 0.0)
+    weights = np.where(observed, population[:, None], 0.0)
+    equity = 1 - weighted_gini(lpcd, weights)
+    underserved = np.sum(observed & (lpcd < self.settings.fairness_underserved_lpcd), axis=0)
+    reporting = observed.sum(axis=0)
+    average_hours = np.where(observed, hours, 0).sum(axis=0) / np.maximum(reporting, 1)
+    resolved = self.complaints.resolution(days)
+    return {
+      day: FairnessMetric(
+        timestamp=from_epoch(day * DAY_SECONDS),
+        citywide_score=round(score, 3),
+        underserved_wards=wards,
+        complaints_resolved_pct=round(rate, 3),
+        average_supply_hours=round(min(supply, 24.0), 2),
+      )
+      for day, score, wards, rate, supply, zones_reporting in zip(
+        days.tolist(), equity.tolist(), underserved.tolist(), resolved.tolist(), average_hours.tolist(), reporting.tolist(),
+      )
+      if zones_reporting
+    }
+
+  def zone_scores(self, complete_day: int, zones: list[WaterZone]) -> dict[str, tuple[float, float]]:
+    """Zone id -> (fairness score, supply hours per day) over the trailing score window."""
+    codes, population, scored = self._zone_frame(zones)
+    days = np.arange(complete_day - self.settings.fairness_score_days, complete_day)
+    days = days[self._column_day[days % self._columns] == days]
+    if not len(days) or not len(codes):
+      return {}
+    columns = days % self._columns
+    observed = (self._observed[np.ix_(codes, columns)] > 0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+      lpcd = self._volume[np.ix_(codes, columns)].sum(axis=1) * 1e6 / population / observed
+      hours = self._hours[np.ix_(codes, columns)].sum(axis=1) / observed
+    score = np.clip(np.nan_to_num(lpcd / self.settings.optimizer_per_capita_demand_lpd), 0.0, 1.0)
+    hours = np.nan_to_num(hours)
+    return {
+      zone.id: (round(zone_score, 3), round(min(zone_hours, 24.0), 2))
+      for zone, zone_score, zone_hours, seen in zip(scored, score.tolist(), hours.tolist(), observed.tolist())
+      if seen and zone.population_served > 0
+    }
+
+  def _publish(self, complete_day: int, zones: list[WaterZone]) -> None:
+    mock_store.replace_fairness_metrics([self.history[day] for day in sorted(self.history)])
+    for zone_id, (score, hours) in self.zone_scores(complete_day, zones).items():
+      mock_store.update_zone_fairness(zone_id, score, hours, datetime.now(timezone.utc))
+
+
+fairness_pipeline = FairnessPipeline(telemetry_store, get_settings(), mock_store.list_incidents())
+mock_store.add_listener(fairness_pipeline.on_store_write)
@@ -0,0 +1,140 @@
+"""Merges citizen reports of the same problem into one incident.
+
+Open citizen incidents are hashed by incident type and geohash cell. The
+geohash precision is the finest whose cells are at least the merge radius
+tall. Cells are kept as their latitude and longitude bit indices rather than
+base32 strings, so neighbouring cells are found by adding one. A new report
+with a location checks the cells within the radius of it, a fixed handful.
+It joins the nearest incident of its type that lies within the radius and
+was last reported within the time window. Otherwise the caller opens a new
+incident, which the store write hook adds to the hash.
+
+Incidents leave the hash when resolved, and lazily once their window has
+passed, so lookups stay constant-time however long the system runs. Sensor
+incidents are not clustered: they are placed at the zone centroid, not at
+the fault.
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone
+
+from pydantic import BaseModel
+
+from app.core.config import Settings, get_settings
+from app.data import mock_store
+from app.data.telemetry_store import to_epoch
+from app.schemas.water import CitizenReportCreate, IncidentReport
+
+EARTH_RADIUS_M = 6_371_000.0
+METRES_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+MAX_GEOHASH_PRECISION = 12
+
+Cell = tuple[int, int, str]
+
+
+def geohash_precision(radius_m: float) -> int:
+  """Finest geohash precision whose cells are at least `radius_m` tall."""
+  for precision in range(MAX_GEOHASH_PRECISION, 0, -1):
+    if 180 / 2 ** (5 * precision // 2) * METRES_PER_DEGREE >= radius_m:
+      return precision
+  return 1
+
+
+def distance_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+  """Equirectangular distance, accurate to well under a metre at merge radii."""
+  x = math.radians((lon2 - lon1 + 180) % 360 - 180) * math.cos(math.radians((lat1 + lat2) / 2))
+  y = math.radians(lat2 - lat1)
+  return EARTH_RADIUS_M * math.hypot(x, y)
+
+
+class IncidentClusterer:
+  def __init__(self, radius_m: float, window_seconds: float) -> None:
+    self.radius_m = radius_m
+    self.window_seconds = window_seconds
+    self.precision = geohash_precision(radius_m)
+    self._lat_bits = 5 * self.precision // 2
+    self._lon_bits = 5 * self.precision - self._lat_bits
+    self._cell_lat = 180 / 2**self._lat_bits
+    self._cell_lon = 360 / 2**self._lon_bits
+    # (row, column, type) -> incident id -> (latitude, longitude, last report epoch)
+    self._cells: dict[Cell, dict[str, tuple[float, float, int]]] = {}
+    self._cell_of: dict[str, Cell] = {}
+    self.merged = 0
+
+  @classmethod
+  def from_settings(cls, settings: Settings) -> IncidentClusterer:
+    clusterer = cls(settings.incident_dedup_radius_m, settings.incident_dedup_window_minutes * 60)
+    for incident in mock_store.list_incidents():
+      clusterer.on_store_write("incident", incident)
+    return clusterer
+
+  def _row(self, latitude: float) -> int:
+    return min(int((latitude + 90) / self._cell_lat), 2**self._lat_bits - 1)
+
+  def _column(self, longitude: float) -> int:
+    return int((longitude + 180) / self._cell_lon) % 2**self._lon_bits
+
+  def on_store_write(self, kind: str, item: BaseModel) -> None:
+    if kind != "incident" or item.reported_by != "citizen":
+      return
+    if item.status == "resolved":
+      self._drop(item.id)
+    elif item.id not in self._cell_of:
+      latitude, longitude = item.coordinates
+      self._add(item.id, item.type, latitude, longitude, to_epoch(item.reported_at))
+
+  def _add(self, incident_id: str, incident_type: str, latitude: float, longitude: float, reported: int) -> None:
+    cell = (self._row(latitude), self._column(longitude), incident_type)
+    self._cells.setdefault(cell, {})[incident_id] = (latitude, longitude, reported)
+    self._cell_of[incident_id] = cell
+
+  def _drop(self, incident_id: str) -> None:
+    cell = self._cell_of.pop(incident_id, None)
+    if cell is not None:
+      members = self._cells[cell]
+      del members[incident_id]
+      if not members:
+        del self._cells[cell]
+
+  def match(self, incident_type: str, latitude: float, longitude: float, reported: int) -> str | None:
+    """Nearest clustered incident of the type within the radius and window; counts `reported` as its latest report."""
+    row, column = self._row(latitude), self._column(longitude)
+    # Cells are as tall as the radius but narrow towards the poles.
+    cell_width_m = self._cell_lon * METRES_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6)
+    span = min(math.ceil(self.radius_m / cell_width_m), 2**self._lon_bits // 2)
+    best: tuple[float, str] | None = None
+    for r in range(max(row - 1, 0), min(row + 1, 2**self._lat_bits - 1) + 1):
+      for c in range(column - span, column + span + 1):
+        members = self._cells.get((r, c % 2**self._lon_bits, incident_type))
+        if not members:
+          continue
+        for incident_id, (lat, lon, last) in list(members.items()):
+          if reported - last > self.window_seconds:
+            self._drop(incident_id)
+            continue
+          distance = distance_m(latitude, longitude, lat, lon)
+          if distance <= self.radius_m and (best is None or distance < best[0]):
+            best = (distance, incident_id)
+    if best is None:
+      return None
+    incident_id = best[1]
+    members = self._cells[self._cell_of[incident_id]]
+    lat, lon, last = members[incident_id]
+    members[incident_id] = (lat, lon, max(last, reported))
+    return incident_id
+
+  def merge(self, payload: CitizenReportCreate, at: datetime | None = None) -> IncidentReport | None:
+    """Add a located report to the incident it duplicates; None when it should open a new one."""
+    if payload.latitude is None or payload.longitude is None:
+      return None
+    reported = to_epoch(at or datetime.now(timezone.utc))
+    incident_id = self.match(payload.type, payload.latitude, payload.longitude, reported)
+    if incident_id is None:
+      return None
+    self.merged += 1
+    return mock_store.add_incident_reporter(incident_id)
+
+
+incident_clusterer = IncidentClusterer.from_settings(get_settings())
+mock_store.add_listener(incident_clusterer.on_store_write)
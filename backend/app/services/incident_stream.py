@@ -0,0 +1,177 @@
+"""Realtime incident events for `/ws/incidents`.
+
+The stream listens to incident writes in the store. That covers this
+worker's own writes, writes from other workers arriving on
+`incident_channel` through store sync, and incidents derived from telemetry.
+Each write is classified against the last version seen:
+
+- `incident_created`: an id not seen before;
+- `incident_status_changed`: the status moved, with `previous_status`;
+- `incident_merged`: another citizen report was merged in (`reporter_count` rose);
+- `incident_updated`: any other change, such as a replicated replacement.
+
+Subscribers filter by zone and severity. Connections are indexed by
+`(zone, severity)` filter group, with `ALL` standing for either side, so an
+event reaches its subscribers through at most four lookups. The frame is
+encoded once per event and shared by every group it reaches.
+"""
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from typing import Iterable, get_args
+
+from pydantic import BaseModel
+
+from app.data import mock_store
+from app.schemas.water import IncidentReport, IncidentSeverity
+from app.services.broadcaster import ALL_ZONES as ALL
+from app.services.connections import ClientConnection
+
+SEVERITIES: tuple[str, ...] = get_args(IncidentSeverity)
+
+FilterGroup = tuple[str, str]
+
+
+class IncidentFilter:
+  """Zones and severities one connection wants; everything by default."""
+
+  def __init__(self, zones: Iterable[str] | None = None, severities: Iterable[str] | None = None) -> None:
+    self.zones = {ALL} if zones is None else set(zones)
+    self.severities = {ALL} if severities is None else set(_checked_severities(severities))
+
+  def groups(self) -> set[FilterGroup]:
+    # A wildcard already covers every specific value on its side.
+    zones = {ALL} if ALL in self.zones else self.zones
+    severities = {ALL} if ALL in self.severities else self.severities
+    return {(zone, severity) for zone in zones for severity in severities}
+
+
+def _checked_severities(severities: Iterable[str]) -> list[str]:
+  severities = list(severities)
+  unknown = [severity for severity in severities if severity not in SEVERITIES and severity != ALL]
+  if unknown:
+    raise ValueError(f"Unknown severities: {', '.join(map(str, unknown))}")
+  return severities
+
+
+class IncidentStream:
+  def __init__(self) -> None:
+    self._filters: dict[ClientConnection, IncidentFilter] = {}
+    self._index: dict[FilterGroup, set[ClientConnection]] = {}
+    # Incident id -> (status, reporter count, zone, severity) as last written.
+    self._seen: dict[str, tuple[str, int, str, str]] = {}
+    self.events = 0
+    self.frames_encoded = 0
+
+  @classmethod
+  def from_store(cls) -> IncidentStream:
+    stream = cls()
+    for incident in mock_store.list_incidents():
+      stream._seen[incident.id] = (incident.status, incident.reporter_count, incident.zone_id, incident.severity)
+    return stream
+
+  def __len__(self) -> int:
+    return len(self._filters)
+
+  def subscribe(
+    self,
+    connection: ClientConnection,
+    zones: Iterable[str] | None = None,
+    severities: Iterable[str] | None = None,
+  ) -> None:
+    subscription = IncidentFilter(zones, severities)
+    self.unsubscribe(connection)
+    self._filters[connection] = subscription
+    self._index_groups(connection, subscription.groups())
+
+  def change(
+    self,
+    connection: ClientConnection,
+    action: str,
+    zones: Iterable[str] = (),
+    severities: Iterable[str] = (),
+  ) -> None:
+    """Apply a subscribe/unsubscribe request to the connection's zones and severities.
+
+    A connection `publish` dropped has no filter left; it is closed and nothing changes.
+    """
+    subscription = self._filters.get(connection)
+    if subscription is None:
+      connection.close()
+      return
+    zones, severities = set(zones), set(_checked_severities(severities))
+    before = subscription.groups()
+    if action == "subscribe":
+      subscription.zones |= zones
+      subscription.severities |= severities
+    elif action == "unsubscribe":
+      subscription.zones -= zones
+      subscription.severities -= severities
+    else:
+      raise ValueError(f"Unknown action: {action}")
+    after = subscription.groups()
+    self._unindex_groups(connection, before - after)
+    self._index_groups(connection, after - before)
+
+  def unsubscribe(self, connection: ClientConnection) -> None:
+    subscription = self._filters.pop(connection, None)
+    if subscription is not None:
+      self._unindex_groups(connection, subscription.groups())
+
+  def on_store_write(self, kind: str, item: BaseModel) -> None:
+    if kind == "incident":
+      self.publish(item)
+
+  def publish(self, incident: IncidentReport) -> int:
+    """Classify a written incident and queue its event for matching subscribers."""
+    previous = self._seen.get(incident.id)
+    self._seen[incident.id] = (incident.status, incident.reporter_count, incident.zone_id, incident.severity)
+    extra: dict[str, object] = {}
+    if previous is None:
+      event = "incident_created"
+    elif previous[0] != incident.status:
+      event = "incident_status_changed"
+      extra["previous_status"] = previous[0]
+    elif incident.reporter_count > previous[1]:
+      event = "incident_merged"
+    else:
+      event = "incident_updated"
+    self.events += 1
+    groups = {(zone, severity) for zone in (incident.zone_id, ALL) for severity in (incident.severity, ALL)}
+    if previous is not None and previous[2:] != (incident.zone_id, incident.severity):
+      # Subscribers of the old zone or severity see the incident leave.
+      groups |= {(zone, severity) for zone in (previous[2], ALL) for severity in (previous[3], ALL)}
+    connections = set().union(*(self._index.get(group, ()) for group in groups))
+    if not connections:
+      return 0
+    frame = json.dumps({
+      "type": event,
+      "timestamp": datetime.now(timezone.utc).isoformat(),
+      **extra,
+      "data": incident.model_dump(mode="json"),
+    })
+    self.frames_encoded += 1
+    delivered = 0
+    for connection in connections:
+      if connection.offer(frame):
+        delivered += 1
+      else:
+        self.unsubscribe(connection)
+    return delivered
+
+  def _index_groups(self, connection: ClientConnection, groups: Iterable[FilterGroup]) -> None:
+    for group in groups:
+      self._index.setdefault(group, set()).add(connection)
+
+  def _unindex_groups(self, connection: ClientConnection, groups: Iterable[FilterGroup]) -> None:
+    for group in groups:
+      connections = self._index.get(group)
+      if connections is not None:
+        connections.discard(connection)
+        if not connections:
+          del self._index[group]
+
+
+incident_stream = IncidentStream.from_store()
+mock_store.add_listener(incident_stream.on_store_write)
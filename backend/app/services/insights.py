@@ -1,21 +1,138 @@
+"""Network health summary kept current by store write hooks.
+
+Store listeners and a telemetry batch observer update counters and latest
+values as writes happen:
+
+- open incidents per zone and per severity;
+- pending schedules;
+- the newest pressure and energy reading;
+- the latest fairness metric.
+
+Each write does constant work. The summary is encoded once per
+`generation`, which only advances when a reported value changes, and is
+served with that generation as its ETag.
+"""
+from __future__ import annotations
+
+import json
+import uuid
+from collections import Counter
 from datetime import datetime, timezone
+from typing import Mapping
+
+import numpy as np
+from pydantic import BaseModel
 
 from app.data import mock_store
+from app.data.telemetry_store import TelemetryStore, telemetry_store
+
+
+class NetworkHealth:
+  def __init__(self) -> None:
+    self.generation = 0
+    # Distinguishes this process's generations from another worker's or a restart's.
+    self._instance = uuid.uuid4().hex[:8]
+    self._open_keys: dict[str, tuple[str, str]] = {}
+    self._open_by_zone: Counter[str] = Counter()
+    self._open_by_severity: Counter[str] = Counter()
+    self._pending: set[str] = set()
+    self._pressure: float | None = None
+    self._energy: float | None = None
+    self._fairness: float | None = None
+    self._underserved: int | None = None
+    self._changed_at = datetime.now(timezone.utc)
+    self._encoded: tuple[int, bytes] | None = None
+
+  @classmethod
+  def from_store(cls, store: TelemetryStore) -> NetworkHealth:
+    health = cls()
+    for incident in mock_store.list_incidents():
+      health.on_store_write("incident", incident)
+    for schedule in mock_store.list_pump_schedules():
+      health.on_store_write("schedule", schedule)
+    fairness = mock_store.list_fairness_metrics()
+    if fairness:
+      health.on_store_write("fairness", fairness[-1])
+    if len(store):
+      latest = store.snapshot(store.head_seq - 1)
+      health._set_telemetry(latest.pressure_psi, latest.energy_kw)
+    health.generation = 0
+    return health
+
+  @property
+  def etag(self) -> str:
+    return f'"{self._instance}-{self.generation}"'
+
+  def _changed(self) -> None:
+    self.generation += 1
+    self._changed_at = datetime.now(timezone.utc)
+
+  def on_store_write(self, kind: str, item: BaseModel) -> None:
+    if kind == "incident":
+      self._set_incident(item.id, (item.zone_id, item.severity) if item.status != "resolved" else None)
+    elif kind in ("schedule", "schedule_removed"):
+      # Approvals mutate the stored schedule in place, so membership is the only history kept.
+      pending = kind == "schedule" and item.status == "scheduled"
+      if pending != (item.id in self._pending):
+        if pending:
+          self._pending.add(item.id)
+        else:
+          self._pending.discard(item.id)
+        self._changed()
+    elif kind == "fairness":
+      if (item.citywide_score, item.underserved_wards) != (self._fairness, self._underserved):
+        self._fairness, self._underserved = item.citywide_score, item.underserved_wards
+        self._changed()
+
+  def _set_incident(self, incident_id: str, key: tuple[str, str] | None) -> None:
+    previous = self._open_keys.get(incident_id)
+    if previous == key:
+      return
+    if previous is not None:
+      del self._open_keys[incident_id]
+      self._open_by_zone[previous[0]] -= 1
+      self._open_by_severity[previous[1]] -= 1
+    if key is not None:
+      self._open_keys[incident_id] = key
+      self._open_by_zone[key[0]] += 1
+      self._open_by_severity[key[1]] += 1
+    self._changed()
+
+  def observe(self, store: TelemetryStore, columns: Mapping[str, np.ndarray]) -> None:
+    """Telemetry batch observer: the store's last row is the newest reading, late batches included."""
+    newest = store.window_seqs(store.head_seq - 1)
+    self._set_telemetry(float(newest["pressure_psi"][0]), float(newest["energy_kw"][0]))
+
+  def _set_telemetry(self, pressure: float, energy: float) -> None:
+    pressure, energy = round(pressure, 2), round(energy, 2)
+    if (pressure, energy) != (self._pressure, self._energy):
+      self._pressure, self._energy = pressure, energy
+      self._changed()
+
+  def summary(self) -> dict[str, object]:
+    return {
+      "generation": self.generation,
+      "generated_at": self._changed_at.isoformat(),
+      "pressure_psi": self._pressure,
+      "energy_kw": self._energy,
+      "citywide_fairness": self._fairness,
+      "underserved_wards": self._underserved,
+      "open_incidents": len(self._open_keys),
+      "open_incidents_by_zone": {zone: count for zone, count in sorted(self._open_by_zone.items()) if count},
+      "open_incidents_by_severity": {severity: count for severity, count in sorted(self._open_by_severity.items()) if count},
+      "pending_schedules": len(self._pending),
+    }
+
+  def encoded(self) -> bytes:
+    """JSON summary, encoded once per generation."""
+    if self._encoded is None or self._encoded[0] != self.generation:
+      self._encoded = (self.generation, json.dumps(self.summary()).encode())
+    return self._encoded[1]
 
 
 def summarize_network_health() -> dict[str, object]:
-  telemetry = mock_store.latest_telemetry()
-  fairness = mock_store.list_fairness_metrics()
-  incidents = mock_store.list_incidents()
-  schedules = mock_store.list_pump_schedules()
-
-  return {
-    "generated_at": datetime.now(timezone.utc).isoformat(),
-    "pressure_psi": telemetry[-1].pressure_psi if telemetry else None,
-    "energy_kw": telemetry[-1].energy_kw if telemetry else None,
-    "citywide_fairness": fairness[-1].citywide_score if fairness else None,
-    "underserved_wards": fairness[-1].underserved_wards if fairness else None,
-    "open_incidents": len([incident for incident in incidents if incident.status != "resolved"]),
-    "pending_schedules": len([schedule for schedule in schedules if schedule.status == "scheduled"]),
-  }
+  return network_health.summary()
+
 
+network_health = NetworkHealth.from_store(telemetry_store)
+mock_store.add_listener(network_health.on_store_write)
@@ -0,0 +1,203 @@
+"""Pluggable publish/subscribe backends for cross-worker messaging.
+
+`RedisPubSub` is used in production. `MemoryPubSub` delivers in-process and
+synchronously (single worker, tests), and `SocketPubSub` talks to a tiny
+`SocketBroker` over local TCP so several processes can share channels without
+a Redis server.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Awaitable, Callable
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[bytes], Awaitable[None]]
+
+
+class PubSub(ABC):
+  def __init__(self) -> None:
+    self._handlers: dict[str, list[MessageHandler]] = defaultdict(list)
+
+  async def start(self) -> None:
+    return None
+
+  async def close(self) -> None:
+    return None
+
+  @abstractmethod
+  async def publish(self, channel: str, message: bytes) -> None: ...
+
+  async def subscribe(self, channel: str, handler: MessageHandler) -> None:
+    self._handlers[channel].append(handler)
+
+  async def _dispatch(self, channel: str, message: bytes) -> None:
+    for handler in self._handlers.get(channel, ()):
+      try:
+        await handler(message)
+      except Exception:
+        logger.exception("Pub/sub handler failed on channel %s", channel)
+
+
+class MemoryPubSub(PubSub):
+  """Single-process backend; handlers run before `publish` returns."""
+
+  async def publish(self, channel: str, message: bytes) -> None:
+    await self._dispatch(channel, message)
+
+
+class RedisPubSub(PubSub):
+  def __init__(self, url: str) -> None:
+    super().__init__()
+    self.url = url
+    self._redis = None
+    self._pubsub = None
+    self._reader: asyncio.Task[None] | None = None
+
+  async def start(self) -> None:
+    from redis import asyncio as redis_asyncio
+
+    self._redis = redis_asyncio.from_url(self.url)
+    self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+    if self._handlers:
+      await self._pubsub.subscribe(*self._handlers)
+    self._reader = asyncio.create_task(self._read())
+
+  async def close(self) -> None:
+    if self._reader is not None:
+      self._reader.cancel()
+    if self._pubsub is not None:
+      await self._pubsub.aclose()
+    if self._redis is not None:
+      await self._redis.aclose()
+
+  async def publish(self, channel: str, message: bytes) -> None:
+    await self._redis.publish(channel, message)
+
+  async def subscribe(self, channel: str, handler: MessageHandler) -> None:
+    first = channel not in self._handlers
+    await super().subscribe(channel, handler)
+    if first and self._pubsub is not None:
+      await self._pubsub.subscribe(channel)
+
+  async def _read(self) -> None:
+    while True:
+      if not self._pubsub.subscribed:
+        await asyncio.sleep(0.05)
+        continue
+      message = await self._pubsub.get_message(timeout=1.0)
+      if message is not None and message["type"] == "message":
+        channel = message["channel"]
+        await self._dispatch(channel.decode() if isinstance(channel, bytes) else channel, message["data"])
+
+
+# Socket wire format: op (1 byte), channel length (2 bytes), payload length (4 bytes), channel, payload.
+_HEADER = struct.Struct(">BHI")
+_OP_SUBSCRIBE, _OP_PUBLISH, _OP_MESSAGE = 1, 2, 3
+
+
+def _frame(op: int, channel: str, payload: bytes = b"") -> bytes:
+  encoded = channel.encode()
+  return _HEADER.pack(op, len(encoded), len(payload)) + encoded + payload
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> tuple[int, str, bytes]:
+  op, channel_length, payload_length = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+  channel = (await reader.readexactly(channel_length)).decode()
+  return op, channel, await reader.readexactly(payload_length)
+
+
+def parse_address(address: str) -> tuple[str, int]:
+  host, _, port = address.rpartition(":")
+  return host or "127.0.0.1", int(port)
+
+
+class SocketBroker:
+  """Minimal fan-out broker for `SocketPubSub` clients on one host."""
+
+  def __init__(self, host: str, port: int) -> None:
+    self.host = host
+    self.port = port
+    self._subscribers: dict[str, set[asyncio.StreamWriter]] = defaultdict(set)
+    self._server: asyncio.AbstractServer | None = None
+
+  async def start(self) -> None:
+    self._server = await asyncio.start_server(self._serve, self.host, self.port)
+    if self.port == 0:
+      self.port = self._server.sockets[0].getsockname()[1]
+
+  async def close(self) -> None:
+    if self._server is not None:
+      self._server.close()
+      await self._server.wait_closed()
+
+  async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+      while True:
+        op, channel, payload = await _read_frame(reader)
+        if op == _OP_SUBSCRIBE:
+          self._subscribers[channel].add(writer)
+        elif op == _OP_PUBLISH:
+          frame = _frame(_OP_MESSAGE, channel, payload)
+          for subscriber in list(self._subscribers.get(channel, ())):
+            subscriber.write(frame)
+    except (asyncio.IncompleteReadError, ConnectionError):
+      pass
+    finally:
+      for subscribers in self._subscribers.values():
+        subscribers.discard(writer)
+      writer.close()
+
+
+class SocketPubSub(PubSub):
+  def __init__(self, address: str) -> None:
+    super().__init__()
+    self.host, self.port = parse_address(address)
+    self._writer: asyncio.StreamWriter | None = None
+    self._reader_task: asyncio.Task[None] | None = None
+
+  async def start(self) -> None:
+    reader, self._writer = await asyncio.open_connection(self.host, self.port)
+    for channel in self._handlers:
+      self._writer.write(_frame(_OP_SUBSCRIBE, channel))
+    await self._writer.drain()
+    self._reader_task = asyncio.create_task(self._read(reader))
+
+  async def close(self) -> None:
+    if self._reader_task is not None:
+      self._reader_task.cancel()
+    if self._writer is not None:
+      self._writer.close()
+
+  async def publish(self, channel: str, message: bytes) -> None:
+    self._writer.write(_frame(_OP_PUBLISH, channel, message))
+    await self._writer.drain()
+
+  async def subscribe(self, channel: str, handler: MessageHandler) -> None:
+    first = channel not in self._handlers
+    await super().subscribe(channel, handler)
+    if first and self._writer is not None:
+      self._writer.write(_frame(_OP_SUBSCRIBE, channel))
+      await self._writer.drain()
+
+  async def _read(self, reader: asyncio.StreamReader) -> None:
+    try:
+      while True:
+        _, channel, payload = await _read_frame(reader)
+        await self._dispatch(channel, payload)
+    except (asyncio.IncompleteReadError, ConnectionError):
+      logger.warning("Pub/sub broker connection closed")
+
+
+def create_pubsub(settings: Settings) -> PubSub:
+  if settings.pubsub_backend == "redis":
+    return RedisPubSub(settings.redis_url)
+  if settings.pubsub_backend == "socket":
+    return SocketPubSub(settings.pubsub_socket_address)
+  return MemoryPubSub()
@@ -0,0 +1,197 @@
+"""Hourly reservoir level projections.
+
+A reservoir drains through the pumps it feeds (as in the schedule optimizer
+and the simulator). Every active schedule on an operational pump draws its
+flow rate for the part of each hour it runs, split evenly across the
+reservoirs upstream of the pump. A zone takes no more than its forecast
+demand for the hour, so when a zone's runs exceed it they are scaled down
+together. Levels start at `current_level_ml` at the top of the current hour.
+
+Runs come from the schedule store's interval index for the projection
+window. Projections are cached per reservoir. Store writes and telemetry mark only
+the reservoirs they reach as stale:
+
+- a schedule: the reservoirs above its pump, before and after the change;
+- a station or a reservoir: the reservoirs above that pump, or the reservoir;
+- telemetry: the reservoirs above the zones that reported, once the demand
+  forecast next changes.
+
+Everything is recomputed when the hour rolls over.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Mapping
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import Settings, get_settings
+from app.data import mock_store
+from app.data.network_graph import NetworkGraph, network_graph
+from app.data.schedule_store import ACTIVE_STATUSES
+from app.data.telemetry_store import TelemetryStore, from_epoch
+from app.schemas.water import PumpSchedule, ReservoirProjection, ReservoirStatus, WaterZone
+from app.services.demand_forecast import HOUR, DemandForecaster, demand_forecaster
+from app.services.schedule_optimizer import DAY_HOURS, LPS_TO_ML_PER_HOUR
+
+
+class ReservoirProjector:
+  def __init__(
+    self,
+    graph: NetworkGraph,
+    forecaster: DemandForecaster,
+    settings: Settings,
+    schedules: list[PumpSchedule],
+  ) -> None:
+    self.graph = graph
+    self.forecaster = forecaster
+    self.settings = settings
+    self.horizon_hours = settings.reservoir_projection_horizon_hours
+    # Schedule id -> (pump, zone), to find what a replaced schedule used to reach.
+    self._placements = {schedule.id: (schedule.pump_id, schedule.zone_id) for schedule in schedules}
+    self._cache: dict[str, ReservoirProjection] = {}
+    self._stale: set[str] = set()
+    self._start: int | None = None
+    self._forecast_generation = -1
+    self._reported_zones: set[int] = set()
+    self.recomputed = 0
+
+  def _above_pump(self, pump_id: str) -> list[str]:
+    return self.graph.upstream_ids("pump", pump_id)
+
+  def _window(self, start: int | None = None) -> tuple[datetime, datetime]:
+    start = self._start if start is None else start
+    if start is None:
+      start = int(datetime.now(timezone.utc).timestamp()) // HOUR * HOUR
+    return from_epoch(start), from_epoch(start + self.horizon_hours * HOUR)
+
+  def _runs(self, window: tuple[datetime, datetime], pump_id: str | None = None, zone_id: str | None = None) -> list[PumpSchedule]:
+    return [
+      schedule for schedule in mock_store.query_pump_schedules(*window, pump_id=pump_id, zone_id=zone_id)
+      if self._active(schedule)
+    ]
+
+  def _above_zone(self, zone_id: str) -> set[str]:
+    pumps = {*self.graph.upstream_ids("zone", zone_id), *(run.pump_id for run in self._runs(self._window(), zone_id=zone_id))}
+    return {reservoir for pump in pumps for reservoir in self._above_pump(pump)}
+
+  def on_store_write(self, kind: str, item: BaseModel) -> None:
+    if kind in ("schedule", "schedule_removed"):
+      previous = self._placements.pop(item.id, None)
+      if previous is not None:
+        # Other pumps feeding the zone share its demand, so their reservoirs move too.
+        self._stale.update(self._above_pump(previous[0]), self._above_zone(previous[1]))
+      if kind == "schedule":
+        self._placements[item.id] = (item.pump_id, item.zone_id)
+      self._stale.update(self._above_pump(item.pump_id), self._above_zone(item.zone_id))
+    elif kind == "station":
+      self._stale.update(self._above_pump(item.id))
+    elif kind == "reservoir":
+      self._stale.add(item.id)
+
+  def observe(self, store: TelemetryStore, columns: Mapping[str, np.ndarray]) -> None:
+    """Telemetry batch observer: remember which zones reported."""
+    self._reported_zones.update(np.unique(columns["zone"]).tolist())
+
+  def projections(self, reservoirs: list[ReservoirStatus], now: datetime | None = None) -> dict[str, ReservoirProjection]:
+    """Projection per reservoir, recomputing only the stale ones."""
+    now = now or datetime.now(timezone.utc)
+    start = int(now.timestamp()) // HOUR * HOUR
+    if start != self._start:
+      self._start = start
+      self._cache.clear()
+    if self.settings.enable_demand_forecast:
+      self.forecaster.refresh()
+    if self.forecaster.generation != self._forecast_generation:
+      self._forecast_generation = self.forecaster.generation
+      for code in self._reported_zones:
+        zone_id = self.forecaster.store.zone_id(code)
+        if zone_id is not None:
+          self._stale.update(self._above_zone(zone_id))
+      self._reported_zones.clear()
+    missing = [
+      reservoir for reservoir in reservoirs
+      if reservoir.id not in self._cache or reservoir.id in self._stale
+    ]
+    if missing:
+      self._cache.update(self.project(missing, start))
+      self._stale.difference_update(reservoir.id for reservoir in missing)
+      self.recomputed += len(missing)
+    return {reservoir.id: self._cache[reservoir.id] for reservoir in reservoirs}
+
+  def _active(self, schedule: PumpSchedule) -> bool:
+    station = mock_store.get_pump_station(schedule.pump_id)
+    return schedule.status in ACTIVE_STATUSES and station is not None and station.status == "operational"
+
+  def _zone_demand(self, zone_ids: list[str], start: int) -> np.ndarray:
+    """`[zones, horizon]` megalitres per hour: the forecast where there is one, per-capita demand otherwise."""
+    per_capita_ml_per_hour = self.settings.optimizer_per_capita_demand_lpd / 1_000_000 / DAY_HOURS
+    zones: list[WaterZone | None] = [mock_store.get_zone(zone_id) for zone_id in zone_ids]
+    demand = np.array([
+      [zone.population_served * per_capita_ml_per_hour if zone is not None else np.inf] for zone in zones
+    ]) * np.ones(self.horizon_hours)
+    if not self.settings.enable_demand_forecast or not self.forecaster.has_forecast():
+      return demand
+    store = self.forecaster.store
+    forecast_rows = [
+      (row, store.zone_code(zone_id)) for row, zone_id in enumerate(zone_ids) if self.forecaster.has_forecast(zone_id)
+    ]
+    if not forecast_rows:
+      return demand
+    rows, codes = (np.array(values) for values in zip(*forecast_rows))
+    _, _, forecast = self.forecaster.forecast_matrix(self.horizon_hours, codes, start)
+    demand[rows] = forecast
+    return demand
+
+  def project(self, reservoirs: list[ReservoirStatus], start: int) -> dict[str, ReservoirProjection]:
+    hours = self.horizon_hours
+    edges = start + HOUR * np.arange(hours + 1, dtype=np.float64)
+    window = self._window(start)
+    index = {reservoir.id: r for r, reservoir in enumerate(reservoirs)}
+    pumps = {pump for reservoir in reservoirs for pump in self.graph.downstream_ids("reservoir", reservoir.id)}
+    zone_ids = sorted({schedule.zone_id for pump in pumps for schedule in self._runs(window, pump_id=pump)})
+    # Every run into those zones competes for their demand, including runs from other reservoirs.
+    runs = [schedule for zone_id in zone_ids for schedule in self._runs(window, zone_id=zone_id)]
+    draw = np.zeros((len(reservoirs), hours))
+    if runs:
+      run_start = np.array([schedule.start_time_utc.timestamp() for schedule in runs])[:, None]
+      run_end = np.array([schedule.end_time_utc.timestamp() for schedule in runs])[:, None]
+      running = np.clip(np.minimum(run_end, edges[1:]) - np.maximum(run_start, edges[:-1]), 0, HOUR) / HOUR
+      pumped = np.array([schedule.flow_rate_lps * LPS_TO_ML_PER_HOUR for schedule in runs])[:, None] * running
+      zone_of_run = np.searchsorted(zone_ids, [schedule.zone_id for schedule in runs])
+      supplied = np.zeros((len(zone_ids), hours))
+      np.add.at(supplied, zone_of_run, pumped)
+      with np.errstate(invalid="ignore", divide="ignore"):
+        taken = np.where(supplied > 0, np.minimum(self._zone_demand(zone_ids, start) / supplied, 1.0), 0.0)
+      drawn = pumped * taken[zone_of_run]
+      for run, schedule in enumerate(runs):
+        upstream = self._above_pump(schedule.pump_id)
+        for reservoir_id in upstream:
+          if reservoir_id in index:
+            draw[index[reservoir_id]] += drawn[run] / len(upstream)
+
+    level = np.array([reservoir.current_level_ml for reservoir in reservoirs], dtype=np.float64)
+    remaining = level[:, None] - np.cumsum(draw, axis=1)
+    levels = np.maximum(np.hstack([level[:, None], remaining]), 0.0)
+    empties = np.argmax(remaining <= 0, axis=1)
+    projections = {}
+    for r, reservoir in enumerate(reservoirs):
+      hours_until_empty = None
+      if remaining[r, empties[r]] <= 0:
+        hour = int(empties[r])
+        # Linear within the hour it runs dry.
+        hours_until_empty = round(hour + levels[r, hour] / draw[r, hour], 2) if draw[r, hour] > 0 else float(hour)
+      projections[reservoir.id] = ReservoirProjection(
+        reservoir_id=reservoir.id,
+        start_time=from_epoch(start),
+        step_hours=1.0,
+        levels_ml=[round(value, 3) for value in levels[r].tolist()],
+        min_level_ml=round(float(levels[r].min()), 3),
+        hours_until_empty=hours_until_empty,
+      )
+    return projections
+
+
+reservoir_projector = ReservoirProjector(network_graph, demand_forecaster, get_settings(), mock_store.list_pump_schedules())
+mock_store.add_listener(reservoir_projector.on_store_write)
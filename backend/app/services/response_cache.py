@@ -0,0 +1,113 @@
+"""Single-flight caching for expensive read endpoints.
+
+Results are cached per key together with the version of the data they were
+computed from. A cached result is served while its version is current and
+it is younger than the TTL. Concurrent requests for a key and version with
+nothing cached await the one computation already in flight instead of
+starting their own. The computation runs as its own task, so a client that
+disconnects does not cancel it for the others. Failures reach every waiter
+and are not cached.
+
+Each cache counts hits, misses (computations started) and coalesced waits.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Hashable, TypeVar
+
+from app.core.config import Settings, get_settings
+from app.schemas.water import ResponseCacheStats
+
+T = TypeVar("T")
+
+
+class ResponseCache(Generic[T]):
+  def __init__(self, name: str, ttl_seconds: float, max_entries: int) -> None:
+    self.name = name
+    self.ttl_seconds = ttl_seconds
+    self.max_entries = max_entries
+    self._entries: OrderedDict[Hashable, tuple[Hashable, float, T]] = OrderedDict()
+    self._inflight: dict[tuple[Hashable, Hashable], asyncio.Task[T]] = {}
+    self.hits = 0
+    self.misses = 0
+    self.coalesced = 0
+
+  async def get(
+    self,
+    key: Hashable,
+    version: Hashable,
+    compute: Callable[[], T | Awaitable[T]],
+    offload: bool = False,
+  ) -> T:
+    """Cached value of `compute()` for `key` at `version`.
+
+    Synchronous computations run on the event loop unless `offload` moves
+    them to a worker thread.
+    """
+    entry = self._entries.get(key)
+    if entry is not None and entry[0] == version and time.monotonic() < entry[1]:
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return entry[2]
+    flight = (key, version)
+    task = self._inflight.get(flight)
+    if task is not None:
+      self.coalesced += 1
+    else:
+      self.misses += 1
+      task = asyncio.ensure_future(self._compute(key, version, compute, offload))
+      self._inflight[flight] = task
+      task.add_done_callback(lambda done: self._landed(flight, done))
+    return await asyncio.shield(task)
+
+  async def _compute(self, key: Hashable, version: Hashable, compute: Callable[[], Any], offload: bool) -> T:
+    result = await asyncio.to_thread(compute) if offload else compute()
+    if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+      result = await result
+    self._entries[key] = (version, time.monotonic() + self.ttl_seconds, result)
+    self._entries.move_to_end(key)
+    while len(self._entries) > self.max_entries:
+      self._entries.popitem(last=False)
+    return result
+
+  def _landed(self, flight: tuple[Hashable, Hashable], task: asyncio.Task[T]) -> None:
+    self._inflight.pop(flight, None)
+    if not task.cancelled():
+      # Retrieved here so a failure nobody is still waiting for is not reported as unhandled.
+      task.exception()
+
+  def clear(self) -> None:
+    self._entries.clear()
+
+  def stats(self) -> ResponseCacheStats:
+    return ResponseCacheStats(
+      name=self.name,
+      entries=len(self._entries),
+      in_flight=len(self._inflight),
+      hits=self.hits,
+      misses=self.misses,
+      coalesced=self.coalesced,
+    )
+
+
+class ResponseCaches:
+  """Named caches sharing the TTL and size limits from settings."""
+
+  def __init__(self, settings: Settings) -> None:
+    self.settings = settings
+    self._caches: dict[str, ResponseCache[Any]] = {}
+
+  def __call__(self, name: str) -> ResponseCache[Any]:
+    cache = self._caches.get(name)
+    if cache is None:
+      cache = ResponseCache(name, self.settings.response_cache_ttl_seconds, self.settings.response_cache_max_entries)
+      self._caches[name] = cache
+    return cache
+
+  def stats(self) -> list[ResponseCacheStats]:
+    return [cache.stats() for cache in self._caches.values()]
+
+
+response_cache = ResponseCaches(get_settings())
@@ -0,0 +1,334 @@
+"""Fairness-constrained daily pump schedules.
+
+The day is planned as a flow network:
+
+  source -> reservoir -> pump -> zone -> sink
+
+Reservoir edges carry the water a reservoir can release before hitting its
+reserve, pump edges what a pump can deliver in 24 hours at `max_flow_lps`,
+and pump -> zone edges follow the shared network graph. A zone receiving
+`T` supply hours needs `T` hours of its forecast hourly demand, so the largest
+feasible minimum `T` is found by binary search, checking each candidate with
+a max-flow (Dinic's algorithm). Flow only grows between feasible candidates,
+so each check continues from the last feasible flow instead of starting over.
+
+Spare capacity is then handed out in rounds to the zones with the lowest
+fairness scores first, which never takes water away from the guaranteed
+minimum. Each pump's zone volumes become back-to-back `PumpSchedule` slots,
+placed in the cheapest window of the day under the time-of-use tariff when
+one is given (daily volumes do not depend on when a pump runs).
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Mapping, Sequence
+
+from app.core.config import Settings
+from app.data import mock_store
+from app.data.network_graph import NetworkGraph, network_graph
+from app.data.schedule_store import optimized_schedule_prefix
+from app.schemas.water import (
+  PumpSchedule,
+  PumpStation,
+  ReservoirStatus,
+  ScheduleOptimizationResult,
+  WaterZone,
+)
+from app.services.demand_forecast import demand_forecaster
+from app.services.energy_cost import Tariff, schedule_energy, tariff as default_tariff
+
+DAY_HOURS = 24.0
+# Litres per second to megalitres per hour.
+LPS_TO_ML_PER_HOUR = 3_600 / 1_000_000
+EPSILON = 1e-9
+# Spare capacity is shared out in this many rounds, least fairly served zones first.
+FAIRNESS_ROUNDS = 4
+
+
+class FlowNetwork:
+  """Residual graph for Dinic's max-flow; edge `e ^ 1` is the reverse of `e`."""
+
+  def __init__(self, nodes: int) -> None:
+    self.adjacency: list[list[int]] = [[] for _ in range(nodes)]
+    self.head: list[int] = []
+    self.residual: list[float] = []
+
+  def add_edge(self, tail: int, head: int, capacity: float) -> int:
+    edge = len(self.head)
+    self.adjacency[tail].append(edge)
+    self.head.append(head)
+    self.residual.append(capacity)
+    self.adjacency[head].append(edge + 1)
+    self.head.append(tail)
+    self.residual.append(0.0)
+    return edge
+
+  def flow(self, edge: int) -> float:
+    return self.residual[edge + 1]
+
+  def set_capacity(self, edge: int, capacity: float) -> None:
+    """Change an edge's capacity, keeping its current flow (capacity must not drop below it)."""
+    self.residual[edge] = capacity - self.residual[edge + 1]
+
+  def max_flow(self, source: int, sink: int) -> float:
+    """Augment until no path is left; returns the flow added by this call."""
+    added = 0.0
+    while True:
+      level = self._levels(source, sink)
+      if level[sink] < 0:
+        return added
+      cursor = [0] * len(self.adjacency)
+      while True:
+        pushed = self._augment(source, sink, level, cursor)
+        if pushed <= EPSILON:
+          break
+        added += pushed
+
+  def _levels(self, source: int, sink: int) -> list[int]:
+    level = [-1] * len(self.adjacency)
+    level[source] = 0
+    queue = deque([source])
+    head, residual, adjacency = self.head, self.residual, self.adjacency
+    while queue:
+      node = queue.popleft()
+      for edge in adjacency[node]:
+        target = head[edge]
+        if level[target] < 0 and residual[edge] > EPSILON:
+          level[target] = level[node] + 1
+          queue.append(target)
+    return level
+
+  def _augment(self, source: int, sink: int, level: list[int], cursor: list[int]) -> float:
+    """Push along one shortest path found by iterative DFS; 0 when the level graph is blocked."""
+    head, residual, adjacency = self.head, self.residual, self.adjacency
+    path: list[int] = []
+    node = source
+    while True:
+      if node == sink:
+        pushed = min(residual[edge] for edge in path)
+        for edge in path:
+          residual[edge] -= pushed
+          residual[edge ^ 1] += pushed
+        return pushed
+      edges = adjacency[node]
+      while cursor[node] < len(edges):
+        edge = edges[cursor[node]]
+        target = head[edge]
+        if residual[edge] > EPSILON and level[target] == level[node] + 1:
+          break
+        cursor[node] += 1
+      else:
+        if node == source:
+          return 0.0
+        # Dead end: drop it from the level graph and back up one step.
+        level[node] = -1
+        edge = path.pop()
+        node = head[edge ^ 1]
+        cursor[node] += 1
+        continue
+      path.append(edge)
+      node = target
+
+
+@dataclass
+class SupplyPlan:
+  """Solved volumes, before they are laid out as schedules."""
+
+  min_supply_hours: float
+  zone_supply_hours: dict[str, float]
+  # pump id -> [(zone id, megalitres)]
+  deliveries: dict[str, list[tuple[str, float]]] = field(default_factory=dict)
+
+
+def solve_supply(
+  zones: Sequence[WaterZone],
+  stations: Sequence[PumpStation],
+  reservoirs: Sequence[ReservoirStatus],
+  hourly_demand_ml: Mapping[str, float],
+  reserve_fraction: float,
+  tolerance_hours: float = 0.05,
+  graph: NetworkGraph | None = None,
+) -> SupplyPlan:
+  if graph is None:
+    graph = NetworkGraph.build(zones, stations, reservoirs)
+  zone_index = {zone.id: i for i, zone in enumerate(zones)}
+  pumps = [station for station in stations if station.status == "operational" and station.max_flow_lps > 0]
+  pump_index = {pump.id: i for i, pump in enumerate(pumps)}
+  # Pumps are split into an intake and an outlet node so their daily throughput is capped once.
+  source, sink = 0, 1
+  first_reservoir = 2
+  first_intake = first_reservoir + len(reservoirs)
+  first_outlet = first_intake + len(pumps)
+  first_zone = first_outlet + len(pumps)
+  network = FlowNetwork(first_zone + len(zones))
+
+  fed_pumps: set[int] = set()
+  for r, reservoir in enumerate(reservoirs):
+    releasable = max(0.0, reservoir.current_level_ml - reserve_fraction * reservoir.capacity_ml)
+    network.add_edge(source, first_reservoir + r, releasable)
+    for pump_id in graph.downstream_ids("reservoir", reservoir.id):
+      if pump_id in pump_index:
+        network.add_edge(first_reservoir + r, first_intake + pump_index[pump_id], float("inf"))
+        fed_pumps.add(pump_index[pump_id])
+
+  supply_edges: list[tuple[str, str, int]] = []
+  for p, pump in enumerate(pumps):
+    if p not in fed_pumps:
+      # Pumps without a listed reservoir draw straight from treatment.
+      network.add_edge(source, first_intake + p, float("inf"))
+    network.add_edge(first_intake + p, first_outlet + p, pump.max_flow_lps * LPS_TO_ML_PER_HOUR * DAY_HOURS)
+    for zone_id in graph.downstream_ids("pump", pump.id):
+      if zone_id in zone_index:
+        edge = network.add_edge(first_outlet + p, first_zone + zone_index[zone_id], float("inf"))
+        supply_edges.append((pump.id, zone_id, edge))
+
+  demand = [max(hourly_demand_ml.get(zone.id, 0.0), 0.0) for zone in zones]
+  sink_edges = [network.add_edge(first_zone + z, sink, 0.0) for z in range(len(zones))]
+  fed_zones = {zone_index[zone_id] for _, zone_id, _ in supply_edges}
+  # Zones without a pump cannot be supplied and do not hold the minimum down.
+  served = [z for z in range(len(zones)) if z in fed_zones and demand[z] > 0]
+
+  def raise_targets(hours: float, members: Sequence[int]) -> float:
+    wanted = 0.0
+    for z in members:
+      target = demand[z] * hours
+      if target > network.flow(sink_edges[z]):
+        network.set_capacity(sink_edges[z], target)
+      wanted += target
+    return wanted
+
+  low, high = 0.0, DAY_HOURS if served else 0.0
+  saved = list(network.residual)
+  while high - low > tolerance_hours:
+    candidate = (low + high) / 2
+    wanted = raise_targets(candidate, served)
+    network.max_flow(source, sink)
+    delivered = sum(network.flow(sink_edges[z]) for z in served)
+    if delivered >= wanted * (1 - 1e-9) - EPSILON:
+      low, saved = candidate, list(network.residual)
+    else:
+      high = candidate
+      network.residual = list(saved)
+  network.residual = saved
+
+  # Hand out what is left, least fairly served zones first.
+  by_fairness = sorted(served, key=lambda z: zones[z].fairness_score)
+  step = max(-(-len(by_fairness) // FAIRNESS_ROUNDS), 1)
+  for end in range(step, len(by_fairness) + step, step):
+    raise_targets(DAY_HOURS, by_fairness[:end])
+    network.max_flow(source, sink)
+
+  deliveries: dict[str, list[tuple[str, float]]] = {}
+  for pump_id, zone_id, edge in supply_edges:
+    volume = network.flow(edge)
+    if volume > EPSILON:
+      deliveries.setdefault(pump_id, []).append((zone_id, volume))
+  return SupplyPlan(
+    min_supply_hours=round(low, 2),
+    zone_supply_hours={
+      zone.id: round(network.flow(sink_edges[z]) / demand[z], 2) if demand[z] > 0 else 0.0
+      for z, zone in enumerate(zones)
+    },
+    deliveries=deliveries,
+  )
+
+
+def build_schedules(
+  plan: SupplyPlan,
+  stations: Sequence[PumpStation],
+  zones: Sequence[WaterZone],
+  day: date,
+  tariff: Tariff | None = None,
+) -> list[PumpSchedule]:
+  """Lay each pump's deliveries end to end, least fairly served zone first.
+
+  Runs start at midnight, or with a tariff, at the start of the cheapest
+  window long enough for the pump's whole day of runs.
+  """
+  fairness = {zone.id: zone.fairness_score for zone in zones}
+  by_id = {station.id: station for station in stations}
+  midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+  offsets = [0.0] * len(plan.deliveries)
+  if tariff is not None and plan.deliveries:
+    durations = [
+      sum(volume for _, volume in deliveries) / (by_id[pump_id].max_flow_lps * LPS_TO_ML_PER_HOUR) * 3_600
+      for pump_id, deliveries in plan.deliveries.items()
+    ]
+    offsets = tariff.cheapest_starts(int(midnight.timestamp()), durations).tolist()
+  schedules: list[PumpSchedule] = []
+  for (pump_id, deliveries), offset in zip(plan.deliveries.items(), offsets):
+    pump = by_id[pump_id]
+    rate = pump.max_flow_lps * LPS_TO_ML_PER_HOUR
+    start = midnight + timedelta(seconds=offset)
+    for zone_id, volume in sorted(deliveries, key=lambda item: (fairness.get(item[0], 1.0), item[0])):
+      end = min(start + timedelta(seconds=round(volume / rate * 3_600)), midnight + timedelta(hours=DAY_HOURS))
+      schedules.append(PumpSchedule(
+        id=f"{optimized_schedule_prefix(day)}{pump_id}-{zone_id}",
+        pump_id=pump_id,
+        zone_id=zone_id,
+        start_time_utc=start,
+        end_time_utc=end,
+        flow_rate_lps=pump.max_flow_lps,
+        status="scheduled",
+        recommendation_reason=(
+          f"AI: {plan.zone_supply_hours[zone_id]:.1f} supply hours for this zone "
+          f"(citywide minimum {plan.min_supply_hours:.1f} h, fairness score {fairness.get(zone_id, 0):.2f})."
+        ),
+      ))
+      start = end
+  return schedules
+
+
+def optimize_day(
+  zones: Sequence[WaterZone],
+  stations: Sequence[PumpStation],
+  reservoirs: Sequence[ReservoirStatus],
+  hourly_demand_ml: Mapping[str, float],
+  day: date,
+  reserve_fraction: float,
+  graph: NetworkGraph | None = None,
+  tariff: Tariff | None = None,
+) -> ScheduleOptimizationResult:
+  started = time.perf_counter()
+  plan = solve_supply(zones, stations, reservoirs, hourly_demand_ml, reserve_fraction, graph=graph)
+  schedules = build_schedules(plan, stations, zones, day, tariff)
+  _, energy, cost = schedule_energy(schedules, stations, tariff or default_tariff)
+  return ScheduleOptimizationResult(
+    day=day,
+    min_supply_hours=plan.min_supply_hours,
+    zone_supply_hours=plan.zone_supply_hours,
+    schedules=schedules,
+    energy_kwh=round(float(energy.sum()), 3),
+    energy_cost=round(float(cost.sum()), 2),
+    solve_seconds=round(time.perf_counter() - started, 3),
+  )
+
+
+def forecast_hourly_demand(zones: Sequence[WaterZone], settings: Settings) -> dict[str, float]:
+  """Mean forecast hourly demand per zone, from population where there is no forecast yet."""
+  per_capita_ml_per_hour = settings.optimizer_per_capita_demand_lpd / 1_000_000 / DAY_HOURS
+  demand = {zone.id: zone.population_served * per_capita_ml_per_hour for zone in zones}
+  if settings.enable_demand_forecast and demand_forecaster.has_forecast():
+    codes, _, forecast = demand_forecaster.forecast_matrix(int(DAY_HOURS))
+    for code, mean in zip(codes.tolist(), forecast.mean(axis=1).tolist()):
+      zone_id = demand_forecaster.store.zone_id(code)
+      if zone_id in demand:
+        demand[zone_id] = mean
+  return demand
+
+
+def optimize_from_store(day: date, settings: Settings) -> ScheduleOptimizationResult:
+  zones = mock_store.list_zones()
+  return optimize_day(
+    zones,
+    mock_store.list_pump_stations(),
+    mock_store.list_reservoirs(),
+    forecast_hourly_demand(zones, settings),
+    day,
+    settings.optimizer_reservoir_reserve_fraction,
+    graph=network_graph,
+    tariff=default_tariff if settings.optimizer_minimize_energy_cost else None,
+  )
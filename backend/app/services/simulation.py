@@ -0,0 +1,348 @@
+"""What-if simulation of pump and reservoir operations.
+
+A scenario is the current network and active pump schedules with changes
+applied: pumps taken offline, schedules dropped or added, zone supply cut
+short, reservoir levels, inflow or demand changed. Each scenario runs a
+time-stepped mass balance. At every step, scheduled pumping draws from the
+reservoirs upstream of each pump. A reservoir that cannot cover its draw
+delivers only the share it holds. Zones receive what their pumps delivered.
+
+Scenarios are stacked along a leading axis, so one step advances a whole
+chunk of scenarios with a few matrix products. Chunks run in a process pool.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.core.config import Settings, get_settings
+from app.data import mock_store
+from app.data.network_graph import NetworkGraph, network_graph
+from app.data.schedule_store import ACTIVE_STATUSES
+from app.schemas.water import (
+  PumpSchedule,
+  PumpStation,
+  ReservoirProjection,
+  ReservoirStatus,
+  ScenarioResult,
+  SimulationBatchResult,
+  SimulationRequest,
+  SimulationScenario,
+  WaterZone,
+)
+from app.services.fairness import weighted_gini
+from app.services.schedule_optimizer import LPS_TO_ML_PER_HOUR, forecast_hourly_demand
+
+
+@dataclass
+class NetworkArrays:
+  """Scenario-independent inputs, shared by every chunk."""
+
+  steps: int
+  steps_per_hour: int
+  step_hours: float
+  population: np.ndarray  # [zones]
+  demand: np.ndarray  # [zones] megalitres per step
+  # [schedules, reservoirs]: share of each schedule's draw taken from each reservoir;
+  # rows of pumps without a listed reservoir are empty (unlimited source).
+  draw_share: np.ndarray
+  # Schedules are ordered by zone: `zone_starts` are the first schedule of each
+  # zone in `schedule_zones`, so per-zone sums are one `np.add.reduceat`.
+  zone_starts: np.ndarray
+  schedule_zones: np.ndarray
+
+
+@dataclass
+class ScenarioArrays:
+  """Per-scenario inputs for one chunk, stacked along the first axis."""
+
+  start: np.ndarray  # [scenarios, schedules] first step
+  end: np.ndarray  # [scenarios, schedules] step after the last
+  rate: np.ndarray  # [scenarios, schedules] megalitres per step, 0 when dropped
+  level: np.ndarray  # [scenarios, reservoirs] starting level
+  inflow: np.ndarray  # [scenarios, reservoirs] megalitres per step
+  demand_multiplier: np.ndarray  # [scenarios]
+
+
+@dataclass
+class ChunkResult:
+  levels: np.ndarray  # [scenarios, reservoirs, hours + 1]
+  empty_step: np.ndarray  # [scenarios, reservoirs], -1 when never empty
+  delivered: np.ndarray  # [scenarios, zones] megalitres
+  supplied_steps: np.ndarray  # [scenarios, zones]
+  unmet: np.ndarray  # [scenarios, zones] megalitres
+
+
+def simulate_chunk(network: NetworkArrays, scenarios: ScenarioArrays) -> ChunkResult:
+  """Run the mass balance for a chunk of scenarios; a top-level function so worker processes can run it."""
+  count, reservoirs = scenarios.level.shape
+  zones = len(network.population)
+  level = scenarios.level.astype(np.float64).copy()
+  unlimited = 1.0 - network.draw_share.sum(axis=1)
+  fed = network.schedule_zones
+
+  levels = np.empty((count, reservoirs, network.steps // network.steps_per_hour + 1))
+  levels[:, :, 0] = level
+  empty_step = np.full((count, reservoirs), -1, dtype=np.int64)
+  delivered = np.zeros((count, zones))
+  supplied = np.zeros((count, zones), dtype=np.int64)
+  for step in range(network.steps):
+    pumping = np.where((scenarios.start <= step) & (step < scenarios.end), scenarios.rate, 0.0)
+    requested = pumping @ network.draw_share
+    available = level + scenarios.inflow
+    with np.errstate(invalid="ignore", divide="ignore"):
+      share = np.where(requested > 0, np.minimum(available / requested, 1.0), 1.0)
+    level = available - requested * share
+    if len(fed):
+      received = np.add.reduceat(pumping * (share @ network.draw_share.T + unlimited), network.zone_starts, axis=1)
+      delivered[:, fed] += received
+      supplied[:, fed] += received > 0
+    newly_empty = (level <= 1e-9) & (empty_step < 0) & (requested > 0)
+    empty_step[newly_empty] = step + 1
+    if (step + 1) % network.steps_per_hour == 0:
+      levels[:, :, (step + 1) // network.steps_per_hour] = level
+  demand = network.demand[None, :] * network.steps * scenarios.demand_multiplier[:, None]
+  return ChunkResult(levels, empty_step, delivered, supplied, np.maximum(demand - delivered, 0.0))
+
+
+class ScenarioBuilder:
+  """Turns the store snapshot and scenario changes into arrays."""
+
+  def __init__(
+    self,
+    zones: list[WaterZone],
+    stations: list[PumpStation],
+    reservoirs: list[ReservoirStatus],
+    schedules: list[PumpSchedule],
+    hourly_demand_ml: dict[str, float],
+    graph: NetworkGraph,
+    start_time: datetime,
+    hours: int,
+    step_minutes: int,
+  ) -> None:
+    self.zones = zones
+    self.stations = {station.id: station for station in stations}
+    self.reservoirs = reservoirs
+    self.graph = graph
+    self.start_time = start_time
+    if 60 % step_minutes:
+      raise ValueError("step_minutes must divide an hour evenly")
+    self.step_minutes = step_minutes
+    self.steps = hours * 60 // step_minutes
+    self.zone_index = {zone.id: i for i, zone in enumerate(zones)}
+    self.reservoir_index = {reservoir.id: i for i, reservoir in enumerate(reservoirs)}
+    self.hourly_demand_ml = hourly_demand_ml
+    self.base = [schedule for schedule in schedules if self._usable(schedule)]
+
+  def _usable(self, schedule: PumpSchedule) -> bool:
+    return (
+      schedule.status in ACTIVE_STATUSES
+      and schedule.zone_id in self.zone_index
+      and schedule.pump_id in self.stations
+      and self.stations[schedule.pump_id].status == "operational"
+    )
+
+  def _step(self, moment: datetime) -> int:
+    minutes = (moment - self.start_time).total_seconds() / 60
+    return int(min(max(round(minutes / self.step_minutes), 0), self.steps))
+
+  def network(self, schedules: list[PumpSchedule]) -> NetworkArrays:
+    """Static arrays for `schedules`, which must be ordered by zone (see `schedules`)."""
+    zones = np.array([self.zone_index[schedule.zone_id] for schedule in schedules], dtype=np.int64)
+    draw_share = np.zeros((len(schedules), len(self.reservoirs)))
+    for s, schedule in enumerate(schedules):
+      upstream = [
+        self.reservoir_index[reservoir_id]
+        for reservoir_id in self.graph.upstream_ids("pump", schedule.pump_id)
+        if reservoir_id in self.reservoir_index
+      ]
+      for r in upstream:
+        draw_share[s, r] = 1 / len(upstream)
+    step_hours = self.step_minutes / 60
+    return NetworkArrays(
+      steps=self.steps,
+      steps_per_hour=60 // self.step_minutes,
+      step_hours=step_hours,
+      population=np.array([zone.population_served for zone in self.zones], dtype=np.float64),
+      demand=np.array([self.hourly_demand_ml.get(zone.id, 0.0) * step_hours for zone in self.zones]),
+      draw_share=draw_share,
+      zone_starts=np.flatnonzero(np.r_[True, zones[1:] != zones[:-1]]) if len(zones) else zones,
+      schedule_zones=np.unique(zones),
+    )
+
+  def schedules(self, scenarios: list[SimulationScenario]) -> list[PumpSchedule]:
+    """Base schedules and every scenario's extra schedules, ordered by zone."""
+    extra = [schedule for scenario in scenarios for schedule in scenario.extra_schedules if self._usable(schedule)]
+    return sorted([*self.base, *extra], key=lambda schedule: self.zone_index[schedule.zone_id])
+
+  def scenario_arrays(self, scenarios: list[SimulationScenario], schedules: list[PumpSchedule]) -> ScenarioArrays:
+    count, total = len(scenarios), len(schedules)
+    start = np.array([self._step(schedule.start_time_utc) for schedule in schedules], dtype=np.int64)
+    end = np.array([self._step(schedule.end_time_utc) for schedule in schedules], dtype=np.int64)
+    rate = np.array([
+      schedule.flow_rate_lps * LPS_TO_ML_PER_HOUR * self.step_minutes / 60 for schedule in schedules
+    ])
+    arrays = ScenarioArrays(
+      start=np.tile(start, (count, 1)),
+      end=np.tile(end, (count, 1)),
+      rate=np.zeros((count, total)),
+      level=np.tile([reservoir.current_level_ml for reservoir in self.reservoirs], (count, 1)).astype(np.float64),
+      inflow=np.zeros((count, len(self.reservoirs))),
+      demand_multiplier=np.array([scenario.demand_multiplier for scenario in scenarios], dtype=np.float64),
+    )
+    pump_ids = np.array([schedule.pump_id for schedule in schedules], dtype=object)
+    schedule_ids = np.array([schedule.id for schedule in schedules], dtype=object)
+    # Extra schedules belong to the scenario that listed them.
+    owner = np.full(total, -1)
+    position = {id(schedule): s for s, schedule in enumerate(schedules)}
+    for k, scenario in enumerate(scenarios):
+      for schedule in scenario.extra_schedules:
+        if id(schedule) in position:
+          owner[position[id(schedule)]] = k
+    for k, scenario in enumerate(scenarios):
+      keep = (
+        ((owner == -1) | (owner == k))
+        & ~np.isin(pump_ids, scenario.pumps_offline)
+        & ~np.isin(schedule_ids, scenario.excluded_schedule_ids)
+      )
+      arrays.rate[k] = np.where(keep, rate, 0.0)
+      for zone_id, hours in scenario.zone_supply_cut_hours.items():
+        self._cut(arrays, k, schedules, zone_id, round(hours * 60 / self.step_minutes))
+      for reservoir_id, level in scenario.reservoir_levels_ml.items():
+        if reservoir_id in self.reservoir_index:
+          arrays.level[k, self.reservoir_index[reservoir_id]] = level
+      for reservoir_id, inflow in scenario.reservoir_inflow_ml_per_hour.items():
+        if reservoir_id in self.reservoir_index:
+          arrays.inflow[k, self.reservoir_index[reservoir_id]] = inflow * self.step_minutes / 60
+    return arrays
+
+  def _cut(self, arrays: ScenarioArrays, k: int, schedules: list[PumpSchedule], zone_id: str, steps: int) -> None:
+    """Shorten a zone's runs from the end of its latest ones."""
+    runs = [
+      s for s, schedule in enumerate(schedules)
+      if schedule.zone_id == zone_id and arrays.rate[k, s] > 0 and arrays.end[k, s] > arrays.start[k, s]
+    ]
+    for s in sorted(runs, key=lambda s: arrays.end[k, s], reverse=True):
+      if steps <= 0:
+        return
+      length = int(min(arrays.end[k, s], self.steps) - arrays.start[k, s])
+      removed = min(max(length, 0), steps)
+      arrays.end[k, s] = min(arrays.end[k, s], self.steps) - removed
+      steps -= removed
+
+  def results(
+    self,
+    scenarios: list[SimulationScenario],
+    network: NetworkArrays,
+    chunk: ChunkResult,
+  ) -> list[ScenarioResult]:
+    supply_hours = chunk.supplied_steps * network.step_hours
+    connected = np.array([bool(self.graph.upstream_ids("zone", zone.id)) for zone in self.zones])
+    per_capita = np.where(network.population > 0, chunk.delivered * 1e6 / np.maximum(network.population, 1), 0.0)
+    weights = np.broadcast_to(network.population, per_capita.shape)
+    equity = 1 - weighted_gini(per_capita.T, weights.T)
+    results = []
+    for k, scenario in enumerate(scenarios):
+      hours = supply_hours[k][connected] if connected.any() else supply_hours[k]
+      results.append(ScenarioResult(
+        name=scenario.name,
+        min_supply_hours=round(float(hours.min()) if len(hours) else 0.0, 2),
+        average_supply_hours=round(float(hours.mean()) if len(hours) else 0.0, 2),
+        fairness_score=round(float(equity[k]), 3),
+        delivered_ml=round(float(chunk.delivered[k].sum()), 3),
+        unmet_demand_ml=round(float(chunk.unmet[k].sum()), 3),
+        zone_supply_hours={zone.id: round(float(supply_hours[k, z]), 2) for z, zone in enumerate(self.zones)},
+        reservoirs=[
+          ReservoirProjection(
+            reservoir_id=reservoir.id,
+            start_time=self.start_time,
+            step_hours=1.0,
+            levels_ml=[round(level, 3) for level in chunk.levels[k, r].tolist()],
+            min_level_ml=round(float(max(chunk.levels[k, r].min(), 0.0)), 3),
+            hours_until_empty=(
+              round(float(chunk.empty_step[k, r]) * network.step_hours, 2) if chunk.empty_step[k, r] >= 0 else None
+            ),
+          )
+          for r, reservoir in enumerate(self.reservoirs)
+        ],
+      ))
+    return results
+
+
+def _merge(chunks: list[ChunkResult]) -> ChunkResult:
+  return ChunkResult(*(np.concatenate([getattr(chunk, name) for chunk in chunks]) for name in ChunkResult.__dataclass_fields__))
+
+
+class ScenarioSimulator:
+  def __init__(self, settings: Settings) -> None:
+    self.settings = settings
+    self._pool: ProcessPoolExecutor | None = None
+
+  @property
+  def workers(self) -> int:
+    return self.settings.simulation_workers or os.cpu_count() or 1
+
+  def _executor(self) -> Executor:
+    if self._pool is None:
+      self._pool = ProcessPoolExecutor(max_workers=self.workers)
+    return self._pool
+
+  def shutdown(self) -> None:
+    if self._pool is not None:
+      self._pool.shutdown(cancel_futures=True)
+      self._pool = None
+
+  def builder(self, request: SimulationRequest) -> ScenarioBuilder:
+    now = datetime.now(timezone.utc)
+    start_time = request.start_time or now.replace(minute=0, second=0, microsecond=0)
+    if start_time.tzinfo is None:
+      start_time = start_time.replace(tzinfo=timezone.utc)
+    zones = mock_store.list_zones()
+    return ScenarioBuilder(
+      zones,
+      mock_store.list_pump_stations(),
+      mock_store.list_reservoirs(),
+      mock_store.query_pump_schedules(start_time, start_time + timedelta(hours=request.hours)),
+      forecast_hourly_demand(zones, self.settings),
+      network_graph,
+      start_time,
+      request.hours,
+      request.step_minutes,
+    )
+
+  async def run(self, request: SimulationRequest) -> SimulationBatchResult:
+    started = time.perf_counter()
+    builder = self.builder(request)
+    schedules = builder.schedules(request.scenarios)
+    network = builder.network(schedules)
+    arrays = builder.scenario_arrays(request.scenarios, schedules)
+    size = max(-(-len(request.scenarios) // self.workers), self.settings.simulation_min_chunk_scenarios)
+    chunks = [_slice(arrays, lo, lo + size) for lo in range(0, len(request.scenarios), size)]
+    if len(chunks) == 1:
+      merged = await asyncio.to_thread(simulate_chunk, network, chunks[0])
+    else:
+      loop = asyncio.get_running_loop()
+      executor = self._executor()
+      merged = _merge(await asyncio.gather(*(
+        loop.run_in_executor(executor, simulate_chunk, network, chunk) for chunk in chunks
+      )))
+    return SimulationBatchResult(
+      start_time=builder.start_time,
+      hours=request.hours,
+      step_minutes=request.step_minutes,
+      scenarios=builder.results(request.scenarios, network, merged),
+      elapsed_seconds=round(time.perf_counter() - started, 3),
+    )
+
+
+def _slice(arrays: ScenarioArrays, lo: int, hi: int) -> ScenarioArrays:
+  return ScenarioArrays(*(getattr(arrays, name)[lo:hi] for name in ScenarioArrays.__dataclass_fields__))
+
+
+scenario_simulator = ScenarioSimulator(get_settings())
@@ -0,0 +1,187 @@
+"""Replicates store writes across uvicorn workers over pub/sub channels.
+
+Telemetry is a replicated log: the ingest endpoint publishes each validated
+batch on `telemetry_channel` and every worker, including the one that took
+the upload, applies it when the message arrives, so all stores see the same
+rows in the same order and reject the same late ones. The uploading worker
+waits for its own copy to be applied and reports that outcome. Incidents
+derived from that log (sensor anomalies) are therefore applied on every
+worker and never published. Other incident, schedule, pump station and
+reservoir writes are applied locally, published from the store's write hook
+and upserted, or for removed schedules deleted, by id on other workers.
+Every worker relays incident and schedule events to its own realtime
+subscribers of the event's zone.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Sequence
+
+from pydantic import BaseModel
+
+from app.core.config import Settings, get_settings
+from app.data import mock_store
+from app.data.telemetry_store import TelemetryStore, telemetry_store
+from app.schemas.water import IncidentReport, PumpSchedule, PumpStation, ReservoirStatus, TelemetryIngestResult
+from app.services import telemetry_ingest
+from app.services.broadcaster import Broadcaster, telemetry_broadcaster, telemetry_delta_broadcaster
+from app.services.pubsub import PubSub, create_pubsub
+
+logger = logging.getLogger(__name__)
+
+# Set while applying a write that came from another worker, so it is not published again.
+_applying_remote: ContextVar[bool] = ContextVar("applying_remote", default=False)
+
+# Store write kind -> realtime message type subscribers filter on.
+EVENT_TOPICS = {"incident": "incidents", "schedule": "schedules", "schedule_removed": "schedules"}
+
+# Telemetry messages start with a batch id, so the uploading worker can match its own.
+BATCH_ID_BYTES = 16
+
+
+class StoreSync:
+  def __init__(
+    self,
+    pubsub: PubSub,
+    settings: Settings,
+    store: TelemetryStore = telemetry_store,
+    broadcasters: Sequence[Broadcaster] = (telemetry_broadcaster, telemetry_delta_broadcaster),
+  ) -> None:
+    self.pubsub = pubsub
+    self.store = store
+    self.broadcasters = broadcasters
+    # Marks this worker's own writes, which come back on the channel too.
+    self.worker_id = uuid.uuid4().hex
+    self.channels = {
+      "incident": settings.incident_channel,
+      "schedule": settings.schedule_channel,
+      "schedule_removed": settings.schedule_channel,
+      "station": settings.network_channel,
+      "reservoir": settings.network_channel,
+    }
+    self.telemetry_channel = settings.telemetry_channel
+    self.apply_timeout_seconds = settings.telemetry_apply_timeout_seconds
+    self.started = False
+    self._pending: dict[bytes, asyncio.Future[TelemetryIngestResult]] = {}
+    self._outbox: asyncio.Queue[tuple[str, bytes]] | None = None
+    self._publisher: asyncio.Task[None] | None = None
+
+  async def start(self) -> None:
+    await self.pubsub.subscribe(self.telemetry_channel, self._on_telemetry)
+    for channel in set(self.channels.values()):
+      await self.pubsub.subscribe(channel, self._on_event)
+    await self.pubsub.start()
+    self._outbox = asyncio.Queue()
+    self._publisher = asyncio.create_task(self._drain())
+    mock_store.add_listener(self._on_store_write)
+    self.started = True
+
+  async def stop(self) -> None:
+    mock_store.remove_listener(self._on_store_write)
+    if self._publisher is not None:
+      self._publisher.cancel()
+    await self.pubsub.close()
+    self.started = False
+
+  async def publish_telemetry(self, batch: telemetry_ingest.TelemetryBatch) -> TelemetryIngestResult:
+    """Hand a validated batch to every worker and return what this one stored.
+
+    Applied locally when not started. Raises TimeoutError when the batch does
+    not come back within `telemetry_apply_timeout_seconds`.
+    """
+    if not len(batch) or not self.started:
+      return telemetry_ingest.apply(batch, self.store)
+    batch_id = uuid.uuid4().bytes
+    applied = self._pending[batch_id] = asyncio.get_running_loop().create_future()
+    try:
+      await self.pubsub.publish(self.telemetry_channel, batch_id + telemetry_ingest.encode_batch(batch))
+      return await asyncio.wait_for(applied, self.apply_timeout_seconds)
+    finally:
+      self._pending.pop(batch_id, None)
+
+  async def _on_telemetry(self, message: bytes) -> None:
+    applied = self._pending.get(message[:BATCH_ID_BYTES])
+    try:
+      result = telemetry_ingest.apply(telemetry_ingest.decode_binary(message[BATCH_ID_BYTES:]), self.store)
+    except Exception as exc:
+      if applied is not None and not applied.done():
+        applied.set_exception(exc)
+      raise
+    if applied is not None and not applied.done():
+      applied.set_result(result)
+
+  def _on_store_write(self, kind: str, item: BaseModel) -> None:
+    channel = self.channels.get(kind)
+    if channel is None or _applying_remote.get() or self._outbox is None:
+      return
+    envelope = {
+      "origin": self.worker_id,
+      "kind": kind,
+      "sent_at": time.time(),
+      "data": item.model_dump(mode="json"),
+    }
+    self._outbox.put_nowait((channel, json.dumps(envelope).encode()))
+
+  async def _drain(self) -> None:
+    while True:
+      channel, message = await self._outbox.get()
+      try:
+        await self.pubsub.publish(channel, message)
+      except Exception:
+        logger.exception("Failed to publish store write on %s", channel)
+
+  async def _on_event(self, message: bytes) -> None:
+    envelope = json.loads(message)
+    kind = envelope["kind"]
+    if envelope["origin"] != self.worker_id:
+      token = _applying_remote.set(True)
+      try:
+        if kind == "incident":
+          mock_store.apply_incident(IncidentReport.model_validate(envelope["data"]))
+        elif kind == "schedule":
+          mock_store.apply_pump_schedule(PumpSchedule.model_validate(envelope["data"]))
+        elif kind == "schedule_removed":
+          mock_store.remove_pump_schedule(envelope["data"]["id"])
+        elif kind == "station":
+          mock_store.apply_pump_station(PumpStation.model_validate(envelope["data"]))
+        elif kind == "reservoir":
+          mock_store.apply_reservoir(ReservoirStatus.model_validate(envelope["data"]))
+      finally:
+        _applying_remote.reset(token)
+    if kind in EVENT_TOPICS:
+      self._relay(kind, envelope["data"], envelope["sent_at"])
+
+  def apply_derived_incidents(self, incidents: Sequence[IncidentReport]) -> None:
+    """Record incidents derived from the replicated telemetry log.
+
+    Every worker derives the same incidents from the same log, so they are
+    applied and relayed locally without being published again.
+    """
+    token = _applying_remote.set(True)
+    try:
+      for incident in incidents:
+        mock_store.apply_incident(incident)
+    finally:
+      _applying_remote.reset(token)
+    sent_at = time.time()
+    for incident in incidents:
+      self._relay("incident", incident.model_dump(mode="json"), sent_at)
+
+  def _relay(self, kind: str, data: dict, sent_at: float) -> None:
+    frame = json.dumps({
+      "type": f"{kind}_event",
+      "timestamp": datetime.now(timezone.utc).isoformat(),
+      "sent_at": sent_at,
+      "data": data,
+    })
+    for broadcaster in self.broadcasters:
+      broadcaster.publish_event(EVENT_TOPICS[kind], data.get("zone_id"), frame)
+
+
+store_sync = StoreSync(create_pubsub(get_settings()), get_settings())
@@ -0,0 +1,152 @@
+"""Telemetry history queries that pick the cheapest adequate resolution.
+
+Requests name a `resolution` (e.g. "raw", "15m", "1h") and/or a `max_points`
+budget. The coarsest rollup tier no wider than the requested resolution is
+used, and coarser tiers are tried until the result fits the point budget, so
+long time ranges are answered from a bounded number of pre-aggregated rows.
+"""
+from __future__ import annotations
+
+import re
+from datetime import datetime
+
+import numpy as np
+
+from app.data.telemetry_rollups import ROLLUP_METRICS, RollupTier
+from app.data.telemetry_store import FLOAT_DECIMALS, TelemetryStore, from_epoch, to_epoch
+from app.schemas.water import MetricRollup, TelemetryRollupPoint, TelemetrySnapshot
+
+_RESOLUTION_PATTERN = re.compile(r"^(\d+)([smhd])$")
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3_600, "d": 86_400}
+
+
+def parse_resolution(value: str) -> int:
+  """Seconds for a resolution such as "15m" or "1d"; "raw" is 0."""
+  value = value.strip().lower()
+  if value == "raw":
+    return 0
+  match = _RESOLUTION_PATTERN.match(value)
+  if match is None or int(match.group(1)) == 0:
+    raise ValueError(f"Invalid resolution {value!r}; use 'raw' or a duration such as 30s, 15m, 1h, 1d")
+  return int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+
+def select_tier(
+  store: TelemetryStore,
+  since: int | None,
+  until: int | None,
+  zone_id: str | None,
+  resolution_seconds: int | None,
+  max_points: int | None,
+) -> RollupTier | None:
+  """Rollup tier to answer from, or None for raw readings."""
+  tiers: list[RollupTier | None] = [None, *(store.rollups.tiers if store.rollups else [])]
+  start = 0
+  if resolution_seconds is not None:
+    start = max(i for i, tier in enumerate(tiers) if _width(tier) <= resolution_seconds)
+  if max_points is None:
+    return tiers[start]
+  for tier in tiers[start:]:
+    if _point_count(store, tier, since, until, zone_id, max_points) <= max_points:
+      return tier
+  return tiers[-1]
+
+
+def _width(tier: RollupTier | None) -> int:
+  return 0 if tier is None else tier.width_seconds
+
+
+def _point_count(
+  store: TelemetryStore,
+  tier: RollupTier | None,
+  since: int | None,
+  until: int | None,
+  zone_id: str | None,
+  max_points: int,
+) -> int:
+  if tier is None:
+    lo = store.search_timestamp(since) if since is not None else None
+    hi = store.search_timestamp(until) if until is not None else None
+    frame = store.window_seqs(lo, hi)
+  else:
+    frame = tier.window(since, until)
+  total = len(frame["zone"])
+  if zone_id is None or total <= max_points:
+    return total
+  if tier is not None and since is not None and until is not None:
+    # One row per bucket per zone bounds the answer without scanning.
+    buckets = -(-(until - since) // tier.width_seconds) + 1
+    if buckets <= max_points:
+      return buckets
+  code = store.zone_code(zone_id)
+  return 0 if code is None else int(np.count_nonzero(frame["zone"] == code))
+
+
+def query_history(
+  store: TelemetryStore,
+  since: datetime | None = None,
+  until: datetime | None = None,
+  zone_id: str | None = None,
+  resolution: str | None = None,
+  max_points: int | None = None,
+  limit: int = 500,
+) -> list[TelemetrySnapshot] | list[TelemetryRollupPoint]:
+  since_epoch = to_epoch(since) if since is not None else None
+  until_epoch = to_epoch(until) if until is not None else None
+  resolution_seconds = parse_resolution(resolution) if resolution is not None else None
+  if max_points is not None:
+    limit = max_points
+
+  tier = select_tier(store, since_epoch, until_epoch, zone_id, resolution_seconds, max_points)
+  if tier is None:
+    return store.to_snapshots(store.query(since=since, until=until, zone_id=zone_id, limit=limit))
+  return rollup_points(store, tier, tier.window(since_epoch, until_epoch), zone_id, limit)
+
+
+def _rounded(values: np.ndarray) -> list[float]:
+  # Raw readings are float32, so their sums carry its representation error; round like snapshots.
+  return np.round(values, FLOAT_DECIMALS).tolist()
+
+
+def rollup_points(
+  store: TelemetryStore,
+  tier: RollupTier,
+  columns: dict[str, np.ndarray],
+  zone_id: str | None,
+  limit: int,
+) -> list[TelemetryRollupPoint]:
+  if zone_id is not None:
+    code = store.zone_code(zone_id)
+    rows = np.flatnonzero(columns["zone"] == code) if code is not None else np.empty(0, dtype=np.intp)
+    columns = {name: values[rows] for name, values in columns.items()}
+  columns = {name: values[-limit:] for name, values in columns.items()}
+
+  counts = columns["count"]
+  stats = {
+    metric: zip(
+      _rounded(columns[f"{metric}_min"]),
+      _rounded(columns[f"{metric}_max"]),
+      _rounded(columns[f"{metric}_sum"] / np.maximum(counts, 1)),
+      _rounded(columns[f"{metric}_sum"]),
+    )
+    for metric in ROLLUP_METRICS
+  }
+  return [
+    TelemetryRollupPoint(
+      timestamp=from_epoch(bucket),
+      zone_id=store.zone_id(zone),
+      resolution_seconds=tier.width_seconds,
+      count=count,
+      flow_ml=MetricRollup(min=flow[0], max=flow[1], mean=flow[2], sum=flow[3]),
+      pressure_psi=MetricRollup(min=pressure[0], max=pressure[1], mean=pressure[2], sum=pressure[3]),
+      energy_kw=MetricRollup(min=energy[0], max=energy[1], mean=energy[2], sum=energy[3]),
+    )
+    for bucket, zone, count, flow, pressure, energy in zip(
+      columns["bucket"].tolist(),
+      columns["zone"].tolist(),
+      counts.tolist(),
+      stats["flow_ml"],
+      stats["pressure_psi"],
+      stats["energy_kw"],
+    )
+  ]
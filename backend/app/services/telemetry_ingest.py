@@ -0,0 +1,286 @@
+"""Bulk telemetry ingest for field gateway uploads.
+
+Batches arrive as NDJSON (one `TelemetrySnapshot`-shaped object per line) or
+as packed binary records (`BINARY_RECORD`). Either way they are decoded into
+column arrays, validated in one vectorized pass and written to the telemetry
+store at once; no per-row pydantic objects are built.
+
+Ordering is checked when a batch is applied, against the store as it is
+then: each zone's readings must not go back before its newest one, and no
+reading may predate the store's `earliest_timestamp`. One gateway's fresh
+reading therefore does not turn away another's buffered upload.
+"""
+from __future__ import annotations
+
+import json
+import math
+from collections.abc import Collection
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from app.data.telemetry_store import TelemetryStore, to_epoch
+from app.schemas.water import TelemetryIngestResult
+
+NDJSON_MEDIA_TYPES = frozenset({"application/x-ndjson", "application/ndjson", "application/jsonl"})
+BINARY_MEDIA_TYPE = "application/vnd.fwdms.telemetry+binary"
+
+# Little-endian, 56 bytes per reading. An empty zone_id marks a citywide reading.
+BINARY_RECORD = np.dtype([
+  ("timestamp", "<i8"),
+  ("flow_ml", "<f4"),
+  ("pressure_psi", "<f4"),
+  ("energy_kw", "<f4"),
+  ("incidents_today", "<i4"),
+  ("zone_id", "S32"),
+])
+
+INVALID_TIMESTAMP = -1
+MAX_TIMESTAMP = 253_402_300_799  # 9999-12-31T23:59:59Z
+
+
+class UnsupportedMediaType(ValueError):
+  pass
+
+
+@dataclass
+class TelemetryBatch:
+  timestamp: np.ndarray
+  zone_id: np.ndarray
+  flow_ml: np.ndarray
+  pressure_psi: np.ndarray
+  energy_kw: np.ndarray
+  incidents_today: np.ndarray
+  malformed: int = 0
+
+  def __len__(self) -> int:
+    return len(self.timestamp)
+
+
+def decode(body: bytes, media_type: str) -> TelemetryBatch:
+  if media_type in NDJSON_MEDIA_TYPES:
+    return decode_ndjson(body)
+  if media_type == BINARY_MEDIA_TYPE:
+    return decode_binary(body)
+  raise UnsupportedMediaType(f"Unsupported telemetry batch media type: {media_type or 'none'}")
+
+
+def decode_binary(body: bytes) -> TelemetryBatch:
+  if len(body) % BINARY_RECORD.itemsize:
+    raise ValueError(f"Binary batch length must be a multiple of {BINARY_RECORD.itemsize} bytes")
+  records = np.frombuffer(body, dtype=BINARY_RECORD)
+  return TelemetryBatch(
+    timestamp=records["timestamp"].astype(np.int64),
+    zone_id=records["zone_id"],
+    flow_ml=records["flow_ml"].astype(np.float64),
+    pressure_psi=records["pressure_psi"].astype(np.float64),
+    energy_kw=records["energy_kw"].astype(np.float64),
+    incidents_today=records["incidents_today"].astype(np.float64),
+  )
+
+
+def encode_binary(rows: list[dict[str, object]]) -> bytes:
+  """Pack `TelemetrySnapshot`-shaped dicts into the binary batch format."""
+  records = np.zeros(len(rows), dtype=BINARY_RECORD)
+  for record, row in zip(records, rows):
+    record["timestamp"] = _epoch(row["timestamp"])
+    record["flow_ml"] = row["flow_ml"]
+    record["pressure_psi"] = row["pressure_psi"]
+    record["energy_kw"] = row["energy_kw"]
+    record["incidents_today"] = row["incidents_today"]
+    record["zone_id"] = (row.get("zone_id") or "").encode()
+  return records.tobytes()
+
+
+def decode_ndjson(body: bytes) -> TelemetryBatch:
+  rows: list[dict[str, object]] = []
+  malformed = 0
+  for line in body.splitlines():
+    if not line.strip():
+      continue
+    try:
+      row = json.loads(line)
+    except ValueError:
+      malformed += 1
+      continue
+    if isinstance(row, dict):
+      rows.append(row)
+    else:
+      malformed += 1
+  return TelemetryBatch(
+    timestamp=np.fromiter((_epoch(row.get("timestamp")) for row in rows), dtype=np.int64, count=len(rows)),
+    zone_id=np.array([(row.get("zone_id") or "").encode() for row in rows], dtype="S32"),
+    flow_ml=_float_column([row.get("flow_ml") for row in rows]),
+    pressure_psi=_float_column([row.get("pressure_psi") for row in rows]),
+    energy_kw=_float_column([row.get("energy_kw") for row in rows]),
+    incidents_today=_float_column([row.get("incidents_today") for row in rows]),
+    malformed=malformed,
+  )
+
+
+def _epoch(value: object) -> int:
+  if isinstance(value, bool):
+    return INVALID_TIMESTAMP
+  if isinstance(value, float):
+    value = int(value) if math.isfinite(value) else INVALID_TIMESTAMP
+  if isinstance(value, int):
+    return value if 0 < value <= MAX_TIMESTAMP else INVALID_TIMESTAMP
+  if isinstance(value, datetime):
+    return to_epoch(value)
+  if isinstance(value, str):
+    try:
+      return to_epoch(datetime.fromisoformat(value))
+    except ValueError:
+      return INVALID_TIMESTAMP
+  return INVALID_TIMESTAMP
+
+
+def _float_column(values: list[object]) -> np.ndarray:
+  try:
+    return np.array(values, dtype=np.float64)
+  except (TypeError, ValueError):
+    # Rare path: at least one value is not numeric; mark only those rows invalid.
+    return np.array([_to_float(value) for value in values], dtype=np.float64)
+
+
+def _to_float(value: object) -> float:
+  if isinstance(value, bool):
+    return np.nan
+  try:
+    return float(value)  # type: ignore[arg-type]
+  except (TypeError, ValueError):
+    return np.nan
+
+
+def validate(
+  batch: TelemetryBatch,
+  known_zones: Collection[str] | None = None,
+) -> tuple[TelemetryBatch, TelemetryIngestResult]:
+  """Check the content of `batch` column-wise; returns the accepted rows in timestamp order."""
+
+  order = np.argsort(batch.timestamp, kind="stable")
+  timestamp = batch.timestamp[order]
+  zone_id = batch.zone_id[order]
+  metrics = np.stack([batch.flow_ml[order], batch.pressure_psi[order], batch.energy_kw[order]])
+  incidents = batch.incidents_today[order]
+
+  checks: list[tuple[str, np.ndarray]] = [
+    ("invalid_timestamp", (timestamp <= 0) | (timestamp > MAX_TIMESTAMP)),
+    ("invalid_value", ~(np.isfinite(metrics) & (metrics >= 0)).all(axis=0)),
+    ("invalid_incident_count", ~(np.isfinite(incidents) & (incidents >= 0) & (incidents == np.floor(incidents)))),
+  ]
+  if known_zones is not None:
+    unique_zones, zone_index = np.unique(zone_id, return_inverse=True)
+    unknown = np.array([
+      bool(raw) and raw.decode(errors="replace") not in known_zones for raw in unique_zones.tolist()
+    ], dtype=bool)
+    checks.append(("unknown_zone", unknown[zone_index]))
+
+  rejected, reasons = _first_failures(len(timestamp), checks)
+  if batch.malformed:
+    reasons = {"malformed": batch.malformed, **reasons}
+  accepted = ~rejected
+  result = TelemetryIngestResult(
+    accepted=int(accepted.sum()),
+    rejected=int(rejected.sum()) + batch.malformed,
+    rejection_reasons=reasons,
+  )
+  return select(batch, order[accepted]), result
+
+
+def _first_failures(size: int, checks: list[tuple[str, np.ndarray]]) -> tuple[np.ndarray, dict[str, int]]:
+  """Rows failing any check, counted once under the first check each fails."""
+  reasons: dict[str, int] = {}
+  rejected = np.zeros(size, dtype=bool)
+  for reason, failed in checks:
+    newly = failed & ~rejected
+    count = int(newly.sum())
+    if count:
+      reasons[reason] = count
+      rejected |= newly
+  return rejected, reasons
+
+
+def select(batch: TelemetryBatch, rows: np.ndarray) -> TelemetryBatch:
+  return TelemetryBatch(
+    timestamp=batch.timestamp[rows],
+    zone_id=batch.zone_id[rows],
+    flow_ml=batch.flow_ml[rows],
+    pressure_psi=batch.pressure_psi[rows],
+    energy_kw=batch.energy_kw[rows],
+    incidents_today=batch.incidents_today[rows],
+  )
+
+
+def encode_batch(batch: TelemetryBatch) -> bytes:
+  """Pack a decoded batch back into the binary wire format."""
+  records = np.empty(len(batch), dtype=BINARY_RECORD)
+  for name in BINARY_RECORD.names:
+    records[name] = getattr(batch, name)
+  return records.tobytes()
+
+
+def apply(batch: TelemetryBatch, store: TelemetryStore) -> TelemetryIngestResult:
+  """Write an already validated, time-ordered batch to `store`.
+
+  Rows the store can no longer take in order are rejected here: `too_late`
+  before its `earliest_timestamp`, `out_of_order` before their zone's newest
+  reading. Returns what was stored.
+  """
+  if not len(batch):
+    return TelemetryIngestResult(accepted=0, rejected=0)
+  unique_zones, zone_index = np.unique(batch.zone_id, return_inverse=True)
+  zone_ids = [raw.decode(errors="replace") or None for raw in unique_zones.tolist()]
+  codes = [store.zone_code(zone_id) for zone_id in zone_ids]
+  seen = np.array([code is not None for code in codes], dtype=bool)
+  latest = np.full(len(codes), -1, dtype=np.int64)
+  latest[seen] = store.latest_timestamps(np.array([code for code in codes if code is not None], dtype=np.int64))
+  checks = [("out_of_order", batch.timestamp < latest[zone_index])]
+  earliest = store.earliest_timestamp
+  if earliest is not None:
+    checks.insert(0, ("too_late", batch.timestamp < earliest))
+  rejected, reasons = _first_failures(len(batch), checks)
+  result = TelemetryIngestResult(
+    accepted=len(batch) - int(rejected.sum()),
+    rejected=int(rejected.sum()),
+    rejection_reasons=reasons,
+  )
+  if rejected.any():
+    batch, zone_index = select(batch, np.flatnonzero(~rejected)), zone_index[~rejected]
+  if not len(batch):
+    return result
+  zone_codes = np.zeros(len(zone_ids), dtype=np.int32)
+  for index in np.unique(zone_index).tolist():
+    zone_codes[index] = store.intern_zone(zone_ids[index])
+  store.extend_columns({
+    "timestamp": batch.timestamp,
+    "zone": zone_codes[zone_index],
+    "flow_ml": batch.flow_ml.astype(np.float32),
+    "pressure_psi": batch.pressure_psi.astype(np.float32),
+    "energy_kw": batch.energy_kw.astype(np.float32),
+    "incidents_today": batch.incidents_today.astype(np.int32),
+  })
+  return result
+
+
+def settle(checked: TelemetryIngestResult, applied: TelemetryIngestResult) -> TelemetryIngestResult:
+  """Summary of an upload: the rows `apply` stored, and every row rejected on the way."""
+  reasons = dict(checked.rejection_reasons)
+  for reason, count in applied.rejection_reasons.items():
+    reasons[reason] = reasons.get(reason, 0) + count
+  return TelemetryIngestResult(
+    accepted=applied.accepted,
+    rejected=checked.rejected + applied.rejected,
+    rejection_reasons=reasons,
+  )
+
+
+def ingest(
+  batch: TelemetryBatch,
+  store: TelemetryStore,
+  known_zones: Collection[str] | None = None,
+) -> TelemetryIngestResult:
+  """Validate `batch` and write the accepted rows to `store` in one write."""
+  accepted, checked = validate(batch, known_zones)
+  return settle(checked, apply(accepted, store))
@@ -0,0 +1,56 @@
+"""Startup restore and periodic compaction of durable telemetry segments."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from app.core.config import Settings, get_settings
+from app.data.telemetry_segments import DAY_SECONDS, SegmentLog
+from app.data.telemetry_store import TelemetryStore, telemetry_store
+
+logger = logging.getLogger(__name__)
+
+
+class TelemetryPersistence:
+  def __init__(self, store: TelemetryStore, settings: Settings) -> None:
+    self.store = store
+    self.settings = settings
+    self.log: SegmentLog | None = None
+    self._compactor: asyncio.Task[None] | None = None
+
+  def start(self) -> None:
+    """Memory-map the segment log into the store; then compact it in the background."""
+    if not self.settings.telemetry_segment_dir:
+      return
+    self.log = SegmentLog(self.settings.telemetry_segment_dir, self.settings.telemetry_segment_seconds)
+    self.log.open()
+    self.store.attach_archive(self.log)
+    if self.log.writable:
+      self._compactor = asyncio.create_task(self._run())
+
+  def stop(self) -> None:
+    if self._compactor is not None:
+      self._compactor.cancel()
+      self._compactor = None
+    if self.log is not None:
+      self.log.close()
+
+  def compact(self, now: int | None = None) -> int:
+    if self.log is None:
+      return 0
+    now = int(time.time()) if now is None else now
+    return self.log.compact(now, self.settings.telemetry_raw_retention_days * DAY_SECONDS)
+
+  async def _run(self) -> None:
+    while True:
+      await asyncio.sleep(self.settings.telemetry_compaction_interval_seconds)
+      try:
+        removed = self.compact()
+        if removed:
+          logger.info("Compacted %d telemetry segments into the daily rollup tier", removed)
+      except Exception:
+        logger.exception("Telemetry segment compaction failed")
+
+
+telemetry_persistence = TelemetryPersistence(telemetry_store, get_settings())
@@ -0,0 +1,197 @@
+"""Zone listings pre-encoded at several map zoom levels.
+
+Each configured zoom level simplifies zone boundaries with Douglas–Peucker
+at a tolerance of `ZONE_GEOMETRY_TOLERANCE_PX` screen pixels at that zoom,
+on 256 px web-map tiles. Coordinates are rounded to the decimals that
+tolerance still resolves. Closed rings are split at the vertex farthest
+from their first one and simplified as two open lines. Holes that would
+collapse below a triangle are dropped; an outer ring keeps at least one.
+
+The encoded geometry of every level is kept per zone and redone, with the
+simplification, only when its boundary changed. Other zone writes, such as
+fairness refreshes, re-encode just the small non-geometry part and splice
+the cached geometry in. A listing at a level joins the encoded zones and is
+kept until a zone write changes them. Requests pick the
+coarsest level at least as detailed as their zoom. Without a zoom, or above
+the finest level, they get full precision.
+"""
+from __future__ import annotations
+
+import json
+import math
+from typing import Iterable
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.core.config import Settings, get_settings
+from app.data import mock_store
+from app.schemas.water import WaterZone
+
+TILE_PIXELS = 256
+# Level key of the unsimplified geometry.
+FULL = None
+# Stands in for the geometry while the rest of a zone is encoded.
+_GEOMETRY_SLOT = "\0geometry\0"
+
+
+def line_thresholds(points: np.ndarray, floor: float) -> np.ndarray:
+  """Largest tolerance at which Douglas–Peucker keeps each point of an open `[n, 2]` line.
+
+  Splitting stops at `floor`; points dropped there get 0 and both ends get
+  infinity. A point is kept at tolerance `t` exactly when its threshold
+  exceeds `t`, so one pass serves every coarser tolerance.
+  """
+  thresholds = np.zeros(len(points))
+  thresholds[[0, -1]] = np.inf
+  stack = [(0, len(points) - 1, np.inf)]
+  while stack:
+    first, last, parent = stack.pop()
+    if last - first < 2:
+      continue
+    start, end = points[first], points[last]
+    segment = end - start
+    inner = points[first + 1:last] - start
+    length = math.hypot(*segment)
+    if length == 0:
+      distances = np.hypot(inner[:, 0], inner[:, 1])
+    else:
+      distances = np.abs(segment[0] * inner[:, 1] - segment[1] * inner[:, 0]) / length
+    farthest = int(distances.argmax())
+    if distances[farthest] > floor:
+      split = first + 1 + farthest
+      # A point is only reached once its parent split is kept.
+      thresholds[split] = threshold = min(float(distances[farthest]), parent)
+      stack.extend([(first, split, threshold), (split, last, threshold)])
+  return thresholds
+
+
+def ring_thresholds(ring: np.ndarray, floor: float) -> tuple[np.ndarray, np.ndarray]:
+  """Open ring and its vertex thresholds, split at the vertex farthest from the first."""
+  if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+    ring = ring[:-1]
+  if len(ring) < 3:
+    return ring, np.zeros(len(ring))
+  far = int(np.hypot(*(ring - ring[0]).T).argmax())
+  if far == 0:
+    return ring, np.zeros(len(ring))
+  head = line_thresholds(ring[:far + 1], floor)
+  tail = line_thresholds(np.vstack([ring[far:], ring[:1]]), floor)
+  return ring, np.concatenate([head, tail[1:-1]])
+
+
+def _closed(ring: np.ndarray, decimals: int) -> list:
+  return np.round(np.vstack([ring, ring[:1]]), decimals).tolist()
+
+
+def _decimals(tolerance: float) -> int:
+  # Enough decimals that rounding moves a vertex by well under the tolerance.
+  return max(0, math.ceil(-math.log10(tolerance)) + 1)
+
+
+def simplify_polygon(rings: list, tolerances: list[float]) -> list[list | None]:
+  """The polygon's rings at each tolerance; None where the polygon has no rings."""
+  prepared = [ring_thresholds(np.asarray(ring, dtype=np.float64), min(tolerances)) for ring in rings if ring]
+  if not prepared:
+    return [None] * len(tolerances)
+  levels = []
+  for tolerance in tolerances:
+    decimals = _decimals(tolerance)
+    kept = []
+    for index, (ring, thresholds) in enumerate(prepared):
+      mask = thresholds > tolerance
+      if mask.sum() >= 3:
+        kept.append(_closed(ring[mask], decimals))
+      elif index == 0 and len(ring) >= 3:
+        # Smaller than the tolerance: a triangle still marks where the zone is.
+        kept.append(_closed(ring[np.argsort(-thresholds, kind="stable")[:3].tolist()], decimals))
+    levels.append(kept or None)
+  return levels
+
+
+def simplify_geometry(geometry: dict[str, object], tolerances: list[float]) -> list[dict[str, object]]:
+  """GeoJSON Polygon or MultiPolygon simplified to each tolerance in degrees; other geometry as is."""
+  kind, coordinates = geometry.get("type"), geometry.get("coordinates")
+  if kind == "Polygon" and coordinates:
+    return [
+      geometry if polygon is None else {**geometry, "coordinates": polygon}
+      for polygon in simplify_polygon(coordinates, tolerances)
+    ]
+  if kind == "MultiPolygon" and coordinates:
+    parts = [simplify_polygon(polygon, tolerances) for polygon in coordinates if polygon]
+    return [
+      {**geometry, "coordinates": [part[level] for part in parts if part[level] is not None]}
+      for level in range(len(tolerances))
+    ]
+  return [geometry] * len(tolerances)
+
+
+class ZoneGeometryCache:
+  def __init__(self, zoom_levels: Iterable[int], tolerance_px: float) -> None:
+    self.zoom_levels = sorted(set(zoom_levels))
+    self.tolerance_px = tolerance_px
+    self._sources: dict[str, dict[str, object]] = {}
+    self._geometry: dict[str, dict[int | None, bytes]] = {}
+    self._encoded: dict[str, dict[int | None, bytes]] = {}
+    self._listings: dict[int | None, bytes] = {}
+    self.simplified_zones = 0
+
+  @classmethod
+  def from_settings(cls, settings: Settings, zones: Iterable[WaterZone]) -> ZoneGeometryCache:
+    cache = cls(settings.zone_geometry_zoom_levels, settings.zone_geometry_tolerance_px)
+    for zone in zones:
+      cache.set_zone(zone)
+    return cache
+
+  def tolerance(self, zoom: int) -> float:
+    """Degrees of longitude covered by `tolerance_px` pixels at `zoom`."""
+    return self.tolerance_px * 360 / (TILE_PIXELS * 2**zoom)
+
+  def level(self, zoom: int | None) -> int | None:
+    if zoom is None:
+      return FULL
+    return next((level for level in self.zoom_levels if level >= zoom), FULL)
+
+  def on_store_write(self, kind: str, item: BaseModel) -> None:
+    if kind == "zone":
+      self.set_zone(item)
+
+  def set_zone(self, zone: WaterZone) -> None:
+    geometry = zone.geojson.geometry
+    if self._sources.get(zone.id) != geometry:
+      self._sources[zone.id] = geometry
+      simplified = simplify_geometry(geometry, [self.tolerance(level) for level in self.zoom_levels])
+      self._geometry[zone.id] = {
+        level: _dumps(level_geometry)
+        for level, level_geometry in zip([FULL, *self.zoom_levels], [geometry, *simplified])
+      }
+      self.simplified_zones += 1
+    rest = zone.model_dump(mode="json", exclude={"geojson": {"geometry"}})
+    rest["geojson"]["geometry"] = _GEOMETRY_SLOT
+    # The geometry is the last field, so the slot is the last string in the zone.
+    head, _, tail = _dumps(rest).rpartition(_dumps(_GEOMETRY_SLOT))
+    encoded = {level: head + fragment + tail for level, fragment in self._geometry[zone.id].items()}
+    if self._encoded.get(zone.id) != encoded:
+      self._encoded[zone.id] = encoded
+      self._listings.clear()
+
+  def encoded_zones(self, zoom: int | None = None, zone_ids: Iterable[str] | None = None) -> bytes:
+    """JSON array of zones at the level for `zoom`; every zone, cached, when `zone_ids` is None."""
+    level = self.level(zoom)
+    if zone_ids is None:
+      listing = self._listings.get(level)
+      if listing is None:
+        listing = self._listings[level] = self._join(self._encoded, level)
+      return listing
+    return self._join([zone_id for zone_id in zone_ids if zone_id in self._encoded], level)
+
+  def _join(self, zone_ids: Iterable[str], level: int | None) -> bytes:
+    return b"[" + b",".join(self._encoded[zone_id][level] for zone_id in zone_ids) + b"]"
+
+
+def _dumps(value: object) -> bytes:
+  return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+zone_geometry = ZoneGeometryCache.from_settings(get_settings(), mock_store.list_zones())
+mock_store.add_listener(zone_geometry.on_store_write)
@@ -0,0 +1,68 @@
+"""Fan-out benchmark for the telemetry broadcaster.
+
+Compares the shared single-producer broadcaster against the previous design in
+which every connection built and encoded its own payload.
+
+  python -m benchmarks.bench_broadcaster --clients 10000 --ticks 20
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.services.broadcaster import Broadcaster, build_telemetry_frame
+from app.services.connections import ClientConnection
+
+
+class NullSocket:
+  def __init__(self) -> None:
+    self.frames = 0
+    self.bytes_sent = 0
+
+  async def send_text(self, data: str) -> None:
+    self.frames += 1
+    self.bytes_sent += len(data)
+
+
+async def run_broadcaster(clients: int, ticks: int) -> tuple[float, float]:
+  broadcaster = Broadcaster(build_frame=build_telemetry_frame, interval_seconds=3600)
+  connections = [ClientConnection(NullSocket(), 32, "drop_oldest", 120).start() for _ in range(clients)]
+  for connection in connections:
+    broadcaster.hub.register(connection)
+  wall, cpu = time.perf_counter(), time.process_time()
+  for _ in range(ticks):
+    await broadcaster.tick()
+    while any(connection.queued_frames for connection in connections):
+      await asyncio.sleep(0)
+  return time.perf_counter() - wall, time.process_time() - cpu
+
+
+async def run_per_client(clients: int, ticks: int) -> tuple[float, float]:
+  sockets = [NullSocket() for _ in range(clients)]
+  wall, cpu = time.perf_counter(), time.process_time()
+  for _ in range(ticks):
+    await asyncio.gather(*(sock.send_text(build_telemetry_frame()) for sock in sockets))
+  return time.perf_counter() - wall, time.process_time() - cpu
+
+
+def report(label: str, clients: int, ticks: int, wall: float, cpu: float) -> None:
+  print(
+    f"{label:<14} ticks/s={ticks / wall:8.2f}  frames/s={clients * ticks / wall:12,.0f}  "
+    f"cpu/tick={cpu / ticks * 1000:8.2f} ms  cpu/frame={cpu / (clients * ticks) * 1e6:6.2f} us"
+  )
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--clients", type=int, default=10_000)
+  parser.add_argument("--ticks", type=int, default=20)
+  args = parser.parse_args()
+
+  print(f"{args.clients:,} simulated clients, {args.ticks} ticks")
+  report("broadcaster", args.clients, args.ticks, *asyncio.run(run_broadcaster(args.clients, args.ticks)))
+  report("per-client", args.clients, args.ticks, *asyncio.run(run_per_client(args.clients, args.ticks)))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,81 @@
+"""Latency benchmark for per-zone demand forecasting.
+
+Loads weeks of hourly rollups for thousands of zones, then times the initial
+fit, a full all-zone forecast, a cached repeat, and the incremental refresh
+after one more hour of readings arrives.
+
+  python -m benchmarks.bench_demand_forecast --zones 5000 --days 28
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.data.telemetry_rollups import ROLLUP_METRICS, TelemetryRollups
+from app.data.telemetry_store import TelemetryStore
+from app.services.demand_forecast import ALL_ZONES, HOUR, DemandForecaster, hour_of_week
+
+
+def hourly_rows(codes: np.ndarray, start: int, hours: int) -> dict[str, np.ndarray]:
+  rng = np.random.default_rng(5)
+  buckets = np.repeat(start + HOUR * np.arange(hours, dtype=np.int64), len(codes))
+  zones = np.tile(codes, hours)
+  hod = hour_of_week(buckets) % 24
+  flow = 30 + 15 * np.sin((hod - 6) / 24 * 2 * np.pi) + rng.normal(0, 2, len(buckets))
+  rows: dict[str, np.ndarray] = {"bucket": buckets, "zone": zones, "count": np.full(len(buckets), 60)}
+  for metric in ROLLUP_METRICS:
+    values = flow if metric == "flow_ml" else rng.uniform(40, 70, len(buckets))
+    rows[f"{metric}_sum"] = values * 60
+    rows[f"{metric}_min"] = values
+    rows[f"{metric}_max"] = values
+  return rows
+
+
+def timed(label: str, action) -> object:
+  started = time.perf_counter()
+  result = action()
+  print(f"{label:<28} {1_000 * (time.perf_counter() - started):9.1f} ms")
+  return result
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--zones", type=int, default=5_000)
+  parser.add_argument("--days", type=int, default=28)
+  parser.add_argument("--horizon", type=int, default=24)
+  args = parser.parse_args()
+
+  hours = 24 * args.days
+  store = TelemetryStore(
+    capacity=args.zones,
+    rollups=TelemetryRollups({"1m": args.zones, "1h": args.zones * (hours + 2), "1d": args.zones * (args.days + 2)}),
+  )
+  codes = np.array([store.intern_zone(f"zone-{i + 1}") for i in range(args.zones)], dtype=np.int32)
+  start = 1_760_000_000 // HOUR * HOUR
+  store.rollups.tier("1h").load(hourly_rows(codes, start, hours))
+  forecaster = DemandForecaster(store, min_history_hours=24)
+
+  timed(f"fit {args.zones * hours:,} hourly rows", forecaster.refresh)
+  body = timed(f"forecast {args.zones:,} zones", lambda: forecaster.encoded(ALL_ZONES, args.horizon))
+  timed("cached forecast", lambda: forecaster.encoded(ALL_ZONES, args.horizon))
+  timed("single zone", lambda: forecaster.encoded("zone-42", args.horizon))
+
+  # One more hour of per-minute readings closes the last loaded bucket.
+  minutes = 60
+  store.extend_columns({
+    "timestamp": np.repeat(start + hours * HOUR + 60 * np.arange(minutes, dtype=np.int64), args.zones),
+    "zone": np.tile(codes, minutes),
+    "flow_ml": np.full(minutes * args.zones, 30, dtype=np.float32),
+    "pressure_psi": np.full(minutes * args.zones, 55, dtype=np.float32),
+    "energy_kw": np.full(minutes * args.zones, 1_100, dtype=np.float32),
+    "incidents_today": np.zeros(minutes * args.zones, dtype=np.int32),
+  })
+  timed("incremental refresh", forecaster.refresh)
+  timed(f"forecast {args.zones:,} zones", lambda: forecaster.encoded(ALL_ZONES, args.horizon))
+  print(f"{len(body) / 1e6:.1f} MB response, generation {forecaster.generation}")
+
+
+if __name__ == "__main__":
+  main()
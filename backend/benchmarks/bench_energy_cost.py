@@ -0,0 +1,94 @@
+"""Pricing benchmark for the time-of-use energy cost engine.
+
+Loads weeks of hourly and daily rollups for thousands of zones, then times a
+metered cost report over the whole range, costing a large batch of pump
+schedules, and picking the cheapest run window for every pump.
+
+  python -m benchmarks.bench_energy_cost --zones 2000 --days 30 --schedules 100000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.data.telemetry_rollups import TelemetryRollups, coarsen
+from app.data.telemetry_store import TelemetryStore, from_epoch
+from app.schemas.water import PumpSchedule, PumpStation
+from app.services.demand_forecast import HOUR
+from app.services.energy_cost import Tariff, metered_energy, schedule_energy
+from benchmarks.bench_demand_forecast import hourly_rows, timed
+
+
+def make_schedules(count: int, pumps: int, start: int, days: int) -> tuple[list[PumpSchedule], list[PumpStation]]:
+  rng = np.random.default_rng(7)
+  stations = [
+    PumpStation(
+      id=f"pump-{p + 1}",
+      name=f"Pump {p + 1}",
+      connected_zones=[],
+      status="operational",
+      energy_use_kw=float(rng.uniform(100, 500)),
+      health_score=0.9,
+    )
+    for p in range(pumps)
+  ]
+  starts = start + rng.integers(0, days * 24 * HOUR, count)
+  lengths = rng.integers(15 * 60, 6 * HOUR, count)
+  schedules = [
+    PumpSchedule(
+      id=f"run-{i}",
+      pump_id=f"pump-{int(p) + 1}",
+      zone_id="zone-1",
+      start_time_utc=from_epoch(begin),
+      end_time_utc=from_epoch(begin + length),
+      flow_rate_lps=400,
+      status="completed",
+    )
+    for i, (p, begin, length) in enumerate(zip(rng.integers(0, pumps, count).tolist(), starts.tolist(), lengths.tolist()))
+  ]
+  return schedules, stations
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--zones", type=int, default=2_000)
+  parser.add_argument("--days", type=int, default=30)
+  parser.add_argument("--pumps", type=int, default=300)
+  parser.add_argument("--schedules", type=int, default=100_000)
+  args = parser.parse_args()
+
+  hours = 24 * args.days
+  store = TelemetryStore(
+    capacity=args.zones,
+    rollups=TelemetryRollups({"1m": args.zones, "1h": args.zones * hours, "1d": args.zones * (args.days + 1)}),
+  )
+  codes = np.array([store.intern_zone(f"zone-{i + 1}") for i in range(args.zones)], dtype=np.int32)
+  start = 1_760_000_000 // 86_400 * 86_400
+  rows = hourly_rows(codes, start, hours)
+  store.rollups.tier("1d").load(coarsen(rows, 86_400))
+  # Keep only the last week hourly, so older days are priced from the daily tier.
+  recent = rows["bucket"] >= start + (hours - 24 * 7) * HOUR
+  store.rollups.tier("1h").load({name: column[recent] for name, column in rows.items()})
+  tariff = Tariff.from_settings(get_settings())
+
+  until = start + hours * HOUR
+  resolution, energy, cost = timed(
+    f"metered {args.days} days", lambda: metered_energy(store, tariff, start, until),
+  )
+  print(f"  {energy.sum() / 1e6:.1f} GWh, cost {cost.sum() / 1e6:.1f} M, coarsest tier {resolution} s")
+
+  schedules, stations = make_schedules(args.schedules, args.pumps, start, args.days)
+  timed(f"{args.schedules:,} schedules", lambda: schedule_energy(schedules, stations, tariff, start, until))
+  durations = np.random.default_rng(1).uniform(HOUR, 20 * HOUR, args.pumps)
+  timed(f"cheapest window x{args.pumps}", lambda: tariff.cheapest_starts(start, durations))
+  started = datetime(2025, 11, 14, tzinfo=timezone.utc)
+  sample = tariff.cheapest_starts(int(started.timestamp()), np.array([4 * HOUR]))[0]
+  print(f"  4 h run starts {started + timedelta(seconds=float(sample)):%H:%M} UTC")
+
+
+if __name__ == "__main__":
+  main()
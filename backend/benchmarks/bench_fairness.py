@@ -0,0 +1,83 @@
+"""Full-recompute benchmark for the fairness metrics pipeline.
+
+Folds synthetic hourly rollups for every zone and day (one day per batch, as
+the incremental refresh would see them), then scores every day and zone.
+
+  python -m benchmarks.bench_fairness --zones 10000 --days 90
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.data.telemetry_store import TelemetryStore
+from app.schemas.water import GeoJsonPolygon, WaterZone
+from app.services.fairness import DAY_SECONDS, FairnessPipeline
+
+
+def make_zones(store: TelemetryStore, count: int) -> tuple[list[WaterZone], np.ndarray]:
+  rng = np.random.default_rng(9)
+  now = datetime.now(timezone.utc)
+  zones = [
+    WaterZone(
+      id=f"zone-{i + 1}",
+      name=f"Zone {i + 1}",
+      ward_number=i + 1,
+      population_served=int(population),
+      supply_hours_per_day=6,
+      pressure="medium",
+      last_updated=now,
+      fairness_score=0.5,
+      centroid_latitude=21.25,
+      centroid_longitude=81.63,
+      geojson=GeoJsonPolygon(geometry={"type": "Polygon", "coordinates": []}),
+    )
+    for i, population in enumerate(rng.integers(5_000, 60_000, count))
+  ]
+  codes = np.array([store.intern_zone(zone.id) for zone in zones], dtype=np.int32)
+  return zones, codes
+
+
+def day_rows(codes: np.ndarray, population: np.ndarray, day: int, rng: np.random.Generator) -> dict[str, np.ndarray]:
+  hours = 24
+  buckets = np.repeat(day * DAY_SECONDS + 3_600 * np.arange(hours, dtype=np.int64), len(codes))
+  # Each zone is supplied for a few hours a day at a rate scaled to its population.
+  supplied = rng.random(len(buckets)) < np.tile(rng.uniform(0.15, 0.5, len(codes)), hours)
+  flow = np.where(supplied, np.tile(population / 40_000, hours) * rng.uniform(0.8, 1.2, len(buckets)), 0.0)
+  return {"bucket": buckets, "zone": np.tile(codes, hours), "count": np.full(len(buckets), 60), "flow_ml_sum": flow * 60}
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--zones", type=int, default=10_000)
+  parser.add_argument("--days", type=int, default=90)
+  args = parser.parse_args()
+
+  store = TelemetryStore(capacity=1)
+  zones, codes = make_zones(store, args.zones)
+  population = np.array([zone.population_served for zone in zones], dtype=np.float64)
+  rng = np.random.default_rng(1)
+  first_day = 20_300
+  batches = [day_rows(codes, population, first_day + d, rng) for d in range(args.days)]
+  pipeline = FairnessPipeline(store, get_settings().model_copy(update={"fairness_window_days": args.days}))
+
+  started = time.perf_counter()
+  for rows in batches:
+    pipeline.fold(rows)
+  folded = time.perf_counter()
+  days = np.arange(first_day, first_day + args.days)
+  history = list(pipeline.score_days(days, zones).values())
+  scores = pipeline.zone_scores(first_day + args.days, zones)
+  done = time.perf_counter()
+  rows = args.zones * args.days * 24
+  print(f"fold {rows:,} hourly rows  {folded - started:6.2f} s")
+  print(f"score {args.days} days, {len(scores):,} zones  {done - folded:6.2f} s")
+  print(f"total {done - started:6.2f} s; last day equity {history[-1].citywide_score}, underserved {history[-1].underserved_wards}, average hours {history[-1].average_supply_hours}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,72 @@
+"""Citizen report storms against the incident clusterer.
+
+Simulates hours of reports: a steady background of scattered reports across
+the city plus bursts of dozens of reports around the same main break. Each
+report is matched against the cluster hash and, when it starts a new
+incident, added to it. Prints the cost per report and how many incidents the
+reports collapsed into.
+
+  python -m benchmarks.bench_incident_clustering --reports 200000 --per-minute 5000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.schemas.water import IncidentReport
+from app.services.incident_clustering import IncidentClusterer
+
+TYPES = ("leak", "low_pressure", "contamination", "outage")
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--reports", type=int, default=200_000)
+  parser.add_argument("--per-minute", type=int, default=5_000)
+  parser.add_argument("--burst-share", type=float, default=0.7, help="Share of reports that echo a burst")
+  parser.add_argument("--radius-m", type=float, default=150.0)
+  parser.add_argument("--window-minutes", type=float, default=60.0)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(23)
+  n = args.reports
+  epochs = (1_760_000_000 + np.arange(n) * 60 / args.per_minute).astype(np.int64)
+  # Background reports anywhere in a 20 km city; burst reports within ~80 m of one of a few hundred breaks.
+  lat = 21.15 + rng.uniform(0, 0.18, n)
+  lon = 81.55 + rng.uniform(0, 0.19, n)
+  types = rng.integers(len(TYPES), size=n)
+  burst = rng.random(n) < args.burst_share
+  sites = rng.integers(300, size=n)
+  site_lat, site_lon = 21.15 + rng.uniform(0, 0.18, 300), 81.55 + rng.uniform(0, 0.19, 300)
+  lat[burst] = site_lat[sites[burst]] + rng.normal(0, 0.0004, burst.sum())
+  lon[burst] = site_lon[sites[burst]] + rng.normal(0, 0.0004, burst.sum())
+  types[burst] = 0
+  lat, lon, types, epochs = lat.tolist(), lon.tolist(), types.tolist(), epochs.tolist()
+
+  clusterer = IncidentClusterer(args.radius_m, args.window_minutes * 60)
+  opened = 0
+  started = time.perf_counter()
+  for i in range(n):
+    if clusterer.match(TYPES[types[i]], lat[i], lon[i], epochs[i]) is None:
+      opened += 1
+      clusterer.on_store_write("incident", IncidentReport(
+        id=f"citizen-{i}",
+        zone_id="zone-1",
+        reported_by="citizen",
+        type=TYPES[types[i]],
+        severity="moderate",
+        description="",
+        reported_at=datetime.fromtimestamp(epochs[i], tz=timezone.utc),
+        status="open",
+        coordinates=(lat[i], lon[i]),
+      ))
+  elapsed = time.perf_counter() - started
+  print(f"{n:,} reports over {n / args.per_minute:,.0f} minutes: {elapsed / n * 1e6:.2f} us per report")
+  print(f"{opened:,} incidents opened, {n - opened:,} reports merged, {len(clusterer._cell_of):,} still clustered")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,81 @@
+"""Paging through a season of incidents.
+
+Loads hundreds of thousands of incidents into the indexed store, then times
+first pages and deep pages (resumed from a cursor near the oldest incident)
+with and without filters, plus in-place status changes.
+
+  python -m benchmarks.bench_incident_store --incidents 500000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.data.incident_store import IncidentStore
+from app.schemas.water import IncidentReport
+
+SEVERITIES = ("low", "moderate", "critical")
+TYPES = ("leak", "low_pressure", "contamination", "outage", "over_pumping")
+STATUSES = ("open", "acknowledged", "resolved")
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--incidents", type=int, default=500_000)
+  parser.add_argument("--zones", type=int, default=200)
+  parser.add_argument("--limit", type=int, default=100)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(22)
+  start = datetime(2025, 6, 1, tzinfo=timezone.utc)
+  offsets = np.sort(rng.integers(0, 120 * 86_400, args.incidents)).tolist()
+  zones, severities, types, statuses = (rng.integers(n, size=args.incidents).tolist() for n in (args.zones, 3, 5, 3))
+  incidents = [
+    IncidentReport(
+      id=f"incident-{i}",
+      zone_id=f"zone-{zones[i] + 1}",
+      reported_by="sensor",
+      type=TYPES[types[i]],
+      severity=SEVERITIES[severities[i]],
+      description="",
+      reported_at=start + timedelta(seconds=offsets[i]),
+      status=STATUSES[statuses[i]],
+      coordinates=(21.25, 81.63),
+    )
+    for i in range(args.incidents)
+  ]
+  store = IncidentStore()
+  started = time.perf_counter()
+  for incident in incidents:
+    store.put(incident)
+  print(f"{'load':<28} {time.perf_counter() - started:8.2f} s for {len(store):,} incidents")
+
+  cases = {
+    "all": {},
+    "zone": {"zone_id": "zone-7"},
+    "zone + open": {"zone_id": "zone-7", "status": "open"},
+    "critical leaks": {"severity": "critical", "type": "leak"},
+  }
+  for label, filters in cases.items():
+    # Resume from the newest match in the oldest 5% of the history.
+    deep = [incident for incident in incidents[:args.incidents // 20] if all(getattr(incident, k) == v for k, v in filters.items())][-1]
+    deep_cursor = f"{round(deep.reported_at.timestamp() * 1_000_000)}:{deep.id}"
+    for depth, after in (("first page", None), ("deep page", deep_cursor)):
+      started = time.perf_counter()
+      for _ in range(200):
+        page, _ = store.page(args.limit, after, **filters)
+      elapsed = (time.perf_counter() - started) / 200
+      print(f"{label + ', ' + depth:<28} {elapsed * 1e6:8.1f} us for {len(page)} rows")
+
+  ids = [f"incident-{i}" for i in rng.integers(args.incidents, size=10_000).tolist()]
+  started = time.perf_counter()
+  for i, incident_id in enumerate(ids):
+    store.set_status(incident_id, STATUSES[i % 3])
+  print(f"{'status change':<28} {(time.perf_counter() - started) / len(ids) * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,87 @@
+"""Incident event fan-out to filtered wallboards.
+
+Connects thousands of simulated clients, each following a few zones and
+severities, then publishes a burst of incident events. Compares the filter
+group index with testing every event against every client's filter.
+
+  python -m benchmarks.bench_incident_stream --clients 10000 --zones 500 --events 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.schemas.water import IncidentReport
+from app.services.connections import ClientConnection
+from app.services.incident_stream import ALL, SEVERITIES, IncidentStream
+
+
+class NullSocket:
+  async def send_text(self, data: str) -> None:
+    pass
+
+
+async def run(args: argparse.Namespace) -> None:
+  rng = np.random.default_rng(24)
+  stream = IncidentStream()
+  connections = []
+  filters = []
+  for client in range(args.clients):
+    # One in ten is a citywide control-room board; the rest follow a few wards.
+    zones = None if client % 10 == 0 else [f"zone-{z + 1}" for z in rng.integers(args.zones, size=3).tolist()]
+    severities = None if client % 3 else ["critical"]
+    connection = ClientConnection(NullSocket(), args.events + 1, "drop_oldest", 120)
+    stream.subscribe(connection, zones, severities)
+    connections.append(connection)
+    filters.append((set(zones or [ALL]), set(severities or [ALL])))
+
+  now = datetime.now(timezone.utc)
+  incidents = [
+    IncidentReport(
+      id=f"incident-{i}",
+      zone_id=f"zone-{int(rng.integers(args.zones)) + 1}",
+      reported_by="sensor",
+      type="leak",
+      severity=SEVERITIES[int(rng.integers(len(SEVERITIES)))],
+      description="",
+      reported_at=now,
+      status="open",
+      coordinates=(21.25, 81.63),
+    )
+    for i in range(args.events)
+  ]
+
+  started = time.perf_counter()
+  delivered = sum(stream.publish(incident) for incident in incidents)
+  indexed = time.perf_counter() - started
+  print(f"{'filter index':<14} {indexed / args.events * 1e6:8.1f} us per event, {delivered:,} frames queued")
+
+  for connection in connections:
+    connection._queue.clear()
+  started = time.perf_counter()
+  delivered = 0
+  for incident in incidents:
+    frame = incident.model_dump_json()
+    for connection, (zones, severities) in zip(connections, filters):
+      if (ALL in zones or incident.zone_id in zones) and (ALL in severities or incident.severity in severities):
+        delivered += connection.offer(frame)
+  scanned = time.perf_counter() - started
+  print(f"{'scan clients':<14} {scanned / args.events * 1e6:8.1f} us per event, {delivered:,} frames queued")
+  for connection in connections:
+    connection.stop()
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--clients", type=int, default=10_000)
+  parser.add_argument("--zones", type=int, default=500)
+  parser.add_argument("--events", type=int, default=5_000)
+  asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,69 @@
+"""Throughput benchmark for bulk telemetry ingest.
+
+Decodes, validates and appends synthetic gateway batches in both wire formats
+and reports rows per second.
+
+  python -m benchmarks.bench_ingest --rows 100000 --batches 20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from app.data.telemetry_store import TelemetryStore
+from app.services import telemetry_ingest
+
+
+def make_rows(count: int, zones: int, start: int) -> list[dict[str, object]]:
+  rng = np.random.default_rng(7)
+  flow = rng.uniform(20, 60, count)
+  pressure = rng.uniform(40, 70, count)
+  energy = rng.uniform(900, 1400, count)
+  return [
+    {
+      "timestamp": start + i // zones,
+      "zone_id": f"zone-{i % zones + 1}",
+      "flow_ml": round(float(flow[i]), 2),
+      "pressure_psi": round(float(pressure[i]), 2),
+      "energy_kw": round(float(energy[i]), 1),
+      "incidents_today": 0,
+    }
+    for i in range(count)
+  ]
+
+
+def run(label: str, bodies: list[bytes], media_type: str, rows: int, zones: set[str]) -> None:
+  store = TelemetryStore(capacity=rows * len(bodies))
+  elapsed = 0.0
+  accepted = 0
+  for body in bodies:
+    started = time.perf_counter()
+    result = telemetry_ingest.ingest(telemetry_ingest.decode(body, media_type), store, known_zones=zones)
+    elapsed += time.perf_counter() - started
+    accepted += result.accepted
+  total = rows * len(bodies)
+  print(f"{label:<8} {accepted:>10,}/{total:,} rows accepted  {total / elapsed:14,.0f} rows/s  {len(bodies[0]) / rows:5.1f} bytes/row")
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--rows", type=int, default=100_000, help="rows per batch")
+  parser.add_argument("--batches", type=int, default=10)
+  parser.add_argument("--zones", type=int, default=500)
+  args = parser.parse_args()
+
+  zones = {f"zone-{i + 1}" for i in range(args.zones)}
+  step = args.rows // args.zones + 1
+  batches = [make_rows(args.rows, args.zones, 1_763_000_000 + b * step) for b in range(args.batches)]
+  ndjson = ["\n".join(json.dumps(row) for row in rows).encode() for rows in batches]
+  binary = [telemetry_ingest.encode_binary(rows) for rows in batches]
+
+  run("ndjson", ndjson, "application/x-ndjson", args.rows, zones)
+  run("binary", binary, telemetry_ingest.BINARY_MEDIA_TYPE, args.rows, zones)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,68 @@
+"""Cost of the incrementally maintained network health summary.
+
+Feeds hundreds of thousands of incidents through the store write hook, then
+times single status changes and summary requests, which no longer depend on
+how many incidents exist.
+
+  python -m benchmarks.bench_insights --incidents 300000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.schemas.water import IncidentReport
+from app.services.insights import NetworkHealth
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--incidents", type=int, default=300_000)
+  parser.add_argument("--zones", type=int, default=2_000)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(4)
+  now = datetime.now(timezone.utc)
+  incidents = [
+    IncidentReport(
+      id=f"incident-{i}",
+      zone_id=f"zone-{int(rng.integers(args.zones)) + 1}",
+      reported_by="sensor",
+      type="leak",
+      severity=("low", "moderate", "critical")[int(rng.integers(3))],
+      description="",
+      reported_at=now,
+      status="resolved" if rng.random() < 0.9 else "open",
+      coordinates=(21.25, 81.63),
+    )
+    for i in range(args.incidents)
+  ]
+  health = NetworkHealth()
+  started = time.perf_counter()
+  for incident in incidents:
+    health.on_store_write("incident", incident)
+  print(f"{'load':<20} {time.perf_counter() - started:8.2f} s for {args.incidents:,} incidents")
+
+  changes = [incident.model_copy(update={"status": "resolved" if incident.status == "open" else "open"}) for incident in incidents[:10_000]]
+  started = time.perf_counter()
+  for incident in changes:
+    health.on_store_write("incident", incident)
+  print(f"{'status change':<20} {(time.perf_counter() - started) / len(changes) * 1e6:8.2f} us")
+
+  started = time.perf_counter()
+  for _ in range(10_000):
+    health.encoded()
+  print(f"{'cached summary':<20} {(time.perf_counter() - started) / 10_000 * 1e6:8.2f} us")
+  started = time.perf_counter()
+  for incident in changes[:1_000]:
+    health.on_store_write("incident", incident.model_copy(update={"status": "acknowledged"}))
+    health.encoded()
+  print(f"{'change + re-encode':<20} {(time.perf_counter() - started) / 1_000 * 1e6:8.2f} us")
+  print(f"{health.summary()['open_incidents']:,} open, generation {health.generation:,}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,49 @@
+"""Lookup benchmark for the hydraulic network graph.
+
+Builds the synthetic city from `bench_schedule_optimizer`, then times the CSR
+compile, upstream lookups from every zone, and the recompile after a single
+station is rewired.
+
+  python -m benchmarks.bench_network_graph --zones 2000 --pumps 300 --reservoirs 40
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from app.data.network_graph import NetworkGraph
+from benchmarks.bench_schedule_optimizer import make_city
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--zones", type=int, default=2_000)
+  parser.add_argument("--pumps", type=int, default=300)
+  parser.add_argument("--reservoirs", type=int, default=40)
+  parser.add_argument("--rounds", type=int, default=50)
+  args = parser.parse_args()
+
+  zones, stations, reservoirs = make_city(args.zones, args.pumps, args.reservoirs)
+  started = time.perf_counter()
+  graph = NetworkGraph.build(zones, stations, reservoirs)
+  graph.upstream(0)
+  print(f"build + compile       {1_000 * (time.perf_counter() - started):8.1f} ms  {len(graph):,} nodes")
+
+  nodes = [graph.node("zone", zone.id) for zone in zones]
+  started = time.perf_counter()
+  for _ in range(args.rounds):
+    for node in nodes:
+      for pump in graph.upstream(node):
+        graph.upstream(pump)
+  lookups = args.rounds * len(nodes)
+  print(f"zone -> pumps -> reservoirs {lookups / (time.perf_counter() - started):12,.0f} lookups/s")
+
+  rewired = stations[0].model_copy(update={"connected_zones": [zone.id for zone in zones[:5]]})
+  started = time.perf_counter()
+  graph.set_station(rewired)
+  graph.upstream(0)
+  print(f"rewire one station    {1_000 * (time.perf_counter() - started):8.1f} ms")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,130 @@
+"""Multi-process fan-out latency over the pub/sub backbone.
+
+Starts a local socket broker (or uses Redis with --backend redis), spawns
+several worker processes that each run a `StoreSync` with one simulated
+WebSocket subscriber, then creates citizen incidents in the parent process.
+Latency is measured from the store write on the origin to the incident event
+reaching the subscriber on every other worker.
+
+  python -m benchmarks.bench_pubsub_fanout --workers 4 --incidents 1000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import statistics
+import time
+
+from app.core.config import Settings
+from app.data import mock_store
+from app.data.telemetry_store import TelemetryStore
+from app.schemas.water import CitizenReportCreate
+from app.services.broadcaster import Broadcaster
+from app.services.connections import ClientConnection
+from app.services.pubsub import SocketBroker, create_pubsub
+from app.services.store_sync import StoreSync
+
+
+class LatencySink:
+  def __init__(self) -> None:
+    self.latencies: list[float] = []
+    self.done = asyncio.Event()
+    self.expected = 0
+
+  async def send_text(self, data: str) -> None:
+    frame = json.loads(data)
+    if frame.get("type") == "incident_event":
+      self.latencies.append(time.time() - frame["sent_at"])
+      if len(self.latencies) >= self.expected:
+        self.done.set()
+
+
+def make_sync(settings: Settings) -> StoreSync:
+  return StoreSync(
+    create_pubsub(settings),
+    settings,
+    store=TelemetryStore(capacity=1_000),
+    broadcasters=(Broadcaster(build_frame=lambda zone: None, interval_seconds=3600),),
+  )
+
+
+def worker(settings: Settings, expected: int, ready, results) -> None:
+  async def run() -> None:
+    sync = make_sync(settings)
+    sink = LatencySink()
+    sink.expected = expected
+    sync.broadcasters[0].hub.register(ClientConnection(sink, 1_000, "drop_oldest", 0).start())
+    await sync.start()
+    ready.release()
+    try:
+      await asyncio.wait_for(sink.done.wait(), timeout=60)
+    finally:
+      await sync.stop()
+      results.put(sink.latencies)
+
+  asyncio.run(run())
+
+
+async def publish(settings: Settings, incidents: int, rate: float) -> None:
+  sync = make_sync(settings)
+  await sync.start()
+  report = CitizenReportCreate(
+    name="Load Test", phone="9999999999", ward_number=15, zone_id="zone-1", type="leak", description="Burst main"
+  )
+  for _ in range(incidents):
+    mock_store.upsert_citizen_incident(report)
+    await asyncio.sleep(1 / rate)
+  await asyncio.sleep(0.5)
+  await sync.stop()
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--workers", type=int, default=4)
+  parser.add_argument("--incidents", type=int, default=1_000)
+  parser.add_argument("--rate", type=float, default=500.0, help="incidents per second")
+  parser.add_argument("--backend", choices=("socket", "redis"), default="socket")
+  args = parser.parse_args()
+
+  async def run() -> list[float]:
+    broker = None
+    settings = Settings(pubsub_backend=args.backend)
+    if args.backend == "socket":
+      broker = SocketBroker("127.0.0.1", 0)
+      await broker.start()
+      settings = Settings(pubsub_backend="socket", pubsub_socket_address=f"127.0.0.1:{broker.port}")
+
+    context = mp.get_context("spawn")
+    ready, results = context.Semaphore(0), context.Queue()
+    processes = [
+      context.Process(target=worker, args=(settings, args.incidents, ready, results)) for _ in range(args.workers)
+    ]
+    for process in processes:
+      process.start()
+    for _ in processes:
+      await asyncio.to_thread(ready.acquire)
+
+    await publish(settings, args.incidents, args.rate)
+    latencies = [value for _ in processes for value in await asyncio.to_thread(results.get)]
+    for process in processes:
+      process.join()
+    if broker is not None:
+      await broker.close()
+    return latencies
+
+  latencies = sorted(asyncio.run(run()))
+  if not latencies:
+    print("no events received")
+    return
+  quantiles = statistics.quantiles(latencies, n=100)
+  print(f"{args.workers} workers x {args.incidents} incidents via {args.backend} ({len(latencies)} deliveries)")
+  print(
+    f"latency ms  p50={quantiles[49] * 1e3:.2f}  p95={quantiles[94] * 1e3:.2f}  "
+    f"p99={quantiles[98] * 1e3:.2f}  max={latencies[-1] * 1e3:.2f}"
+  )
+
+
+if __name__ == "__main__":
+  main()
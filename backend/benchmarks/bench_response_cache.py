@@ -0,0 +1,50 @@
+"""Refresh storm against a single-flight response cache.
+
+Fires hundreds of concurrent requests for the same key at a computation
+that takes `--compute-ms`, then repeats the storm once the result is cached
+and once after the version moves on.
+
+  python -m benchmarks.bench_response_cache --requests 500 --compute-ms 200
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.services.response_cache import ResponseCache
+
+
+async def storm(cache: ResponseCache[bytes], requests: int, version: int, compute) -> float:
+  started = time.perf_counter()
+  await asyncio.gather(*(cache.get("summary", version, compute, offload=True) for _ in range(requests)))
+  return time.perf_counter() - started
+
+
+async def run(requests: int, compute_ms: float) -> None:
+  cache: ResponseCache[bytes] = ResponseCache("bench", ttl_seconds=30.0, max_entries=16)
+  computed = 0
+
+  def compute() -> bytes:
+    nonlocal computed
+    computed += 1
+    time.sleep(compute_ms / 1000)
+    return b"{}"
+
+  for label, version in (("cold", 1), ("cached", 1), ("new version", 2)):
+    elapsed = await storm(cache, requests, version, compute)
+    print(f"{label:<12} {elapsed * 1e3:8.1f} ms for {requests:,} requests, {computed} computations so far")
+  stats = cache.stats()
+  print(f"hits {stats.hits:,}, misses {stats.misses:,}, coalesced {stats.coalesced:,}")
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--requests", type=int, default=500)
+  parser.add_argument("--compute-ms", type=float, default=200.0)
+  args = parser.parse_args()
+  asyncio.run(run(args.requests, args.compute_ms))
+
+
+if __name__ == "__main__":
+  main()
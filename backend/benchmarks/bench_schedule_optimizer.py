@@ -0,0 +1,93 @@
+"""Solve-time benchmark for the fairness-constrained pump schedule optimizer.
+
+Builds a synthetic city where every zone hangs off one to three nearby pumps
+and groups of pumps share reservoirs, then times a full day's optimization.
+
+  python -m benchmarks.bench_schedule_optimizer --zones 2000 --pumps 300 --reservoirs 40
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from app.schemas.water import GeoJsonPolygon, PumpStation, ReservoirStatus, WaterZone
+from app.services.schedule_optimizer import optimize_day
+
+
+def make_city(zones: int, pumps: int, reservoirs: int) -> tuple[list[WaterZone], list[PumpStation], list[ReservoirStatus]]:
+  rng = np.random.default_rng(3)
+  now = datetime.now(timezone.utc)
+  water_zones = [
+    WaterZone(
+      id=f"zone-{i + 1}",
+      name=f"Zone {i + 1}",
+      ward_number=i + 1,
+      population_served=int(rng.integers(5_000, 60_000)),
+      supply_hours_per_day=float(rng.uniform(3, 12)),
+      pressure="medium",
+      last_updated=now,
+      fairness_score=float(rng.uniform(0.4, 1.0)),
+      centroid_latitude=21.25,
+      centroid_longitude=81.63,
+      geojson=GeoJsonPolygon(geometry={"type": "Polygon", "coordinates": []}),
+    )
+    for i in range(zones)
+  ]
+  # Zones and pumps sit along a line; each zone is wired to its nearest pumps.
+  connected: list[list[str]] = [[] for _ in range(pumps)]
+  for i in range(zones):
+    nearest = int(i * pumps / zones)
+    for offset in range(int(rng.integers(1, 4))):
+      connected[min(nearest + offset, pumps - 1)].append(f"zone-{i + 1}")
+  stations = [
+    PumpStation(
+      id=f"pump-{p + 1}",
+      name=f"Pump {p + 1}",
+      connected_zones=sorted(set(connected[p])),
+      status="operational" if rng.random() > 0.05 else "maintenance",
+      energy_use_kw=float(rng.uniform(100, 500)),
+      health_score=float(rng.uniform(0.5, 1.0)),
+      max_flow_lps=float(rng.uniform(300, 700)),
+    )
+    for p in range(pumps)
+  ]
+  per_reservoir = -(-pumps // reservoirs)
+  storage = [
+    ReservoirStatus(
+      id=f"reservoir-{r + 1}",
+      name=f"Reservoir {r + 1}",
+      capacity_ml=float(capacity),
+      current_level_ml=float(capacity * rng.uniform(0.4, 0.95)),
+      trend="stable",
+      pumps_connected=[f"pump-{p + 1}" for p in range(r * per_reservoir, min((r + 1) * per_reservoir, pumps))],
+    )
+    for r, capacity in enumerate(rng.uniform(200, 400, reservoirs))
+  ]
+  return water_zones, stations, storage
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--zones", type=int, default=2_000)
+  parser.add_argument("--pumps", type=int, default=300)
+  parser.add_argument("--reservoirs", type=int, default=40)
+  args = parser.parse_args()
+
+  zones, stations, reservoirs = make_city(args.zones, args.pumps, args.reservoirs)
+  demand = {zone.id: zone.population_served * 135 / 1_000_000 / 24 for zone in zones}
+  started = time.perf_counter()
+  result = optimize_day(zones, stations, reservoirs, demand, date(2025, 11, 14), reserve_fraction=0.2)
+  elapsed = time.perf_counter() - started
+  hours = np.array(list(result.zone_supply_hours.values()))
+  print(
+    f"{args.zones:,} zones, {args.pumps} pumps, {args.reservoirs} reservoirs: {elapsed:.2f} s, "
+    f"{len(result.schedules):,} schedules, minimum {result.min_supply_hours:.2f} h, "
+    f"median {np.median(hours):.2f} h, zones at 0 h {int((hours == 0).sum())}"
+  )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,76 @@
+"""Query benchmark for the interval-indexed pump schedule store.
+
+Loads a year of back-to-back runs for hundreds of pumps, then times "what is
+running now" lookups, week-long range queries and conflict checks.
+
+  python -m benchmarks.bench_schedule_store --pumps 300 --days 365 --runs-per-day 4
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.data.schedule_store import ScheduleStore
+from app.schemas.water import PumpSchedule, PumpStation
+
+
+def make_schedules(pumps: int, zones: int, days: int, runs_per_day: int) -> list[PumpSchedule]:
+  rng = np.random.default_rng(9)
+  start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+  slot = timedelta(hours=24 / runs_per_day)
+  return [
+    PumpSchedule(
+      id=f"run-{p}-{n}",
+      pump_id=f"pump-{p + 1}",
+      zone_id=f"zone-{int(rng.integers(zones)) + 1}",
+      start_time_utc=start + n * slot,
+      end_time_utc=start + n * slot + timedelta(minutes=int(rng.integers(30, slot.total_seconds() // 60))),
+      flow_rate_lps=400,
+      status="scheduled",
+    )
+    for p in range(pumps)
+    for n in range(days * runs_per_day)
+  ]
+
+
+def timed(label: str, action, repeat: int = 1) -> object:
+  started = time.perf_counter()
+  for _ in range(repeat):
+    result = action()
+  elapsed = (time.perf_counter() - started) / repeat
+  print(f"{label:<32} {elapsed * 1e6:12.1f} us")
+  return result
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--pumps", type=int, default=300)
+  parser.add_argument("--zones", type=int, default=2_000)
+  parser.add_argument("--days", type=int, default=365)
+  parser.add_argument("--runs-per-day", type=int, default=4)
+  args = parser.parse_args()
+
+  schedules = make_schedules(args.pumps, args.zones, args.days, args.runs_per_day)
+  store = timed(f"index {len(schedules):,} schedules", lambda: ScheduleStore(schedules))
+  moment = datetime(2025, 7, 1, 1, tzinfo=timezone.utc)
+  station = PumpStation(
+    id="pump-7", name="Pump 7", connected_zones=[], status="operational", energy_use_kw=300, health_score=0.9,
+  )
+  candidate = schedules[0].model_copy(update={"id": "new", "pump_id": "pump-7", "start_time_utc": moment})
+  candidate.end_time_utc = moment + timedelta(hours=2)
+
+  timed("running at t, one pump", lambda: store.running_at(moment, pump_id="pump-7"), 10_000)
+  timed("running at t, one zone", lambda: store.running_at(moment, zone_id="zone-42"), 10_000)
+  running = timed("running at t, all pumps", lambda: store.running_at(moment), 100)
+  week = timed("week range, one pump", lambda: store.in_range(moment, moment + timedelta(days=7), pump_id="pump-7"), 1_000)
+  timed("day range, all pumps", lambda: store.in_range(moment, moment + timedelta(days=1)), 20)
+  conflicts = timed("conflict check", lambda: store.conflicts(candidate, station), 10_000)
+  timed("replace one schedule", lambda: store.put(candidate), 10_000)
+  print(f"{len(running)} running, {len(week)} in a week on one pump, conflicts: {conflicts}")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,144 @@
+"""Restart time and resident memory of the telemetry store over durable segments.
+
+Writes `--readings` synthetic readings (one per zone per minute) to a segment
+directory, compacts it, then restarts a fresh store from it in a separate
+process and reports how long the restore took, the process RSS, and how fast
+history queries answer right after startup.
+
+  python -m benchmarks.bench_segment_restart --readings 100000000 --zones 2000
+  python -m benchmarks.bench_segment_restart --restore-only --dir /tmp/fwdms-segments
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+
+from app.data.telemetry_segments import DAY_SECONDS, SegmentLog
+
+CHUNK_ROWS = 2_000_000
+
+
+def rss_mb() -> float:
+  for line in Path("/proc/self/status").read_text().splitlines():
+    if line.startswith("VmRSS:"):
+      return int(line.split()[1]) / 1024
+  return float("nan")
+
+
+def write(directory: str, readings: int, zones: int, retention_days: int) -> None:
+  log = SegmentLog(directory)
+  log.open()
+  log.sync_zones([None, *(f"zone-{zone + 1}" for zone in range(zones))])
+  rng = np.random.default_rng(17)
+  start = int(time.time()) // DAY_SECONDS * DAY_SECONDS - (readings // zones) * 60
+  written, started = 0, time.perf_counter()
+  while written < readings:
+    size = min(CHUNK_ROWS, readings - written)
+    index = np.arange(written, written + size)
+    log.append({
+      "timestamp": start + (index // zones) * 60,
+      "zone": (index % zones + 1).astype(np.int32),
+      "flow_ml": rng.uniform(20, 60, size).astype(np.float32),
+      "pressure_psi": rng.uniform(40, 70, size).astype(np.float32),
+      "energy_kw": rng.uniform(900, 1400, size).astype(np.float32),
+      "incidents_today": rng.integers(0, 4, size).astype(np.int32),
+    }, written)
+    written += size
+  elapsed = time.perf_counter() - started
+  removed = log.compact(int(start + (readings // zones) * 60), retention_days * DAY_SECONDS)
+  log.close()
+  print(
+    f"wrote {readings:,} readings in {elapsed:.1f}s ({readings / elapsed:,.0f}/s); "
+    f"compacted {removed} segments older than {retention_days} days"
+  )
+
+
+def restore(directory: str) -> dict[str, float]:
+  before = rss_mb()
+  started = time.perf_counter()
+  from app.core.config import get_settings
+  from app.data.telemetry_rollups import TelemetryRollups
+  from app.data.telemetry_store import TelemetryStore, from_epoch
+  from app.services.telemetry_history import query_history
+
+  settings = get_settings()
+  imported = time.perf_counter()
+  store = TelemetryStore(
+    capacity=settings.telemetry_capacity,
+    rollups=TelemetryRollups({
+      "1m": settings.telemetry_rollup_capacity_1m,
+      "1h": settings.telemetry_rollup_capacity_1h,
+      "1d": settings.telemetry_rollup_capacity_1d,
+    }),
+  )
+  log = SegmentLog(directory, settings.telemetry_segment_seconds)
+  log.open()
+  store.attach_archive(log)
+  restored = time.perf_counter()
+
+  now = from_epoch(store.last_timestamp)
+  queries = {
+    "hourly_7d_one_zone": lambda: query_history(store, now - timedelta(days=7), None, "zone-1", "1h", None, 500),
+    "daily_all_zones": lambda: query_history(store, None, None, None, "1d", None, 100_000),
+    "raw_20d_ago_one_hour": lambda: store.query(now - timedelta(days=20), now - timedelta(days=20, hours=-1), "zone-1"),
+  }
+  timings = {}
+  for name, run in queries.items():
+    query_started = time.perf_counter()
+    result = run()
+    timings[f"{name}_ms"] = (time.perf_counter() - query_started) * 1000
+    timings[f"{name}_rows"] = len(result)
+  return {
+    "stored_readings": log.head_seq - log.first_seq,
+    "import_seconds": imported - started,
+    "restore_seconds": restored - imported,
+    "rss_before_mb": before,
+    "rss_after_mb": rss_mb(),
+    **timings,
+  }
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--readings", type=int, default=100_000_000)
+  parser.add_argument("--zones", type=int, default=2_000)
+  parser.add_argument("--retention-days", type=int, default=30)
+  parser.add_argument("--dir", help="segment directory (a temporary one by default)")
+  parser.add_argument("--keep", action="store_true", help="keep the segment directory afterwards")
+  parser.add_argument("--restore-only", action="store_true", help="only restart from an existing --dir")
+  args = parser.parse_args()
+
+  if args.restore_only:
+    print(json.dumps(restore(args.dir)))
+    return
+
+  directory = args.dir or tempfile.mkdtemp(prefix="fwdms-segments-")
+  try:
+    write(directory, args.readings, args.zones, args.retention_days)
+    size = sum(path.stat().st_size for path in Path(directory).iterdir())
+    print(f"segment directory: {size / 1e9:.2f} GB")
+    output = subprocess.run(
+      [sys.executable, "-m", "benchmarks.bench_segment_restart", "--restore-only", "--dir", directory],
+      check=True, capture_output=True, text=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    print(f"restart over {result['stored_readings']:,} stored readings:")
+    for key, value in result.items():
+      if key != "stored_readings":
+        print(f"  {key:<28} {value:12,.2f}")
+  finally:
+    if not args.keep and not args.dir:
+      shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+  main()
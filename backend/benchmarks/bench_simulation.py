@@ -0,0 +1,93 @@
+"""Throughput benchmark for the what-if scenario simulator.
+
+Optimizes a day's schedules for a synthetic city, then runs a batch of
+scenarios (pumps offline, reservoir levels, demand and supply cuts) over a
+day at one-minute steps, once in a single process and once across a
+process pool.
+
+  python -m benchmarks.bench_simulation --zones 500 --pumps 80 --reservoirs 12 --scenarios 100
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from app.data.network_graph import NetworkGraph
+from app.schemas.water import SimulationScenario
+from app.services.schedule_optimizer import optimize_day
+from app.services.simulation import ScenarioBuilder, _merge, _slice, simulate_chunk
+from benchmarks.bench_schedule_optimizer import make_city
+
+
+def make_scenarios(count: int, pump_ids: list[str], zone_ids: list[str], reservoir_ids: list[str]) -> list[SimulationScenario]:
+  rng = np.random.default_rng(11)
+  return [
+    SimulationScenario(
+      name=f"scenario-{k}",
+      pumps_offline=rng.choice(pump_ids, int(rng.integers(0, 4)), replace=False).tolist(),
+      zone_supply_cut_hours={str(zone_id): float(rng.uniform(0, 3)) for zone_id in rng.choice(zone_ids, 5, replace=False)},
+      reservoir_levels_ml={str(reservoir_ids[0]): float(rng.uniform(5, 100))},
+      demand_multiplier=float(rng.uniform(0.8, 1.3)),
+    )
+    for k in range(count)
+  ]
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--zones", type=int, default=500)
+  parser.add_argument("--pumps", type=int, default=80)
+  parser.add_argument("--reservoirs", type=int, default=12)
+  parser.add_argument("--scenarios", type=int, default=100)
+  parser.add_argument("--hours", type=int, default=24)
+  parser.add_argument("--step-minutes", type=int, default=1)
+  parser.add_argument("--workers", type=int, default=4)
+  args = parser.parse_args()
+
+  zones, stations, reservoirs = make_city(args.zones, args.pumps, args.reservoirs)
+  demand = {zone.id: zone.population_served * 135 / 1_000_000 / 24 for zone in zones}
+  day = date(2025, 11, 14)
+  schedules = optimize_day(zones, stations, reservoirs, demand, day, reserve_fraction=0.2).schedules
+  graph = NetworkGraph.build(zones, stations, reservoirs)
+  builder = ScenarioBuilder(
+    zones, stations, reservoirs, schedules, demand, graph,
+    datetime(day.year, day.month, day.day, tzinfo=timezone.utc), args.hours, args.step_minutes,
+  )
+  scenarios = make_scenarios(
+    args.scenarios, [station.id for station in stations], [zone.id for zone in zones], [reservoir.id for reservoir in reservoirs],
+  )
+
+  started = time.perf_counter()
+  ordered = builder.schedules(scenarios)
+  network = builder.network(ordered)
+  arrays = builder.scenario_arrays(scenarios, ordered)
+  prepared = time.perf_counter() - started
+  label = f"{args.scenarios} scenarios x {builder.steps:,} steps, {len(ordered):,} schedules"
+  print(f"{'prepare arrays':<16} {prepared:7.2f} s")
+
+  started = time.perf_counter()
+  single = simulate_chunk(network, arrays)
+  print(f"{'one process':<16} {time.perf_counter() - started:7.2f} s  {label}")
+
+  size = -(-args.scenarios // args.workers)
+  chunks = [_slice(arrays, lo, lo + size) for lo in range(0, args.scenarios, size)]
+  with ProcessPoolExecutor(max_workers=args.workers) as pool:
+    pool.submit(int).result()  # spawn workers before timing
+    started = time.perf_counter()
+    pooled = _merge(list(pool.map(simulate_chunk, [network] * len(chunks), chunks)))
+    print(f"{f'{args.workers} workers':<16} {time.perf_counter() - started:7.2f} s")
+  assert np.allclose(single.delivered, pooled.delivered)
+
+  started = time.perf_counter()
+  results = builder.results(scenarios, network, pooled)
+  print(f"{'results':<16} {time.perf_counter() - started:7.2f} s")
+  fairness = np.array([result.fairness_score for result in results])
+  print(f"fairness {fairness.min():.3f}-{fairness.max():.3f}, unmet {np.mean([r.unmet_demand_ml for r in results]):.1f} ML mean")
+
+
+if __name__ == "__main__":
+  main()
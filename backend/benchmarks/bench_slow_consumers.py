@@ -0,0 +1,113 @@
+"""Server memory while a share of realtime clients stop reading.
+
+Simulates many connections behind per-connection outbound queues; a fraction
+of them never complete a send (a stalled TCP window). Traced Python memory is
+sampled as ticks go by for each slow-consumer policy and for an effectively
+unbounded queue, the behaviour of awaiting every send inline.
+
+  python -m benchmarks.bench_slow_consumers --clients 10000 --stalled 0.1 --ticks 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.data.telemetry_store import TelemetryStore
+from app.schemas.water import TelemetrySnapshot
+from app.services.broadcaster import Broadcaster, build_telemetry_frame
+from app.services.connections import ClientConnection
+
+
+class ReadingSocket:
+  async def send_text(self, data: str) -> None:
+    return None
+
+
+class StalledSocket:
+  """A client that stopped reading: the send never completes."""
+
+  def __init__(self) -> None:
+    self.closed = False
+
+  async def send_text(self, data: str) -> None:
+    await asyncio.Event().wait()
+
+  async def close(self, code: int = 1000, reason: str = "") -> None:
+    self.closed = True
+
+
+def seeded_store(zones: int) -> TelemetryStore:
+  store = TelemetryStore(capacity=100_000)
+  rng = np.random.default_rng(9)
+  now = datetime.now(timezone.utc)
+  store.extend(
+    TelemetrySnapshot(
+      timestamp=now,
+      zone_id=f"zone-{zone + 1}",
+      flow_ml=round(float(rng.uniform(20, 60)), 2),
+      pressure_psi=round(float(rng.uniform(40, 70)), 2),
+      energy_kw=round(float(rng.uniform(900, 1400)), 1),
+      incidents_today=int(rng.integers(0, 4)),
+    )
+    for zone in range(zones)
+  )
+  return store
+
+
+async def run(policy: str, queue_frames: int, args: argparse.Namespace) -> tuple[list[float], int, float]:
+  store = seeded_store(args.zones)
+  broadcaster = Broadcaster(build_frame=lambda zone: build_telemetry_frame(zone, store), interval_seconds=3600)
+  stalled_count = int(args.clients * args.stalled)
+  connections = [
+    ClientConnection(StalledSocket() if index < stalled_count else ReadingSocket(), queue_frames, policy, args.max_missed)
+    for index in range(args.clients)
+  ]
+  for connection in connections:
+    broadcaster.hub.register(connection.start(), types=["telemetry"])
+  await asyncio.sleep(0)
+
+  tracemalloc.start()
+  baseline = tracemalloc.get_traced_memory()[0]
+  samples: list[float] = []
+  started = time.perf_counter()
+  for tick in range(1, args.ticks + 1):
+    await broadcaster.tick()
+    await asyncio.sleep(0)
+    if tick % max(args.ticks // 5, 1) == 0:
+      samples.append((tracemalloc.get_traced_memory()[0] - baseline) / 1e6)
+  elapsed = time.perf_counter() - started
+  tracemalloc.stop()
+  for connection in connections:
+    connection.stop()
+  return samples, len(broadcaster.hub), elapsed / args.ticks
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--clients", type=int, default=10_000)
+  parser.add_argument("--stalled", type=float, default=0.1, help="fraction of clients that stop reading")
+  parser.add_argument("--zones", type=int, default=100)
+  parser.add_argument("--ticks", type=int, default=100)
+  parser.add_argument("--queue-frames", type=int, default=32)
+  parser.add_argument("--max-missed", type=int, default=60)
+  args = parser.parse_args()
+
+  print(
+    f"{args.clients:,} clients, {args.stalled:.0%} stalled, {args.zones} zones, {args.ticks} ticks; "
+    f"traced MB above baseline at each fifth of the run"
+  )
+  runs = [(policy, args.queue_frames) for policy in ("drop_oldest", "coalesce", "disconnect")]
+  runs.append(("unbounded", 1_000_000_000))
+  for policy, queue_frames in runs:
+    samples, connected, per_tick = asyncio.run(run("drop_oldest" if policy == "unbounded" else policy, queue_frames, args))
+    curve = "  ".join(f"{sample:7.1f}" for sample in samples)
+    print(f"{policy:<12} {curve}   connected={connected:,}  {per_tick * 1000:6.1f} ms/tick")
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,81 @@
+"""Bytes per client per hour: full-snapshot stream (v1) vs delta stream (v2).
+
+Simulates one hour of 5-second ticks in which a fraction of zones report a
+new reading each tick, and counts the bytes one subscriber receives.
+
+  python -m benchmarks.bench_stream_bandwidth --zones 200 --changed 0.1
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.data.telemetry_store import TelemetryStore
+from app.schemas.water import TelemetrySnapshot
+from app.services.broadcaster import Broadcaster, DeltaBroadcaster, build_telemetry_frame
+from app.services.connections import ClientConnection
+
+
+class CountingSocket:
+  def __init__(self) -> None:
+    self.bytes_received = 0
+
+  async def send_text(self, data: str) -> None:
+    self.bytes_received += len(data.encode())
+
+
+async def simulate(zones: int, changed: float, interval: float, seconds: int) -> tuple[int, int]:
+  store = TelemetryStore(capacity=1_000_000)
+  rng = np.random.default_rng(11)
+  start = int(datetime(2025, 11, 13, tzinfo=timezone.utc).timestamp())
+
+  def report(zone_indexes: np.ndarray, timestamp: int) -> None:
+    for zone in zone_indexes.tolist():
+      store.append(TelemetrySnapshot(
+        timestamp=datetime.fromtimestamp(timestamp, tz=timezone.utc),
+        zone_id=f"zone-{zone + 1}",
+        flow_ml=round(float(rng.uniform(20, 60)), 2),
+        pressure_psi=round(float(rng.uniform(40, 70)), 2),
+        energy_kw=round(float(rng.uniform(900, 1400)), 1),
+        incidents_today=int(rng.integers(0, 4)),
+      ))
+
+  report(np.arange(zones), start)
+  full = Broadcaster(build_frame=lambda zone: build_telemetry_frame(zone, store), interval_seconds=interval)
+  delta = DeltaBroadcaster(store, interval_seconds=interval, replay_frames=1)
+  v1, v2 = CountingSocket(), CountingSocket()
+  # Queues large enough that no frame is dropped: this measures bytes, not backpressure.
+  await full.subscribe(ClientConnection(v1, 1_000_000, "drop_oldest", 0).start())
+  await delta.subscribe(ClientConnection(v2, 1_000_000, "drop_oldest", 0).start())
+
+  ticks = int(seconds / interval)
+  for tick in range(1, ticks + 1):
+    report(np.flatnonzero(rng.random(zones) < changed), start + int(tick * interval))
+    await full.tick()
+    await delta.tick()
+    await asyncio.sleep(0)
+  full.stop()
+  delta.stop()
+  scale = 3600 / seconds
+  return int(v1.bytes_received * scale), int(v2.bytes_received * scale)
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--zones", type=int, default=200)
+  parser.add_argument("--changed", type=float, default=0.1, help="fraction of zones reporting per tick")
+  parser.add_argument("--interval", type=float, default=5.0)
+  parser.add_argument("--seconds", type=int, default=3600, help="simulated duration, scaled to one hour")
+  args = parser.parse_args()
+
+  v1, v2 = asyncio.run(simulate(args.zones, args.changed, args.interval, args.seconds))
+  print(f"{args.zones} zones, {args.changed:.0%} reporting per {args.interval:g}s tick")
+  print(f"v1 full snapshots : {v1 / 1e6:10.2f} MB per client per hour")
+  print(f"v2 deltas         : {v2 / 1e6:10.2f} MB per client per hour  ({v1 / max(v2, 1):.1f}x less)")
+
+
+if __name__ == "__main__":
+  main()
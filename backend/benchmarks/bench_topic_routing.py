@@ -0,0 +1,85 @@
+"""Per-tick cost of topic-routed telemetry vs sending every client every zone.
+
+Each simulated client subscribes to a few zones out of many. The routed hub
+encodes one frame per subscribed zone topic per tick; the baseline sends the
+citywide frame to everyone.
+
+  python -m benchmarks.bench_topic_routing --zones 2000 --clients 10000 --zones-per-client 2
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.data.telemetry_store import TelemetryStore
+from app.schemas.water import TelemetrySnapshot
+from app.services.broadcaster import ALL_ZONES, Broadcaster, build_telemetry_frame
+from app.services.connections import ClientConnection
+
+
+class NullSocket:
+  def __init__(self) -> None:
+    self.bytes_sent = 0
+
+  async def send_text(self, data: str) -> None:
+    self.bytes_sent += len(data)
+
+
+def seeded_store(zones: int) -> TelemetryStore:
+  store = TelemetryStore(capacity=max(zones, 1_000))
+  rng = np.random.default_rng(3)
+  now = datetime.now(timezone.utc)
+  store.extend(
+    TelemetrySnapshot(
+      timestamp=now,
+      zone_id=f"zone-{zone + 1}",
+      flow_ml=round(float(rng.uniform(20, 60)), 2),
+      pressure_psi=round(float(rng.uniform(40, 70)), 2),
+      energy_kw=round(float(rng.uniform(900, 1400)), 1),
+      incidents_today=int(rng.integers(0, 4)),
+    )
+    for zone in range(zones)
+  )
+  return store
+
+
+async def run(store: TelemetryStore, clients: int, ticks: int, zones: list[list[str]] | None) -> tuple[float, int]:
+  broadcaster = Broadcaster(build_frame=lambda zone: build_telemetry_frame(zone, store), interval_seconds=3600)
+  sockets = [NullSocket() for _ in range(clients)]
+  connections = [ClientConnection(sock, 32, "drop_oldest", 120).start() for sock in sockets]
+  for index, connection in enumerate(connections):
+    broadcaster.hub.register(connection, types=["telemetry"], zones=None if zones is None else zones[index])
+  cpu = time.process_time()
+  for _ in range(ticks):
+    await broadcaster.tick()
+    while any(connection.queued_frames for connection in connections):
+      await asyncio.sleep(0)
+  return (time.process_time() - cpu) / ticks, sum(sock.bytes_sent for sock in sockets) // ticks
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--zones", type=int, default=2_000)
+  parser.add_argument("--clients", type=int, default=10_000)
+  parser.add_argument("--zones-per-client", type=int, default=2)
+  parser.add_argument("--ticks", type=int, default=5)
+  args = parser.parse_args()
+
+  store = seeded_store(args.zones)
+  rng = np.random.default_rng(5)
+  interest = [
+    [f"zone-{zone + 1}" for zone in rng.choice(args.zones, args.zones_per_client, replace=False).tolist()]
+    for _ in range(args.clients)
+  ]
+  print(f"{args.zones:,} zones, {args.clients:,} clients x {args.zones_per_client} zones, {args.ticks} ticks")
+  for label, zones in ((f"all zones ({ALL_ZONES})", None), ("zone topics", interest)):
+    cpu, egress = asyncio.run(run(store, args.clients, args.ticks, zones))
+    print(f"{label:<16} cpu/tick={cpu * 1000:9.2f} ms  egress/tick={egress / 1e6:9.2f} MB")
+
+
+if __name__ == "__main__":
+  main()
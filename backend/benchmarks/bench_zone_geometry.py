@@ -0,0 +1,85 @@
+"""Zone listing size and cost at each map zoom level.
+
+Builds wards with thousands of boundary vertices, precomputes their
+simplified geometry, then compares serving the pre-encoded listing at each
+zoom with re-serializing the full models through pydantic.
+
+  python -m benchmarks.bench_zone_geometry --zones 500 --vertices 2000
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+from pydantic import TypeAdapter
+
+from app.core.config import get_settings
+from app.schemas.water import GeoJsonPolygon, WaterZone
+from app.services.zone_geometry import ZoneGeometryCache
+
+
+def wards(count: int, vertices: int, rng: np.random.Generator) -> list[WaterZone]:
+  """Wobbly ward outlines about 1 km across on a grid around Raipur."""
+  side = int(np.ceil(np.sqrt(count)))
+  angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+  now = datetime.now(timezone.utc)
+  zones = []
+  for i in range(count):
+    lat, lon = 21.1 + 0.01 * (i // side), 81.5 + 0.01 * (i % side)
+    # A few low-frequency lobes plus survey noise, as digitised boundaries have.
+    radius = 0.004 * (1 + 0.15 * np.sin(3 * angles + rng.uniform(0, 6)) + 0.1 * np.sin(7 * angles + rng.uniform(0, 6)))
+    radius += rng.normal(0, 0.00001, vertices)
+    ring = np.c_[lon + radius * np.cos(angles), lat + radius * np.sin(angles)]
+    ring = np.vstack([ring, ring[:1]]).tolist()
+    zones.append(WaterZone(
+      id=f"zone-{i + 1}",
+      name=f"Ward {i + 1}",
+      ward_number=i + 1,
+      population_served=40_000,
+      supply_hours_per_day=6,
+      pressure="medium",
+      last_updated=now,
+      fairness_score=0.8,
+      centroid_latitude=lat,
+      centroid_longitude=lon,
+      geojson=GeoJsonPolygon(geometry={"type": "Polygon", "coordinates": [ring]}),
+    ))
+  return zones
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--zones", type=int, default=500)
+  parser.add_argument("--vertices", type=int, default=2_000)
+  args = parser.parse_args()
+
+  zones = wards(args.zones, args.vertices, np.random.default_rng(25))
+  started = time.perf_counter()
+  cache = ZoneGeometryCache.from_settings(get_settings(), zones)
+  print(f"{'precompute':<18} {time.perf_counter() - started:8.2f} s for {args.zones:,} zones x {args.vertices:,} vertices")
+  refreshed = [zone.model_copy(update={"fairness_score": 0.5}) for zone in zones]
+  started = time.perf_counter()
+  for zone in refreshed:
+    cache.set_zone(zone)
+  print(f"{'fairness refresh':<18} {(time.perf_counter() - started) * 1e3:8.2f} ms, geometry unchanged")
+
+  adapter = TypeAdapter(list[WaterZone])
+  started = time.perf_counter()
+  body = adapter.dump_json(zones)
+  print(f"{'pydantic full':<18} {(time.perf_counter() - started) * 1e3:8.2f} ms, {len(body) / 1e6:7.2f} MB")
+  for zoom in [*cache.zoom_levels, None]:
+    cache.encoded_zones(zoom)
+    started = time.perf_counter()
+    for _ in range(100):
+      body = cache.encoded_zones(zoom)
+    label = "cached full" if zoom is None else f"cached zoom {zoom}"
+    print(f"{label:<18} {(time.perf_counter() - started) * 10:8.4f} ms, {len(body) / 1e6:7.2f} MB")
+  started = time.perf_counter()
+  body = cache.encoded_zones(12, [zone.id for zone in zones[:50]])
+  print(f"{'50-zone view, z12':<18} {(time.perf_counter() - started) * 1e3:8.4f} ms, {len(body) / 1e6:7.2f} MB")
+
+
+if __name__ == "__main__":
+  main()
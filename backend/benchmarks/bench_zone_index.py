@@ -0,0 +1,86 @@
+"""Point lookups against thousands of ward boundaries.
+
+Tiles a city with a jittered grid of wards whose edges are subdivided into
+many vertices, indexes them, and times `locate` for random points. Every
+answer is checked against the ward the point was drawn from.
+
+  python -m benchmarks.bench_zone_index --zones 10000 --vertices-per-edge 10
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.data.zone_index import ZoneIndex
+from app.schemas.water import GeoJsonPolygon, WaterZone
+
+
+def ward_grid(side: int, vertices_per_edge: int, rng: np.random.Generator) -> tuple[list[WaterZone], np.ndarray]:
+  """Wards tiling `side` x `side` cells around Raipur, and the lattice their corners sit on."""
+  step = 0.002
+  lattice = np.stack(np.meshgrid(np.arange(side + 1), np.arange(side + 1), indexing="ij"), axis=-1) * step
+  lattice = lattice + rng.uniform(-0.3, 0.3, lattice.shape) * step
+  lattice += (81.5, 21.1)
+  now = datetime.now(timezone.utc)
+  fractions = np.arange(vertices_per_edge) / vertices_per_edge
+  zones = []
+  for i in range(side):
+    for j in range(side):
+      corners = [lattice[i, j], lattice[i + 1, j], lattice[i + 1, j + 1], lattice[i, j + 1]]
+      ring = [
+        (a + (b - a) * f).tolist()
+        for a, b in zip(corners, corners[1:] + corners[:1])
+        for f in fractions
+      ]
+      zones.append(WaterZone(
+        id=f"zone-{i * side + j + 1}",
+        name=f"Ward {i * side + j + 1}",
+        ward_number=i * side + j + 1,
+        population_served=10_000,
+        supply_hours_per_day=6,
+        pressure="medium",
+        last_updated=now,
+        fairness_score=0.8,
+        centroid_latitude=float(np.mean([c[1] for c in corners])),
+        centroid_longitude=float(np.mean([c[0] for c in corners])),
+        geojson=GeoJsonPolygon(geometry={"type": "Polygon", "coordinates": [ring + ring[:1]]}),
+      ))
+  return zones, lattice
+
+
+def main() -> None:
+  parser = argparse.ArgumentParser(description=__doc__)
+  parser.add_argument("--zones", type=int, default=10_000)
+  parser.add_argument("--vertices-per-edge", type=int, default=10)
+  parser.add_argument("--lookups", type=int, default=200_000)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(21)
+  side = math.isqrt(args.zones)
+  zones, lattice = ward_grid(side, args.vertices_per_edge, rng)
+  started = time.perf_counter()
+  index = ZoneIndex.build(zones)
+  print(f"{'build':<12} {time.perf_counter() - started:8.2f} s for {len(index):,} wards of {4 * args.vertices_per_edge} vertices")
+
+  # Points drawn inside each ward's corner quad: a random mix of the four corners.
+  wards = rng.integers(0, side, size=(args.lookups, 2))
+  weights = rng.dirichlet(np.ones(4), size=args.lookups)
+  i, j = wards[:, 0], wards[:, 1]
+  quads = np.stack([lattice[i, j], lattice[i + 1, j], lattice[i + 1, j + 1], lattice[i, j + 1]], axis=1)
+  points = (weights[:, :, None] * quads).sum(axis=1)
+  expected = [f"zone-{a * side + b + 1}" for a, b in wards.tolist()]
+  lats, lons = points[:, 1].tolist(), points[:, 0].tolist()
+
+  started = time.perf_counter()
+  found = [index.locate(lat, lon) for lat, lon in zip(lats, lons)]
+  elapsed = time.perf_counter() - started
+  wrong = sum(a != b for a, b in zip(found, expected))
+  print(f"{'locate':<12} {args.lookups / elapsed:8,.0f} lookups/s ({elapsed / args.lookups * 1e6:.2f} us each), {wrong} mismatched")
+
+
+if __name__ == "__main__":
+  main()
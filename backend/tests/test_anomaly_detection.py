@@ -0,0 +1,26 @@
+import numpy as np
+
+from app.data.telemetry_store import TelemetryStore
+from app.services.anomaly_detection import AnomalyDetector
+
+
+def test_alerts_are_raised_only_for_zones_on_record():
+  store = TelemetryStore(capacity=1)
+  codes = np.array([store.intern_zone("zone-1"), store.intern_zone("zone-404")], dtype=np.int32)
+  minutes = 30
+  flow = np.random.default_rng(3).normal(40, 1, 2 * minutes).astype(np.float32)
+  # Both zones surge on the last reading.
+  flow[-2:] = 80
+  columns = {
+    "timestamp": np.repeat(1_763_000_000 + 60 * np.arange(minutes, dtype=np.int64), 2),
+    "zone": np.tile(codes, minutes),
+    "flow_ml": flow,
+    "pressure_psi": np.full(2 * minutes, 55, dtype=np.float32),
+    "energy_kw": np.full(2 * minutes, 1_100, dtype=np.float32),
+    "incidents_today": np.zeros(2 * minutes, dtype=np.int32),
+  }
+  detector = AnomalyDetector(
+    alpha=0.05, z_threshold=4.0, warmup_readings=20, pressure_drop_psi_per_minute=5.0, cooldown_seconds=900,
+  )
+  incidents = detector.observe(store, columns)
+  assert [(incident.zone_id, incident.type) for incident in incidents] == [("zone-1", "leak")]
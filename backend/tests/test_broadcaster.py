@@ -0,0 +1,59 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from app.data.telemetry_store import TelemetryStore
+from app.schemas.water import TelemetrySnapshot
+from app.services.broadcaster import ALL_ZONES, DeltaBroadcaster, TopicHub
+from app.services.connections import ClientConnection
+
+
+class Sink:
+  async def send_text(self, data: str) -> None:
+    pass
+
+
+def test_dropped_consumer_then_subscribing_changes_nothing():
+  hub = TopicHub()
+  connection = ClientConnection(Sink(), max_frames=1, policy="disconnect", max_missed_frames=1)
+  hub.register(connection, types=["telemetry"], zones=["zone-1"])
+  connection.stop()
+  assert hub.deliver([(connection, "{}")]) == 0
+  assert len(hub) == 0
+
+  assert hub.change(connection, "subscribe", types=["incidents"], zones=["zone-2"]) == set()
+  assert hub.subscription(connection) is None
+  assert hub.subscribers([("incidents", "zone-2")]) == set()
+
+
+def reading(zone_id: str, minute: int) -> TelemetrySnapshot:
+  return TelemetrySnapshot(
+    timestamp=datetime(2025, 11, 13, 6, minute, tzinfo=timezone.utc),
+    zone_id=zone_id,
+    flow_ml=10.0,
+    pressure_psi=50.0,
+    energy_kw=5.0,
+    incidents_today=0,
+  )
+
+
+def test_resuming_from_another_stream_epoch_gets_a_snapshot():
+  store = TelemetryStore(capacity=16)
+  broadcaster = DeltaBroadcaster(store, interval_seconds=1.0, replay_frames=8)
+  store.append(reading("zone-1", 0))
+  asyncio.run(broadcaster.tick())
+  store.append(reading("zone-2", 1))
+  asyncio.run(broadcaster.tick())
+
+  [delta] = broadcaster._catch_up({ALL_ZONES}, 1, broadcaster.epoch)
+  assert json.loads(delta)["type"] == "telemetry_delta"
+  assert json.loads(delta)["epoch"] == broadcaster.epoch
+  assert broadcaster._catch_up({ALL_ZONES}, broadcaster.seq, broadcaster.epoch) == []
+
+  # Same seq from another worker or an earlier process: not the same stream.
+  for since_epoch in ("another-epoch", None):
+    [snapshot] = broadcaster._catch_up({ALL_ZONES}, broadcaster.seq, since_epoch)
+    frame = json.loads(snapshot)
+    assert frame["type"] == "telemetry_snapshot"
+    assert (frame["seq"], frame["epoch"]) == (broadcaster.seq, broadcaster.epoch)
+    assert {row["zone_id"] for row in frame["data"]} == {"zone-1", "zone-2"}
@@ -0,0 +1,62 @@
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.data import mock_store
+from app.data.telemetry_rollups import ROLLUP_METRICS, TelemetryRollups
+from app.data.telemetry_store import TelemetryStore, from_epoch
+from app.routers import telemetry
+from app.services.demand_forecast import HOUR, DemandForecaster, current_hour
+
+
+def hourly_rows(code: int, start: int, hours: int) -> dict[str, np.ndarray]:
+  rows: dict[str, np.ndarray] = {
+    "bucket": start + HOUR * np.arange(hours, dtype=np.int64),
+    "zone": np.full(hours, code, dtype=np.int32),
+    "count": np.full(hours, 60),
+  }
+  for metric in ROLLUP_METRICS:
+    rows[f"{metric}_sum"] = np.full(hours, 600.0)
+    rows[f"{metric}_min"] = rows[f"{metric}_max"] = np.full(hours, 10.0)
+  return rows
+
+
+def test_forecast_starts_at_the_current_hour_when_telemetry_lags():
+  store = TelemetryStore(capacity=16, rollups=TelemetryRollups({"1m": 16, "1h": 256, "1d": 16}))
+  code = store.intern_zone("zone-1")
+  store.rollups.tier("1h").load(hourly_rows(code, current_hour() - 100 * HOUR, 48))
+  forecaster = DemandForecaster(store, min_history_hours=24)
+  _, buckets, demand = forecaster.forecast_matrix(3)
+  assert buckets.tolist() == [current_hour() + HOUR * hour for hour in range(3)]
+  assert demand.shape == (1, 3)
+
+
+def forecast_client() -> TestClient:
+  app = FastAPI()
+  app.include_router(telemetry.router)
+  return TestClient(app)
+
+
+def test_zone_forecast_is_not_the_citywide_fallback():
+  client = forecast_client()
+  assert client.get("/telemetry/demand-forecast", params={"zone_id": "no-such-zone"}).status_code == 404
+  zone_id = mock_store.list_zones()[0].id
+  response = client.get("/telemetry/demand-forecast", params={"zone_id": zone_id})
+  assert response.status_code == 200
+  assert response.json() == []
+
+
+def test_zone_forecast_with_history(monkeypatch):
+  zone_id, other_id = (zone.id for zone in mock_store.list_zones()[:2])
+  store = TelemetryStore(capacity=16, rollups=TelemetryRollups({"1m": 16, "1h": 256, "1d": 16}))
+  code = store.intern_zone(zone_id)
+  store.intern_zone(other_id)
+  store.rollups.tier("1h").load(hourly_rows(code, current_hour() - 48 * HOUR, 48))
+  monkeypatch.setattr(telemetry, "demand_forecaster", DemandForecaster(store, min_history_hours=24))
+  client = forecast_client()
+
+  points = client.get("/telemetry/demand-forecast", params={"zone_id": zone_id, "horizon_hours": 3}).json()
+  assert [point["zone_id"] for point in points] == [zone_id] * 3
+  assert points[0]["timestamp"] == from_epoch(current_hour()).isoformat().replace("+00:00", "Z")
+  assert all(point["demand_ml"] == 10.0 for point in points)
+  assert client.get("/telemetry/demand-forecast", params={"zone_id": other_id}).json() == []
@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from app.data.telemetry_rollups import ROLLUP_METRICS, TelemetryRollups
+from app.data.telemetry_store import TelemetryStore
+from app.schemas.water import PumpSchedule, PumpStation, TariffBand
+from app.services.energy_cost import DAY_SECONDS, HOUR_SECONDS, Tariff, metered_energy, schedule_energy
+
+DAY = 20_400 * DAY_SECONDS
+H = HOUR_SECONDS
+
+# Night wraps past midnight; the cheapest band is mid-day.
+BANDS = [
+  TariffBand(name="night", start_hour=22, end_hour=6, price_per_kwh=5),
+  TariffBand(name="morning", start_hour=6, end_hour=10, price_per_kwh=8),
+  TariffBand(name="solar", start_hour=10, end_hour=14, price_per_kwh=2),
+  TariffBand(name="evening", start_hour=14, end_hour=22, price_per_kwh=10),
+]
+
+
+def test_band_wrapping_past_midnight():
+  tariff = Tariff(BANDS)
+  assert tariff.price_at(np.array([DAY + 23 * H, DAY + 3 * H, DAY + 6 * H, DAY + 12 * H])).tolist() == [5, 5, 8, 2]
+  assert tariff.daily == 8 * 5 + 4 * 8 + 4 * 2 + 8 * 10
+  # Local time 05:30 at UTC midnight.
+  assert Tariff(BANDS, utc_offset_minutes=330).price_at(np.array([DAY])).tolist() == [5]
+
+
+def test_integral_across_days():
+  tariff = Tariff(BANDS)
+  assert tariff.cost(np.array([DAY + 21 * H]), np.array([DAY + 25 * H]), np.array([2.0])).tolist() == [2 * (10 + 3 * 5)]
+  assert tariff.integral(np.array([DAY + 2 * DAY_SECONDS]))[0] - tariff.integral(np.array([DAY]))[0] == 2 * tariff.daily
+  with pytest.raises(ValueError):
+    Tariff(BANDS[:3])
+
+
+def test_cheapest_starts():
+  tariff = Tariff(BANDS)
+  starts = tariff.cheapest_starts(DAY, np.array([2 * H, 4 * H, 6 * H, 30 * H]))
+  assert starts.tolist() == [10 * H, 10 * H, 8 * H, 0]
+
+
+def schedule(schedule_id: str, start_hour: int, hours: int, status: str = "scheduled") -> PumpSchedule:
+  start = datetime.fromtimestamp(DAY + start_hour * H, tz=timezone.utc)
+  return PumpSchedule(
+    id=schedule_id,
+    pump_id="pump-1",
+    zone_id="zone-1",
+    start_time_utc=start,
+    end_time_utc=start + timedelta(hours=hours),
+    flow_rate_lps=10,
+    status=status,
+  )
+
+
+def test_schedule_energy_prices_running_time_within_the_range():
+  station = PumpStation(
+    id="pump-1", name="Pump 1", connected_zones=["zone-1"], status="operational", energy_use_kw=100, health_score=1,
+  )
+  runs = [schedule("a", 10, 4), schedule("b", 21, 3), schedule("c", 0, 24, status="paused")]
+  pump_ids, energy, cost = schedule_energy(runs, [station], Tariff(BANDS), since=DAY + 12 * H, until=DAY + 23 * H)
+  assert pump_ids == ["pump-1"]
+  assert energy.tolist() == [100 * (2 + 2)]
+  assert cost.tolist() == [100 * (2 * 2 + 10 + 5)]
+
+
+def rollup_rows(buckets: list[int], width: int, kw: float) -> dict[str, np.ndarray]:
+  size = len(buckets)
+  rows: dict[str, np.ndarray] = {
+    "bucket": np.array(buckets, dtype=np.int64),
+    "zone": np.ones(size, dtype=np.int32),
+    "count": np.full(size, width // 60),
+  }
+  for metric in ROLLUP_METRICS:
+    rows[f"{metric}_sum"] = np.full(size, kw * (width // 60))
+    rows[f"{metric}_min"] = rows[f"{metric}_max"] = np.full(size, kw)
+  return rows
+
+
+def test_metered_energy_prices_the_day_before_the_oldest_hourly_row():
+  store = TelemetryStore(capacity=16, rollups=TelemetryRollups({"1m": 16, "1h": 16, "1d": 16}))
+  store.intern_zone("zone-1")
+  # Hourly rows from noon only; the daily row covers the morning they have aged out of.
+  store.rollups.tier("1h").load(rollup_rows([DAY + hour * H for hour in range(12, 14)], H, kw=20.0))
+  store.rollups.tier("1d").load(rollup_rows([DAY], DAY_SECONDS, kw=10.0))
+  flat = Tariff([TariffBand(name="flat", start_hour=0, end_hour=24, price_per_kwh=1)])
+
+  resolution, energy, cost = metered_energy(store, flat, DAY + 2 * H, DAY + 14 * H)
+  assert resolution == DAY_SECONDS
+  assert energy[1] == 10 * 10 + 2 * 20
+  assert cost[1] == energy[1]
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.schemas.water import IncidentReport
+from app.services.fairness import DAY_SECONDS, ComplaintLedger
+
+FILED = datetime(2025, 11, 10, 9, tzinfo=timezone.utc)
+DAY = int(FILED.timestamp()) // DAY_SECONDS
+
+
+def citizen_report(incident_id: str, **changes) -> IncidentReport:
+  report = IncidentReport(
+    id=incident_id,
+    zone_id="zone-1",
+    reported_by="citizen",
+    type="leak",
+    severity="moderate",
+    description="Leak",
+    reported_at=FILED,
+    status="open",
+    coordinates=(21.25, 81.63),
+  )
+  return report.model_copy(update=changes)
+
+
+def test_past_days_keep_the_resolutions_they_had():
+  ledger = ComplaintLedger([citizen_report("a"), citizen_report("b")])
+  days = np.arange(DAY, DAY + 3)
+  assert ledger.resolution(days).tolist() == [0.0, 0.0, 0.0]
+  assert ledger.take_changed_from() == DAY
+
+  ledger.record(citizen_report("a", status="resolved", resolved_at=FILED + timedelta(days=2)))
+  assert ledger.resolution(days).tolist() == [0.0, 0.0, 0.5]
+  assert ledger.take_changed_from() == DAY
+
+  ledger.record(citizen_report("a", status="open"))
+  assert ledger.resolution(days).tolist() == [0.0, 0.0, 0.0]
+  assert ledger.take_changed_from() == DAY
+  assert ledger.take_changed_from() is None
+  assert ComplaintLedger().resolution(days).tolist() == [1.0, 1.0, 1.0]
@@ -0,0 +1,38 @@
+import json
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.data import mock_store
+from app.routers import stream
+from app.services.connections import ClientConnection
+from app.services.incident_stream import IncidentStream
+
+
+class Sink:
+  async def send_text(self, data: str) -> None:
+    pass
+
+
+def test_dropped_subscriber_then_changing_filters_changes_nothing():
+  stream = IncidentStream()
+  connection = ClientConnection(Sink(), max_frames=1, policy="disconnect", max_missed_frames=1)
+  stream.subscribe(connection, zones=["zone-1"])
+  connection.stop()
+  incident = mock_store.list_incidents()[0].model_copy(update={"zone_id": "zone-1"})
+  assert stream.publish(incident) == 0
+  assert len(stream) == 0
+
+  stream.change(connection, "subscribe", zones=["zone-2"], severities=["critical"])
+  assert len(stream) == 0
+  assert stream.publish(incident.model_copy(update={"id": "other", "zone_id": "zone-2"})) == 0
+
+
+def test_incident_socket_reports_bad_filters_and_keeps_serving():
+  app = FastAPI()
+  app.include_router(stream.router)
+  with TestClient(app).websocket_connect("/ws/incidents?zones=zone-1") as websocket:
+    websocket.send_text(json.dumps({"action": "subscribe", "severities": "critical"}))
+    assert websocket.receive_json() == {"type": "error", "detail": "zones and severities must be lists"}
+    websocket.send_text(json.dumps({"action": "subscribe", "severities": ["urgent"]}))
+    assert websocket.receive_json()["type"] == "error"
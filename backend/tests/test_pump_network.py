@@ -0,0 +1,37 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.data import mock_store
+from app.data.network_graph import network_graph
+from app.routers import pumps
+
+
+def pumps_client() -> TestClient:
+  app = FastAPI()
+  app.include_router(pumps.router)
+  return TestClient(app)
+
+
+def test_station_update_reindexes_the_network_graph():
+  client = pumps_client()
+  original = mock_store.get_pump_station("pump-3")
+  try:
+    assert network_graph.downstream_ids("pump", "pump-3") == ["zone-3"]
+    payload = original.model_dump() | {"connected_zones": ["zone-2"], "status": "offline"}
+    response = client.put("/pumps/stations/pump-3", json=payload)
+    assert response.status_code == 200
+    assert mock_store.get_pump_station("pump-3").status == "offline"
+    assert network_graph.downstream_ids("pump", "pump-3") == ["zone-2"]
+    assert "pump-3" in network_graph.upstream_ids("zone", "zone-2")
+  finally:
+    mock_store.apply_pump_station(original)
+  assert network_graph.downstream_ids("pump", "pump-3") == ["zone-3"]
+
+
+def test_station_update_rejects_unknown_zones_and_mismatched_ids():
+  client = pumps_client()
+  payload = mock_store.get_pump_station("pump-3").model_dump()
+  assert client.put("/pumps/stations/pump-1", json=payload).status_code == 400
+  payload["connected_zones"] = ["zone-404"]
+  assert client.put("/pumps/stations/pump-3", json=payload).status_code == 404
+  assert mock_store.get_pump_station("pump-3").connected_zones == ["zone-3"]
@@ -0,0 +1,47 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.data import mock_store
+from app.data.schedule_store import IntervalList, ScheduleConflict, optimized_schedule_prefix
+from app.schemas.water import PumpSchedule
+
+
+def test_longest_shrinks_when_the_longest_interval_is_removed():
+  intervals = IntervalList()
+  intervals.add("day", 0, 86_400)
+  intervals.add("morning", 3_600, 7_200)
+  intervals.add("evening", 64_800, 68_400)
+  assert intervals.longest == 86_400
+  intervals.remove("day", 0)
+  assert intervals.longest == 3_600
+  assert intervals.overlapping(65_000, 65_001) == ["evening"]
+  intervals.remove("morning", 3_600)
+  intervals.remove("evening", 64_800)
+  assert intervals.longest == 0
+
+
+def optimized_run(pump_id: str, zone_id: str, hour: int) -> PumpSchedule:
+  start = datetime(2031, 3, 4, hour, tzinfo=timezone.utc)
+  return PumpSchedule(
+    id=f"{optimized_schedule_prefix(start.date())}{pump_id}-{zone_id}",
+    pump_id=pump_id,
+    zone_id=zone_id,
+    start_time_utc=start,
+    end_time_utc=start + timedelta(hours=1),
+    flow_rate_lps=1.0,
+    status="scheduled",
+  )
+
+
+def test_reoptimizing_a_day_replaces_its_previous_plan():
+  pump_id = mock_store.list_pump_stations()[0].id
+  day = date(2031, 3, 4)
+  mock_store.replace_optimized_pump_schedules(day, [optimized_run(pump_id, "zone-a", 1), optimized_run(pump_id, "zone-b", 2)])
+  mock_store.replace_optimized_pump_schedules(day, [optimized_run(pump_id, "zone-b", 1)])
+  assert [schedule.zone_id for schedule in mock_store.optimized_pump_schedules(day)] == ["zone-b"]
+
+  mock_store.approve_pump_schedule(optimized_run(pump_id, "zone-b", 1).id)
+  with pytest.raises(ScheduleConflict):
+    mock_store.replace_optimized_pump_schedules(day, [optimized_run(pump_id, "zone-a", 3)])
+  assert mock_store.get_pump_schedule(optimized_run(pump_id, "zone-b", 1).id).status == "running"
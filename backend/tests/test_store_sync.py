@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+from app.core.config import get_settings
+from app.data import mock_store
+from app.data.telemetry_rollups import TelemetryRollups
+from app.data.telemetry_store import TelemetryStore
+from app.services import telemetry_ingest
+from app.services.pubsub import MemoryPubSub
+from app.services.store_sync import StoreSync
+
+NOW = 1_763_000_000
+
+
+class Relay:
+  def __init__(self) -> None:
+    self.events: list[tuple[str, str | None]] = []
+
+  def publish_event(self, message_type: str, zone_id: str | None, frame: str) -> int:
+    self.events.append((message_type, zone_id))
+    return 1
+
+
+def worker(pubsub: MemoryPubSub) -> tuple[StoreSync, Relay]:
+  relay = Relay()
+  store = TelemetryStore(capacity=100, rollups=TelemetryRollups({"1m": 100, "1h": 10, "1d": 10}))
+  return StoreSync(pubsub, get_settings(), store=store, broadcasters=[relay]), relay
+
+
+def batch(*zone_ids: str) -> telemetry_ingest.TelemetryBatch:
+  body = "\n".join(
+    json.dumps({
+      "timestamp": NOW,
+      "zone_id": zone_id,
+      "flow_ml": 1.0,
+      "pressure_psi": 50.0,
+      "energy_kw": 5.0,
+      "incidents_today": 0,
+    })
+    for zone_id in zone_ids
+  ).encode()
+  return telemetry_ingest.decode(body, "application/x-ndjson")
+
+
+def count_calls(monkeypatch, name: str) -> list[str]:
+  calls = []
+  original = getattr(mock_store, name)
+
+  def counted(item):
+    calls.append(item.id)
+    return original(item)
+
+  monkeypatch.setattr(mock_store, name, counted)
+  return calls
+
+
+def test_writes_published_by_one_worker_are_applied_once_by_the_other(monkeypatch):
+  incident = mock_store.list_incidents()[0].model_copy()
+  schedule = mock_store.list_pump_schedules()[0].model_copy()
+
+  async def scenario() -> None:
+    pubsub = MemoryPubSub()
+    (publisher, publisher_relay), (peer, peer_relay) = worker(pubsub), worker(pubsub)
+    await publisher.start()
+    await peer.start()
+    # Both workers share this process's store; only the publisher's hook stands for the write.
+    mock_store.remove_listener(peer._on_store_write)
+    try:
+      result = await publisher.publish_telemetry(batch("zone-1", "zone-2"))
+      assert (result.accepted, result.rejected) == (2, 0)
+      assert len(publisher.store) == len(peer.store) == 2
+      assert publisher._pending == {}
+
+      mock_store.update_incident_status(incident.id, "resolved" if incident.status != "resolved" else "open")
+      mock_store.apply_pump_schedule(schedule.model_copy(update={"recommendation_reason": "replicated"}))
+      incidents, schedules = count_calls(monkeypatch, "apply_incident"), count_calls(monkeypatch, "apply_pump_schedule")
+      while not publisher._outbox.empty():
+        await asyncio.sleep(0)
+      await asyncio.sleep(0)
+      # Only the peer applies them; each worker relays each write once, the publisher on its own confirmation.
+      assert incidents == [incident.id]
+      assert schedules == [schedule.id]
+      expected = [("incidents", incident.zone_id), ("schedules", schedule.zone_id)]
+      assert publisher_relay.events == peer_relay.events == expected
+    finally:
+      await peer.stop()
+      await publisher.stop()
+
+  try:
+    asyncio.run(scenario())
+  finally:
+    monkeypatch.undo()
+    mock_store.apply_incident(incident)
+    mock_store.apply_pump_schedule(schedule)
@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+
+from app.data.telemetry_rollups import TelemetryRollups
+from app.data.telemetry_store import TelemetryStore
+from app.schemas.water import TelemetrySnapshot
+from app.services.telemetry_history import query_history
+
+
+def test_rollup_points_are_rounded_like_snapshots():
+  store = TelemetryStore(capacity=16, rollups=TelemetryRollups({"1m": 16, "1h": 16, "1d": 16}))
+  for second, flow_ml in ((0, 0.1), (10, 0.2), (20, 0.7)):
+    store.append(TelemetrySnapshot(
+      timestamp=datetime(2025, 11, 13, 6, 0, second, tzinfo=timezone.utc),
+      zone_id="zone-1",
+      flow_ml=flow_ml,
+      pressure_psi=50.3,
+      energy_kw=5.1,
+      incidents_today=0,
+    ))
+  [point] = query_history(store, zone_id="zone-1", resolution="1m")
+  assert point.count == 3
+  assert point.flow_ml.model_dump() == {"min": 0.1, "max": 0.7, "mean": 0.333, "sum": 1.0}
+  assert point.pressure_psi.model_dump() == {"min": 50.3, "max": 50.3, "mean": 50.3, "sum": 150.9}
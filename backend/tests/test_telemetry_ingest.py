@@ -0,0 +1,115 @@
+import json
+
+import numpy as np
+
+from app.data.telemetry_rollups import TelemetryRollups
+from app.data.telemetry_segments import HOUR_SECONDS, SegmentLog
+from app.data.telemetry_store import TelemetryStore
+from app.services import telemetry_ingest
+
+# Half past an hour, so late rows within the reorder window stay in the same hour.
+NOW = 1_763_000_000 // HOUR_SECONDS * HOUR_SECONDS + 1_800
+
+
+def new_store() -> TelemetryStore:
+  return TelemetryStore(capacity=1_000, rollups=TelemetryRollups({"1m": 1_000, "1h": 100, "1d": 10}))
+
+
+def upload(store: TelemetryStore, *rows: tuple[int, str, float]):
+  body = "\n".join(
+    json.dumps({
+      "timestamp": timestamp,
+      "zone_id": zone_id,
+      "flow_ml": flow_ml,
+      "pressure_psi": 50.0,
+      "energy_kw": 5.0,
+      "incidents_today": 0,
+    })
+    for timestamp, zone_id, flow_ml in rows
+  ).encode()
+  return telemetry_ingest.ingest(telemetry_ingest.decode(body, "application/x-ndjson"), store)
+
+
+def test_late_batch_is_merged_in_timestamp_order():
+  store = new_store()
+  upload(store, (NOW, "zone-1", 1.0))
+  result = upload(store, *((NOW - 600 + i, "zone-2", 2.0) for i in range(100)))
+  assert (result.accepted, result.rejected) == (100, 0)
+
+  columns = store.window().columns
+  assert len(store) == 101
+  assert np.all(np.diff(columns["timestamp"]) >= 0)
+  assert columns["timestamp"][-1] == NOW
+  assert store.snapshot(store.head_seq - 1).zone_id == "zone-1"
+
+
+def test_latest_per_zone_does_not_go_backwards():
+  store = new_store()
+  upload(store, (NOW, "zone-1", 1.0), (NOW - 60, "zone-2", 2.0))
+  upload(store, (NOW - 300, "zone-1", 9.0), (NOW - 30, "zone-2", 3.0))
+
+  latest = {snapshot.zone_id: snapshot for snapshot in store.latest_per_zone()}
+  assert (latest["zone-1"].timestamp.timestamp(), latest["zone-1"].flow_ml) == (NOW, 1.0)
+  assert (latest["zone-2"].timestamp.timestamp(), latest["zone-2"].flow_ml) == (NOW - 30, 3.0)
+
+
+def test_late_rows_update_their_rollup_buckets():
+  store = new_store()
+  upload(store, (NOW - 600, "zone-1", 1.0), (NOW, "zone-2", 1.0))
+  # Both are older than the open minute: one joins zone-1's closed bucket, one needs a new bucket.
+  upload(store, (NOW - 1_200, "zone-3", 5.0), (NOW - 590, "zone-1", 3.0))
+
+  minutes = store.rollups.tier("1m").ring.window()
+  rows = {
+    (bucket, store.zone_id(zone)): (count, flow)
+    for bucket, zone, count, flow in zip(
+      minutes["bucket"].tolist(), minutes["zone"].tolist(), minutes["count"].tolist(), minutes["flow_ml_sum"].tolist(),
+    )
+  }
+  assert rows[(NOW - 600, "zone-1")] == (2, 4.0)
+  assert rows[(NOW - 1_200, "zone-3")] == (1, 5.0)
+  assert np.all(np.diff(minutes["bucket"]) >= 0)
+  assert int(minutes["count"].sum()) == len(store)
+  hour = store.rollups.tier("1h").ring.window()
+  assert int(hour["count"].sum()) == len(store)
+
+
+def test_late_rows_are_rewritten_in_the_archive_and_restored(tmp_path):
+  archive = SegmentLog(tmp_path)
+  archive.open()
+  store = new_store()
+  store.attach_archive(archive)
+  upload(store, *((NOW + i, "zone-1", 1.0) for i in range(0, 300, 10)))
+  upload(store, *((NOW - 100 + i, "zone-2", 2.0) for i in range(50)))
+
+  stored = store.window().columns
+  persisted = archive.window(archive.first_seq, archive.head_seq)
+  assert archive.head_seq == store.head_seq == 80
+  assert np.array_equal(persisted["timestamp"], stored["timestamp"])
+  archive.close()
+
+  reopened = SegmentLog(tmp_path)
+  reopened.open()
+  restored = new_store()
+  restored.attach_archive(reopened)
+  assert np.array_equal(restored.window().columns["timestamp"], stored["timestamp"])
+  assert [restored.zone_id(code) for code in restored.window().columns["zone"].tolist()] == [
+    store.zone_id(code) for code in stored["zone"].tolist()
+  ]
+  assert int(restored.rollups.tier("1h").ring.window()["count"].sum()) == 80
+  reopened.close()
+
+
+def test_rows_the_store_cannot_take_are_counted():
+  store = new_store()
+  upload(store, (NOW, "zone-1", 1.0), (NOW - 60, "zone-2", 2.0))
+  result = upload(
+    store,
+    (NOW - 2 * HOUR_SECONDS, "zone-3", 1.0),  # before the reorder window
+    (NOW - 120, "zone-2", 1.0),  # older than zone-2's newest reading
+    (NOW - 30, "zone-2", 1.0),
+    (NOW - 10, "zone-3", 1.0),
+  )
+  assert (result.accepted, result.rejected) == (2, 2)
+  assert result.rejection_reasons == {"too_late": 1, "out_of_order": 1}
+  assert len(store) == 4
@@ -0,0 +1,35 @@
+import numpy as np
+
+from app.data.telemetry_segments import DAY_SECONDS, HOUR_SECONDS, SegmentLog
+
+DAY = 20_400 * DAY_SECONDS
+
+
+def readings(*timestamps: int) -> dict[str, np.ndarray]:
+  size = len(timestamps)
+  return {
+    "timestamp": np.array(timestamps, dtype=np.int64),
+    "zone": np.ones(size, dtype=np.int32),
+    "flow_ml": np.full(size, 10.0, dtype=np.float32),
+    "pressure_psi": np.full(size, 50.0, dtype=np.float32),
+    "energy_kw": np.full(size, 5.0, dtype=np.float32),
+    "incidents_today": np.zeros(size, dtype=np.int32),
+  }
+
+
+def test_compact_before_first_daily_fold(tmp_path):
+  log = SegmentLog(tmp_path, HOUR_SECONDS)
+  log.open()
+  log.append(readings(DAY + 60, DAY + HOUR_SECONDS + 60), 0)
+  assert len(log.segments) == 2
+
+  assert log.compact(now=DAY + 2 * HOUR_SECONDS, raw_retention_seconds=0) == 0
+  assert log.daily_through is None
+  assert len(log.segments) == 2
+
+  # Once the day is finished it is folded and its raw segments can go.
+  log.append(readings(DAY + DAY_SECONDS + 60), 2)
+  assert log.compact(now=DAY + DAY_SECONDS + 120, raw_retention_seconds=0) == 2
+  assert log.daily_through == DAY + DAY_SECONDS
+  assert log.daily_rollups()["count"].tolist() == [2]
+  log.close()
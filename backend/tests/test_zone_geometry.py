@@ -0,0 +1,27 @@
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.data import mock_store
+from app.services.zone_geometry import ZoneGeometryCache
+
+
+def test_zone_update_keeps_the_encoded_geometry():
+  angles = np.linspace(0, 2 * np.pi, 400, endpoint=False)
+  ring = np.column_stack([81.6 + 0.01 * np.cos(angles), 21.2 + 0.01 * np.sin(angles)]).tolist()
+  zone = mock_store.list_zones()[0].model_copy(deep=True)
+  zone.geojson.geometry = {"type": "Polygon", "coordinates": [[*ring, ring[0]]]}
+  cache = ZoneGeometryCache(zoom_levels=[10, 14], tolerance_px=1.0)
+  cache.set_zone(zone)
+  coarse = json.loads(cache.encoded_zones(10))[0]["geojson"]["geometry"]
+  assert json.loads(cache.encoded_zones())[0] == zone.model_dump(mode="json")
+
+  refreshed = zone.model_copy(update={"fairness_score": 0.5, "last_updated": datetime(2026, 1, 1, tzinfo=timezone.utc)})
+  cache.set_zone(refreshed)
+  assert cache.simplified_zones == 1
+  assert json.loads(cache.encoded_zones())[0] == refreshed.model_dump(mode="json")
+  listed = json.loads(cache.encoded_zones(10))[0]
+  assert listed["fairness_score"] == 0.5
+  assert listed["geojson"]["geometry"] == coarse
+  assert len(coarse["coordinates"][0]) < len(ring)